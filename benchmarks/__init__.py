@@ -0,0 +1,6 @@
+"""Офлайн-бенчмарки TaskMateBot (запуск: ``python -m benchmarks.<name>``)."""
+
+import os
+
+# Конфигурация бота требует токен при импорте; бенчмарки к Telegram не ходят
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:benchmark-token")
@@ -0,0 +1,110 @@
+"""Стоимость клавиатур на апдейт: сборка заново против кэша.
+
+На каждый апдейт ``ReplyKeyboardMiddleware`` берёт ``main_menu(role)``, а
+карточка задачи и уведомление ``task.assigned`` — ``task_actions``. Меряет время
+и выделенную память на апдейт при логировании уровня INFO (как в проде).
+
+    python -m benchmarks.bench_keyboards [--count 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import logging
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from src.bot import keyboards
+from src.storage.sessions import UserSession
+
+ROLES = ("employee", "manager", "owner", "observer")
+
+legacy_logger = logging.getLogger("src.bot.keyboards.legacy")
+
+
+def _tasks(count: int) -> list[dict[str, Any]]:
+    kinds = ("notification", "completion", "completion_with_proof")
+    return [
+        {
+            "id": i % 500 + 1,
+            "status": "pending",
+            "response_type": kinds[i % len(kinds)],
+            "assignments": [{"user_id": 1}, {"user_id": i % 7 + 2}],
+        }
+        for i in range(count)
+    ]
+
+
+def _legacy_update(task: dict[str, Any], session: UserSession) -> None:
+    """Апдейт до кэширования: меню и кнопки собираются заново, INFO-логи."""
+    keyboards.main_menu.__wrapped__(session.role)
+    legacy_logger.info(
+        "task_actions: task=%s status=%s response_type=%s assignments=%s session_role=%s",
+        task.get("id"),
+        task.get("status"),
+        task.get("response_type"),
+        len(task.get("assignments", [])),
+        session.role,
+    )
+    keyboards._task_action_keyboard.__wrapped__(
+        task["id"], task["response_type"], task["status"], False
+    )
+    legacy_logger.info("task_actions: returning keyboard for task %s", task.get("id"))
+
+
+def _cached_update(task: dict[str, Any], session: UserSession) -> None:
+    keyboards.main_menu(session.role)
+    keyboards.task_actions(task, session)
+
+
+def _timed(fn: Callable[..., None], tasks: list[dict[str, Any]], session: UserSession) -> float:
+    start = time.perf_counter()
+    for task in tasks:
+        fn(task, session)
+    return time.perf_counter() - start
+
+
+def _allocated(fn: Callable[..., None], tasks: list[dict[str, Any]], session: UserSession) -> int:
+    """Суммарный пик выделенной памяти по апдейтам (байт)."""
+    total = 0
+    tracemalloc.start()
+    for task in tasks:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(task, session)
+        _, peak = tracemalloc.get_traced_memory()
+        total += peak - base
+    tracemalloc.stop()
+    return total
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+    session = UserSession(
+        token="1|token", user_id=1, full_name="Тест", role="employee", login="test"
+    )
+    tasks = _tasks(args.count)
+    # Прогрев кэшей: в проде они заполнены после первых апдейтов
+    _cached_update(tasks[0], session)
+
+    rows = [("сборка заново + INFO", _legacy_update), ("кэш + lazy debug", _cached_update)]
+    print(f"main_menu + task_actions на {args.count} апдейтов (лучшее из {args.repeat}):")
+    for name, fn in rows:
+        best = min(_timed(fn, tasks, session) for _ in range(args.repeat))
+        allocated = _allocated(fn, tasks[: args.count // 10], session) / (args.count // 10)
+        print(
+            f"  {name:<24} {best / args.count * 1e6:7.2f} us/апдейт  "
+            f"{allocated:8.0f} B/апдейт"
+        )
+    print(f"Кэш task_actions: {keyboards._task_action_keyboard.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
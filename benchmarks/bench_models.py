@@ -0,0 +1,124 @@
+"""Разбор ответа ``GET /tasks``: сырые dict против моделей ``src.api.models``.
+
+Оба пути делают то, что делают обработчики на задачу: проверка исполнителя
+(дважды — кнопки действий и делегирования), дедлайн и статус. Путь dict
+декодирует stdlib ``json``, модели — ``src.utils.jsonlib`` (``JSON_BACKEND``).
+
+    python -m benchmarks.bench_models [--tasks 50] [--responses 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from src.api.models import Response
+from src.utils import jsonlib
+
+USER_ID = 7
+
+
+def _payload(count: int) -> bytes:
+    now = datetime.now(timezone.utc)
+    tasks = [
+        {
+            "id": i,
+            "title": f"Задача {i}",
+            "description": "Проверить выкладку автомобилей в шоуруме.",
+            "status": ("pending", "acknowledged", "completed")[i % 3],
+            "priority": "medium",
+            "response_type": "completion",
+            "deadline": (now + timedelta(minutes=i)).isoformat().replace("+00:00", "Z"),
+            "dealership": {"id": 1, "name": "Автосалон №1"},
+            "assignments": [
+                {"user_id": uid, "user": {"id": uid, "full_name": f"Сотрудник {uid}"}}
+                for uid in range(i % 5, i % 5 + 3)
+            ],
+        }
+        for i in range(count)
+    ]
+    return json.dumps({"data": tasks, "meta": {"last_page": 1}}).encode()
+
+
+def _raw_assigned(task: dict[str, Any], user_id: int) -> bool:
+    for a in task.get("assignments", []):
+        uid = a.get("user_id") or a.get("user", {}).get("id")
+        if uid is not None and str(uid) == str(user_id):
+            return True
+    return False
+
+
+def _raw_path(content: bytes) -> int:
+    hits = 0
+    for task in json.loads(content).get("data", []):
+        if task.get("status", "") in ("completed", "completed_late"):
+            continue
+        deadline = task.get("deadline")
+        if deadline:
+            datetime.fromisoformat(deadline.replace("Z", "+00:00"))
+        hits += _raw_assigned(task, USER_ID) + _raw_assigned(task, USER_ID)
+    return hits
+
+
+def _model_path(content: bytes) -> int:
+    hits = 0
+    for task in Response.from_bytes(content).tasks():
+        if task.is_completed:
+            continue
+        task.deadline
+        hits += task.is_assigned(USER_ID) + task.is_assigned(USER_ID)
+    return hits
+
+
+def _timed(fn, content: bytes, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(content)
+    return time.perf_counter() - start
+
+
+def _retained(build) -> int:
+    tracemalloc.start()
+    objs = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return size
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tasks", type=int, default=50, help="задач в ответе")
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    content = _payload(args.tasks)
+    assert _raw_path(content) == _model_path(content)
+
+    print(
+        f"Разбор и обход {args.responses} ответов по {args.tasks} задач "
+        f"({len(content) / 1024:.1f} KiB, лучшее из {args.repeat}):"
+    )
+    for name, fn in (("dict + повторные обходы", _raw_path), ("Response → Task", _model_path)):
+        best = min(_timed(fn, content, args.responses) for _ in range(args.repeat))
+        print(f"  {name:<26} {best * 1000:8.1f} ms  {best / args.responses * 1e6:7.1f} us/ответ")
+
+    print(f"Только декодирование {args.responses} ответов:")
+    for name, fn in (("json", json.loads), (f"jsonlib ({jsonlib.backend})", jsonlib.loads)):
+        best = min(_timed(fn, content, args.responses) for _ in range(args.repeat))
+        print(f"  {name:<26} {best * 1000:8.1f} ms  {best / args.responses * 1e6:7.1f} us/ответ")
+
+    print("Память разобранного ответа:")
+    raw = _retained(lambda: json.loads(content)["data"])
+    models = _retained(lambda: list(Response.from_bytes(content).tasks()))
+    print(f"  {'dict':<26} {raw / 1024:8.1f} KiB")
+    print(f"  {'dict + Task (slots)':<26} {models / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
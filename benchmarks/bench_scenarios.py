@@ -0,0 +1,367 @@
+"""Сценарные бенчмарки бота на фейковых API, Bot API и Valkey.
+
+Сценарии:
+
+- ``deadline_tick`` — один проход ``check_deadlines`` по N сессиям;
+- ``rabbitmq_burst`` — пачка событий через ``_process_message`` consumer-а;
+- ``btn_tasks`` — одновременные нажатия «Мои задачи» через полный Dispatcher;
+- ``proof_upload`` — альбомы доказательств и отправка на проверку (память).
+
+    python -m benchmarks.bench_scenarios [сценарий ...] [--sessions 5000]
+        [--api-latency-ms 5] [--bot-latency-ms 5] [--json out.json]
+        [--baseline base.json --tolerance 0.2]
+
+С ``--baseline`` сценарий, у которого p99 вырос больше чем на ``tolerance``,
+считается регрессией (код выхода 1).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from aiogram import Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Update
+
+from src.bot import keyboards
+from src.bot.bot import bot, create_dispatcher
+from src.bot.handlers.tasks import ProofUpload
+from src.config import settings
+from src.rabbitmq import consumer
+from src.scheduler import polling
+from src.scheduler.polling import check_deadlines
+
+from .harness import (
+    TASK_ID_STRIDE,
+    Fakes,
+    Samples,
+    clear_notified,
+    install_fakes,
+    peak_rss_kib,
+    rss_kib,
+    seed_sessions,
+    timed,
+)
+
+FIRST_CHAT_ID = 10_000
+
+
+# --- RabbitMQ без брокера ---
+
+
+@dataclass
+class FakeIncomingMessage:
+    body: bytes
+    headers: dict[str, Any] = field(default_factory=dict)
+    timestamp: datetime | None = None
+
+
+class FakeExchange:
+    def __init__(self) -> None:
+        self.published = 0
+
+    async def publish(self, message: Any, routing_key: str) -> None:
+        self.published += 1
+
+
+class FakeChannel:
+    def __init__(self) -> None:
+        self.default_exchange = FakeExchange()
+
+
+# --- Апдейты Telegram ---
+
+_update_ids = iter(range(1, sys.maxsize))
+
+
+def _user(chat_id: int) -> dict[str, Any]:
+    return {"id": chat_id, "is_bot": False, "first_name": "Тест"}
+
+
+def _message(chat_id: int, **fields: Any) -> dict[str, Any]:
+    return {
+        "message_id": next(_update_ids),
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "private"},
+        "from": _user(chat_id),
+        **fields,
+    }
+
+
+def text_update(chat_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {"update_id": next(_update_ids), "message": _message(chat_id, text=text)}
+    )
+
+
+def photo_update(chat_id: int, file_id: str, media_group_id: str) -> Update:
+    photo = {
+        "file_id": file_id,
+        "file_unique_id": file_id,
+        "width": 1280,
+        "height": 960,
+    }
+    return Update.model_validate(
+        {
+            "update_id": next(_update_ids),
+            "message": _message(
+                chat_id, photo=[photo], media_group_id=media_group_id
+            ),
+        }
+    )
+
+
+def callback_update(chat_id: int, data: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": next(_update_ids),
+            "callback_query": {
+                "id": str(next(_update_ids)),
+                "from": _user(chat_id),
+                "chat_instance": str(chat_id),
+                "data": data,
+                "message": _message(chat_id, text="…"),
+            },
+        }
+    )
+
+
+# --- Сценарии ---
+
+
+class Bench:
+    def __init__(self, args: argparse.Namespace, fakes: Fakes) -> None:
+        self.args = args
+        self.fakes = fakes
+        self._dp: Dispatcher | None = None
+
+    async def dispatcher(self) -> Dispatcher:
+        if self._dp is None:
+            from src.main import setup_routers
+
+            self._dp = await create_dispatcher()
+            setup_routers(self._dp)
+        return self._dp
+
+    def _reset_counters(self) -> None:
+        self.fakes.api.calls.clear()
+        self.fakes.bot_session.calls.clear()
+
+    def _counters(self) -> dict[str, Any]:
+        return {
+            "api_calls": sum(self.fakes.api.calls.values()),
+            "bot_calls": sum(self.fakes.bot_session.calls.values()),
+        }
+
+    async def deadline_tick(self) -> Samples:
+        samples = Samples("deadline_tick", unit="tick")
+        self._reset_counters()
+        start = time.perf_counter()
+        # Проход без разнесения сессий и каждый раз со свежим снимком задач
+        settings.polling_jitter = 0.0
+        for _ in range(self.args.repeat):
+            await clear_notified(self.fakes.redis)
+            polling.reset_snapshots()
+            await timed(samples, check_deadlines(bot))
+        samples.wall = time.perf_counter() - start
+        samples.extra = {
+            "sessions": self.args.sessions,
+            "sessions_per_s": round(
+                self.args.sessions * self.args.repeat / samples.wall, 1
+            ),
+            **self._counters(),
+        }
+        return samples
+
+    async def rabbitmq_burst(self) -> Samples:
+        samples = Samples("rabbitmq_burst", unit="msg")
+        await clear_notified(self.fakes.redis)
+        consumer._cache_updated_at = 0.0
+        self._reset_counters()
+        channel = FakeChannel()
+        users = self.args.sessions
+        events = []
+        for i in range(self.args.events):
+            user_ids = [(i * 3 + k) % users + 1 for k in range(3)]
+            task = self.fakes.api.task(user_ids[0] * TASK_ID_STRIDE + 2 + i % 50)
+            events.append(
+                FakeIncomingMessage(
+                    json.dumps(
+                        {"event": "task.assigned", "task": task, "user_ids": user_ids}
+                    ).encode(),
+                    timestamp=datetime.now(timezone.utc),
+                )
+            )
+        start = time.perf_counter()
+        # Consumer обрабатывает сообщения очереди последовательно
+        for msg in events:
+            await timed(samples, consumer._process_message(channel, bot, msg))
+        samples.wall = time.perf_counter() - start
+        samples.extra = {
+            "republished": channel.default_exchange.published,
+            **self._counters(),
+        }
+        return samples
+
+    async def btn_tasks(self) -> Samples:
+        samples = Samples("btn_tasks", unit="update")
+        dp = await self.dispatcher()
+        self._reset_counters()
+        chats = [FIRST_CHAT_ID + i for i in range(1, self.args.concurrency + 1)]
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                timed(samples, dp.feed_update(bot, text_update(chat_id, keyboards.BTN_MY_TASKS)))
+                for chat_id in chats
+            )
+        )
+        samples.wall = time.perf_counter() - start
+        samples.extra = {"concurrency": len(chats), **self._counters()}
+        return samples
+
+    async def _upload_album(self, dp: Dispatcher, chat_id: int) -> None:
+        user_id = chat_id - FIRST_CHAT_ID
+        task_id = user_id * TASK_ID_STRIDE + 2
+        key = StorageKey(bot_id=bot.id, chat_id=chat_id, user_id=chat_id)
+        state = FSMContext(storage=dp.storage, key=key)
+        await state.set_state(ProofUpload.collecting)
+        await state.set_data({"task_id": task_id, "files": []})
+        album = f"album-{chat_id}"
+        await asyncio.gather(
+            *(
+                dp.feed_update(bot, photo_update(chat_id, f"{chat_id}-{i}", album))
+                for i in range(self.args.album_size)
+            )
+        )
+        await dp.feed_update(bot, callback_update(chat_id, f"proof_submit:{task_id}"))
+
+    async def proof_upload(self) -> Samples:
+        samples = Samples("proof_upload", unit="album")
+        dp = await self.dispatcher()
+        self._reset_counters()
+        self.fakes.api.bytes_received = 0
+        chats = [FIRST_CHAT_ID + i for i in range(1, self.args.uploads + 1)]
+        rss_before = rss_kib()
+        tracemalloc.start()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(timed(samples, self._upload_album(dp, chat_id)) for chat_id in chats)
+        )
+        samples.wall = time.perf_counter() - start
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        samples.extra = {
+            "album_size": self.args.album_size,
+            "file_kib": self.args.file_kib,
+            "traced_peak_kib": traced_peak // 1024,
+            "rss_growth_kib": rss_kib() - rss_before,
+            "uploaded_kib": self.fakes.api.bytes_received // 1024,
+            **self._counters(),
+        }
+        return samples
+
+
+SCENARIOS = ("deadline_tick", "rabbitmq_burst", "btn_tasks", "proof_upload")
+
+
+def _print(summary: dict[str, Any]) -> None:
+    print(
+        f"{summary['scenario']:<16} n={summary['count']:<5} "
+        f"p50={summary['p50_ms']:>9.2f} ms  p99={summary['p99_ms']:>9.2f} ms  "
+        f"{summary['throughput']:>8.2f} {summary['unit']}/s  "
+        f"rss={summary['rss_kib'] / 1024:.1f} MiB"
+    )
+    rest = {
+        k: v
+        for k, v in summary.items()
+        if k not in {"scenario", "count", "p50_ms", "p99_ms", "throughput", "unit",
+                     "rss_kib", "peak_rss_kib"}
+    }
+    if rest:
+        print("  " + "  ".join(f"{k}={v}" for k, v in rest.items()))
+
+
+def _regressions(
+    results: list[dict[str, Any]], baseline_path: str, tolerance: float
+) -> list[str]:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    failed = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if base and base["p99_ms"] and r["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            failed.append(
+                f"{r['scenario']}: p99 {base['p99_ms']} → {r['p99_ms']} ms"
+            )
+    return failed
+
+
+async def run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    fakes = install_fakes(
+        bot,
+        api_latency=args.api_latency_ms / 1000,
+        bot_latency=args.bot_latency_ms / 1000,
+        tasks_per_user=args.tasks_per_user,
+        file_size=args.file_kib * 1024,
+    )
+    await seed_sessions(args.sessions, first_chat_id=FIRST_CHAT_ID)
+    bench = Bench(args, fakes)
+    results = []
+    for name in args.scenarios or SCENARIOS:
+        summary = (await getattr(bench, name)()).summary()
+        _print(summary)
+        results.append(summary)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("scenarios", nargs="*", metavar="scenario", help=", ".join(SCENARIOS))
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--tasks-per-user", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1, help="проходов deadline_tick")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--album-size", type=int, default=10)
+    parser.add_argument("--file-kib", type=int, default=1024)
+    parser.add_argument("--api-latency-ms", type=float, default=5.0)
+    parser.add_argument("--bot-latency-ms", type=float, default=5.0)
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    parser.add_argument("--baseline", help="сравнить p99 с прошлым --json")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    # Логи обработчиков искажают замеры
+    logging.disable(logging.WARNING)
+    results = asyncio.run(run(args))
+    print(f"Пиковый RSS: {peak_rss_kib() / 1024:.1f} MiB")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        failed = _regressions(results, args.baseline, args.tolerance)
+        for line in failed:
+            print(f"РЕГРЕССИЯ {line}")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
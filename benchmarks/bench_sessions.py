@@ -0,0 +1,119 @@
+"""Сравнение кодирования сессий: JSON-строка (v1) против hash (v2).
+
+Меряет стоимость декодирования и память на 10k сессий.
+
+    python -m benchmarks.bench_sessions [--count 10000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from src.storage.sessions import (
+    UserSession,
+    decode_legacy_session,
+    decode_session,
+    encode_session,
+)
+
+
+@dataclass
+class LegacyUserSession:
+    """UserSession до перехода на __slots__ (для сравнения памяти)."""
+
+    token: str
+    user_id: int
+    full_name: str
+    role: str
+    login: str
+
+
+def _make(i: int) -> UserSession:
+    return UserSession(
+        token=f"{i}|" + "x" * 40,
+        user_id=i,
+        full_name=f"Сотрудник Тестовый {i}",
+        role="employee",
+        login=f"user{i}",
+    )
+
+
+def _payloads(count: int) -> tuple[list[str], list[dict[str, str]]]:
+    legacy: list[str] = []
+    hashes: list[dict[str, str]] = []
+    for i in range(count):
+        s = _make(i)
+        legacy.append(
+            json.dumps(
+                {
+                    "token": s.token,
+                    "user_id": s.user_id,
+                    "full_name": s.full_name,
+                    "role": s.role,
+                    "login": s.login,
+                }
+            )
+        )
+        # Так HGETALL возвращает hash при decode_responses=True
+        hashes.append({k: str(v) for k, v in encode_session(s).items()})
+    return legacy, hashes
+
+
+def _timed(fn, items) -> tuple[float, list]:
+    start = time.perf_counter()
+    out = [fn(item) for item in items]
+    return time.perf_counter() - start, out
+
+
+def _memory(factory, count: int) -> int:
+    tracemalloc.start()
+    objs = [factory(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return size
+
+
+def _legacy_decode(data: str) -> LegacyUserSession:
+    return LegacyUserSession(**json.loads(data))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    legacy, hashes = _payloads(args.count)
+
+    rows = [
+        ("v1 json + dataclass", _legacy_decode, legacy),
+        ("v1 json -> slots (migration)", decode_legacy_session, legacy),
+        ("v2 hash -> slots", decode_session, hashes),
+    ]
+    print(f"Декодирование {args.count} сессий (лучшее из {args.repeat}):")
+    for name, fn, items in rows:
+        best = min(_timed(fn, items)[0] for _ in range(args.repeat))
+        print(f"  {name:<32} {best * 1000:8.2f} ms  {best / args.count * 1e6:6.2f} us/сессия")
+
+    def legacy_obj(i: int) -> LegacyUserSession:
+        s = _make(i)
+        return LegacyUserSession(s.token, s.user_id, s.full_name, s.role, s.login)
+
+    print(f"Память объектов на {args.count} сессий:")
+    print(f"  {'dataclass (__dict__)':<32} {_memory(legacy_obj, args.count) / 1024:8.1f} KiB")
+    print(f"  {'dataclass(slots=True)':<32} {_memory(_make, args.count) / 1024:8.1f} KiB")
+
+    legacy_bytes = sum(len(x.encode()) for x in legacy)
+    hash_bytes = sum(len(k) + len(v.encode()) for h in hashes for k, v in h.items())
+    print(f"Полезная нагрузка в Valkey на {args.count} сессий:")
+    print(f"  {'v1 json':<32} {legacy_bytes / 1024:8.1f} KiB")
+    print(f"  {'v2 hash (поля + значения)':<32} {hash_bytes / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
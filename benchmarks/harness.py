@@ -0,0 +1,379 @@
+"""Офлайн-окружение для бенчмарков: фейковые TaskMate API, Bot API и Valkey.
+
+- ``FakeTaskMateAPI`` — httpx.MockTransport с настраиваемой задержкой; ставится
+  вместо shared-клиента ``src.api.client``;
+- ``FakeBotSession`` — сессия aiogram, отвечающая как Bot API (JSON-ответ
+  проходит обычную валидацию aiogram, request-middleware работают);
+- Valkey — fakeredis в пулах ``src.storage.sessions``.
+
+``Samples`` собирает задержки и считает p50/p99, throughput и RSS.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import re
+import resource
+import statistics
+import time
+from collections import Counter
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import fakeredis
+import httpx
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import GetFile, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from src.api import client as api_client
+from src.bot.bot import TelegramMetricsMiddleware
+from src.storage import sessions
+from src.storage.sessions import UserSession, save_session
+
+TASK_ID_STRIDE = 1000
+DEALERSHIP_ID = 1
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000000Z")
+
+
+def user_token(user_id: int) -> str:
+    return f"{user_id}|benchmark-token"
+
+
+def make_session(user_id: int, role: str = "employee") -> UserSession:
+    return UserSession(
+        token=user_token(user_id),
+        user_id=user_id,
+        full_name=f"Сотрудник Тестовый {user_id}",
+        role=role,
+        login=f"user{user_id}",
+    )
+
+
+# --- TaskMate API ---
+
+
+@dataclass
+class FakeTaskMateAPI:
+    """Фейковый TaskMateServer: детерминированные задачи на пользователя.
+
+    У каждого пользователя ``tasks_per_user`` задач; первая — с дедлайном через
+    15 минут, вторая — просрочена, остальные — через сутки.
+    """
+
+    latency: float = 0.0
+    tasks_per_user: int = 10
+    users_per_dealership: int = 50
+    calls: Counter[str] = field(default_factory=Counter)
+    bytes_received: int = 0
+
+    _routes: list[tuple[str, re.Pattern[str], str]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self._routes = [
+            ("GET", re.compile(r"/tasks$"), "_tasks"),
+            ("GET", re.compile(r"/tasks/(\d+)$"), "_task"),
+            ("PATCH", re.compile(r"/tasks/(\d+)/status$"), "_update_status"),
+            ("GET", re.compile(r"/task-delegations$"), "_delegations"),
+            ("GET", re.compile(r"/dealerships/(\d+)$"), "_dealership"),
+            ("GET", re.compile(r"/users$"), "_users"),
+            ("GET", re.compile(r"/session/current$"), "_current_user"),
+        ]
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self._handle)
+
+    def task(self, task_id: int, now: datetime | None = None) -> dict[str, Any]:
+        now = now or datetime.now(timezone.utc)
+        user_id, index = divmod(task_id, TASK_ID_STRIDE)
+        if index == 0:
+            deadline, status = now + timedelta(minutes=15), "pending"
+        elif index == 1:
+            deadline, status = now - timedelta(hours=1), "pending"
+        else:
+            deadline, status = now + timedelta(days=1), "acknowledged"
+        return {
+            "id": task_id,
+            "title": f"Задача {task_id}",
+            "description": "Проверить выкладку автомобилей в шоуруме и сфотографировать.",
+            "status": status,
+            "priority": ("low", "medium", "high")[index % 3],
+            "task_type": "individual",
+            "response_type": "completion",
+            "deadline": _iso(deadline),
+            "created_at": _iso(now - timedelta(days=1)),
+            "dealership_id": DEALERSHIP_ID,
+            "dealership": {"id": DEALERSHIP_ID, "name": "Автосалон №1"},
+            "assignments": [{"user_id": user_id, "user": {"id": user_id}}],
+            "responses": [],
+        }
+
+    def tasks_for(self, user_id: int, limit: int) -> list[dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        count = min(self.tasks_per_user, limit)
+        return [self.task(user_id * TASK_ID_STRIDE + i, now) for i in range(count)]
+
+    @staticmethod
+    def _user_id(request: httpx.Request) -> int:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        return int(token.split("|", 1)[0] or 0)
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = request.url.path.split("/api/v1", 1)[-1]
+        for method, pattern, name in self._routes:
+            m = pattern.match(path)
+            if m and request.method == method:
+                self.calls[name.lstrip("_")] += 1
+                body = await getattr(self, name)(request, *m.groups())
+                return httpx.Response(200, json=body)
+        self.calls["not_found"] += 1
+        return httpx.Response(404, json={"message": "Not found"})
+
+    async def _tasks(self, request: httpx.Request) -> dict[str, Any]:
+        per_page = int(request.url.params.get("per_page", 15))
+        user_id = int(request.url.params.get("assigned_to") or self._user_id(request))
+        return {"data": self.tasks_for(user_id, per_page)}
+
+    async def _task(self, request: httpx.Request, task_id: str) -> dict[str, Any]:
+        return {"data": self.task(int(task_id))}
+
+    async def _update_status(self, request: httpx.Request, task_id: str) -> dict[str, Any]:
+        self.bytes_received += len(await request.aread())
+        task = self.task(int(task_id))
+        task["status"] = "pending_review"
+        return {"data": task}
+
+    async def _delegations(self, request: httpx.Request) -> dict[str, Any]:
+        return {"data": []}
+
+    async def _dealership(self, request: httpx.Request, dealership_id: str) -> dict[str, Any]:
+        return {
+            "data": {
+                "id": int(dealership_id),
+                "name": "Автосалон №1",
+                "timezone": "Asia/Tashkent",
+            }
+        }
+
+    async def _users(self, request: httpx.Request) -> dict[str, Any]:
+        per_page = int(request.url.params.get("per_page", 15))
+        page = int(request.url.params.get("page", 1))
+        total = self.users_per_dealership
+        first = (page - 1) * per_page + 1
+        return {
+            "data": [
+                {"id": i, "full_name": f"Сотрудник Тестовый {i}", "role": "employee"}
+                for i in range(first, min(first + per_page, total + 1))
+            ],
+            "meta": {
+                "current_page": page,
+                "last_page": max(1, -(-total // per_page)),
+                "per_page": per_page,
+                "total": total,
+            },
+        }
+
+    async def _current_user(self, request: httpx.Request) -> dict[str, Any]:
+        user_id = self._user_id(request)
+        return {
+            "data": {
+                "id": user_id,
+                "full_name": f"Сотрудник Тестовый {user_id}",
+                "role": "employee",
+                "dealership": {"id": DEALERSHIP_ID, "name": "Автосалон №1"},
+                "dealerships": [],
+            }
+        }
+
+
+# --- Bot API ---
+
+
+class FakeBotSession(BaseSession):
+    """Сессия aiogram без сети: отвечает как Bot API после ``latency`` секунд."""
+
+    def __init__(self, latency: float = 0.0, file_size: int = 256 * 1024) -> None:
+        super().__init__()
+        self.latency = latency
+        self.file_size = file_size
+        self.calls: Counter[str] = Counter()
+        self._message_ids = itertools.count(1)
+
+    def _result(self, method: TelegramMethod[Any]) -> Any:
+        if isinstance(method, GetFile):
+            return {
+                "file_id": method.file_id,
+                "file_unique_id": method.file_id,
+                "file_size": self.file_size,
+                "file_path": f"photos/{method.file_id}.jpg",
+            }
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None and type(method).__name__.startswith("Send"):
+            return {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": getattr(method, "text", None) or "",
+            }
+        return True
+
+    async def make_request(
+        self,
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+        timeout: int | None = None,
+    ) -> TelegramType:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = json.dumps({"ok": True, "result": self._result(method)})
+        response = self.check_response(
+            bot=bot, method=method, status_code=200, content=content
+        )
+        return response.result  # type: ignore[return-value]
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        remaining = self.file_size
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            remaining -= size
+            yield b"\xff" * size
+
+    async def close(self) -> None:
+        pass
+
+
+# --- Установка окружения ---
+
+
+@dataclass
+class Fakes:
+    api: FakeTaskMateAPI
+    bot_session: FakeBotSession
+    redis: fakeredis.FakeAsyncRedis
+    fsm_redis: fakeredis.FakeAsyncRedis
+
+
+def install_fakes(
+    bot: Bot,
+    *,
+    api_latency: float,
+    bot_latency: float,
+    tasks_per_user: int = 10,
+    file_size: int = 256 * 1024,
+) -> Fakes:
+    """Подменить внешние зависимости процесса фейками."""
+    api = FakeTaskMateAPI(latency=api_latency, tasks_per_user=tasks_per_user)
+    api_client._shared_client = httpx.AsyncClient(
+        transport=api.transport(), timeout=api_client.REQUEST_TIMEOUT
+    )
+
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeAsyncRedis(server=server, db=1, decode_responses=True)
+    fsm_redis = fakeredis.FakeAsyncRedis(server=server, db=2)
+    sessions._pool = redis
+    sessions._fsm_pool = fsm_redis
+
+    bot_session = FakeBotSession(latency=bot_latency, file_size=file_size)
+    bot_session.middleware(TelegramMetricsMiddleware())
+    bot.session = bot_session
+    return Fakes(api, bot_session, redis, fsm_redis)
+
+
+async def seed_sessions(count: int, *, first_chat_id: int = 10_000) -> list[int]:
+    """Создать ``count`` сессий (chat_id = first_chat_id + user_id)."""
+    chat_ids = []
+    for user_id in range(1, count + 1):
+        chat_id = first_chat_id + user_id
+        await save_session(chat_id, make_session(user_id))
+        chat_ids.append(chat_id)
+    return chat_ids
+
+
+async def clear_notified(redis: fakeredis.FakeAsyncRedis) -> None:
+    """Сбросить дедупликацию уведомлений между прогонами."""
+    keys = [k async for k in redis.scan_iter(match="tmbot:notified:*", count=1000)]
+    if keys:
+        await redis.delete(*keys)
+
+
+# --- Измерения ---
+
+
+def rss_kib() -> int:
+    """Текущий RSS процесса (KiB)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return peak_rss_kib()
+
+
+def peak_rss_kib() -> int:
+    """Пиковый RSS процесса (KiB, Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass
+class Samples:
+    """Задержки одного сценария и итоговые показатели."""
+
+    name: str
+    unit: str = "op"
+    latencies: list[float] = field(default_factory=list)
+    wall: float = 0.0
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[
+            int(q) - 1
+        ]
+
+    def summary(self) -> dict[str, Any]:
+        count = len(self.latencies)
+        return {
+            "scenario": self.name,
+            "count": count,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "throughput": round(count / self.wall, 2) if self.wall else 0.0,
+            "unit": self.unit,
+            "rss_kib": rss_kib(),
+            "peak_rss_kib": peak_rss_kib(),
+            **self.extra,
+        }
+
+
+async def timed(samples: Samples, coro: Any) -> Any:
+    """Выполнить корутину и записать её длительность."""
+    start = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        samples.latencies.append(time.perf_counter() - start)
@@ -0,0 +1,205 @@
+"""Классы запросов к API и допуск по приоритету.
+
+Все запросы процесса идут через общий пул ``_shared_client``. Чтобы большой
+проход поллера не ставил нажатия пользователей в очередь за сотнями фоновых
+запросов, каждый запрос относится к классу (lane):
+
+- ``interactive`` — обработчики апдейтов (по умолчанию);
+- ``upload`` — multipart-запросы с файлами (фото смены, доказательства);
+- ``background`` — поллер и notification worker (``with lane(BACKGROUND)``).
+
+У каждого класса свой бюджет одновременных запросов, у всех вместе — общий
+лимит ``API_CONCURRENCY_LIMIT``. Бюджеты заданы для полного лимита и
+уменьшаются пропорционально, когда ``AIMDLimit`` его снижает: иначе фоновые
+запросы могли бы занять весь сниженный лимит и оставить нажатия в очереди. Освободившийся слот получает ожидающий запрос
+более приоритетного класса (interactive → upload → background), внутри класса —
+по очереди. Ожидание допуска и полное время по классам — в
+``tmbot_api_admission_wait_seconds`` и ``tmbot_api_lane_duration_seconds``.
+
+Сам общий лимит адаптивный (``AIMDLimit``): растёт, пока backend отвечает
+быстро, и резко снижается на 429/5xx и медленных ответах — в пределах
+``API_CONCURRENCY_MIN``…``API_CONCURRENCY_LIMIT``, текущее значение в
+``tmbot_api_concurrency_limit``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from ..config import settings
+from ..utils import metrics
+
+INTERACTIVE, UPLOAD, BACKGROUND = "interactive", "upload", "background"
+PRIORITY = (INTERACTIVE, UPLOAD, BACKGROUND)
+
+current_lane: ContextVar[str] = ContextVar("api_lane", default=INTERACTIVE)
+
+
+@contextmanager
+def lane(name: str) -> Iterator[None]:
+    """Отнести запросы API внутри блока (и порождённых задач) к классу ``name``."""
+    token = current_lane.set(name)
+    try:
+        yield
+    finally:
+        current_lane.reset(token)
+
+
+class Admission:
+    """Общий лимит одновременных запросов с бюджетами и приоритетом классов."""
+
+    def __init__(
+        self, limit: int, budgets: dict[str, int], *, full: int | None = None
+    ) -> None:
+        self.limit = max(1, limit)
+        # Лимит, для которого заданы бюджеты (по умолчанию — начальный)
+        self.full = max(self.limit, full or 0)
+        # Класс без бюджета ограничен только общим лимитом
+        self.budgets = {name: max(1, budget) for name, budget in budgets.items()}
+        self._active = dict.fromkeys(PRIORITY, 0)
+        self._total = 0
+        self._waiters: dict[str, deque[asyncio.Future[None]]] = {
+            name: deque() for name in PRIORITY
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return self._total
+
+    def waiting(self, name: str | None = None) -> int:
+        names = (name,) if name else PRIORITY
+        return sum(len(self._waiters[n]) for n in names)
+
+    def budget(self, name: str) -> int:
+        """Бюджет класса при текущем общем лимите (не меньше одного слота)."""
+        budget = self.budgets.get(name)
+        if budget is None:
+            return self.limit
+        return max(1, min(budget, budget * self.limit // self.full))
+
+    def _can_run(self, name: str) -> bool:
+        return self._total < self.limit and self._active[name] < self.budget(name)
+
+    def _take(self, name: str) -> None:
+        self._active[name] += 1
+        self._total += 1
+
+    async def acquire(self, name: str) -> None:
+        if self._can_run(name) and not self._waiters[name]:
+            self._take(name)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[name].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже выдан, но ожидающий отменён — вернуть слот
+                self.release(name)
+            elif future in self._waiters[name]:
+                self._waiters[name].remove(future)
+            raise
+
+    def release(self, name: str) -> None:
+        self._active[name] -= 1
+        self._total -= 1
+        self.wake()
+
+    def wake(self) -> None:
+        """Раздать свободные слоты ожидающим в порядке приоритета классов."""
+        for name in PRIORITY:
+            waiters = self._waiters[name]
+            while waiters and self._can_run(name):
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                self._take(name)
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, name: str | None = None) -> AsyncIterator[None]:
+        """Занять слот класса ``name`` (по умолчанию — текущего lane)."""
+        name = name or current_lane.get()
+        start = time.perf_counter()
+        await self.acquire(name)
+        admitted = time.perf_counter()
+        metrics.API_ADMISSION_WAIT.labels(name).observe(admitted - start)
+        try:
+            yield
+        finally:
+            self.release(name)
+            metrics.API_LANE_LATENCY.labels(name).observe(time.perf_counter() - start)
+
+
+class AIMDLimit:
+    """Общий лимит ``Admission``, подстраиваемый под backend (AIMD).
+
+    Успешный быстрый ответ при загруженном лимите добавляет ``1/limit``
+    (примерно +1 за «круг» запросов). Ответ 429/5xx, сетевая ошибка или
+    латентность выше ``target`` умножают лимит на ``decrease`` — не чаще раза
+    за ``target`` секунд, чтобы одна волна медленных ответов не обнуляла лимит.
+    Лишние запросы ждут в очереди ``Admission``.
+    """
+
+    def __init__(
+        self,
+        gate: Admission,
+        *,
+        minimum: int,
+        maximum: int,
+        target: float,
+        decrease: float = 0.7,
+    ) -> None:
+        self.gate = gate
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target = target
+        self.decrease = decrease
+        self.value = float(min(max(gate.limit, self.minimum), self.maximum))
+        self._cut_at = float("-inf")
+        self._apply()
+
+    def record(self, ok: bool, elapsed: float) -> None:
+        """Учесть исход запроса: ``ok`` — ответ не 429/5xx и без ошибки сети."""
+        if not ok or elapsed > self.target:
+            now = time.monotonic()
+            if now - self._cut_at < self.target:
+                return
+            self._cut_at = now
+            self.value = max(self.minimum, self.value * self.decrease)
+        elif self.gate.in_flight + self.gate.waiting() >= self.gate.limit:
+            # Расти, только когда лимит действительно сдерживает запросы
+            self.value = min(self.maximum, self.value + 1 / self.value)
+        else:
+            return
+        self._apply()
+
+    def _apply(self) -> None:
+        limit = int(self.value)
+        if limit != self.gate.limit:
+            grew = limit > self.gate.limit
+            self.gate.limit = limit
+            if grew:
+                self.gate.wake()
+        metrics.API_CONCURRENCY_LIMIT.set(self.gate.limit)
+
+
+controller = Admission(
+    settings.api_concurrency_limit // 2,
+    {
+        UPLOAD: settings.api_upload_concurrency,
+        BACKGROUND: settings.api_background_concurrency,
+    },
+    full=settings.api_concurrency_limit,
+)
+limiter = AIMDLimit(
+    controller,
+    minimum=settings.api_concurrency_min,
+    maximum=settings.api_concurrency_limit,
+    target=settings.api_latency_target,
+)
@@ -2,17 +2,31 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import logging
-from typing import Any
+import os
+import tempfile
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from typing import Any, TypeVar
 
 import httpx
+from aiogram.types import BufferedInputFile, FSInputFile
 
 from ..config import settings
+from ..utils import jsonlib, metrics, tracing
+from . import admission, resilience
+from .models import Delegation, Response, Shift, Task
 
 logger = logging.getLogger(__name__)
 
 REQUEST_TIMEOUT = 30.0
 
+# Размер страницы для постраничных итераторов
+PAGE_SIZE = 100
+
 # Shared httpx client для переиспользования соединений
 _shared_client: httpx.AsyncClient | None = None
 
@@ -33,6 +47,83 @@ async def close_http_client() -> None:
         _shared_client = None
 
 
+M = TypeVar("M")
+
+
+async def _mapped(
+    model: Callable[[dict[str, Any]], M], items: AsyncIterator[dict[str, Any]]
+) -> AsyncIterator[M]:
+    """Обернуть элементы потока в модель (закрытие закрывает и поток)."""
+    try:
+        async for item in items:
+            yield model(item)
+    finally:
+        await items.aclose()
+
+
+class Download:
+    """Скачанный файл: в памяти (``content``) или во временном файле (``path``).
+
+    Используется как контекстный менеджер — временный файл удаляется на выходе.
+    """
+
+    __slots__ = ("content", "path")
+
+    def __init__(self, content: bytes | None = None, path: str | None = None) -> None:
+        self.content = content
+        self.path = path
+
+    def input_file(self, filename: str) -> BufferedInputFile | FSInputFile:
+        """Файл для отправки в Telegram без промежуточной копии."""
+        if self.path is not None:
+            return FSInputFile(self.path, filename=filename)
+        return BufferedInputFile(self.content or b"", filename=filename)
+
+    def close(self) -> None:
+        if self.path is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(self.path)
+            self.path = None
+
+    def __enter__(self) -> Download:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+async def _read_capped(resp: httpx.Response, limit: int, path: str) -> Download | None:
+    """Прочитать поток не больше ``limit`` байт; крупное — во временный файл."""
+    chunks: list[bytes] = []
+    size = 0
+    spool = None
+    done = False
+    try:
+        async for chunk in resp.aiter_bytes():
+            size += len(chunk)
+            if size > limit:
+                logger.warning("Файл %s больше лимита %d байт — скачивание прервано", path, limit)
+                return None
+            if spool is None and size >= settings.download_spool_threshold:
+                spool = tempfile.NamedTemporaryFile(prefix="tmbot-", delete=False)
+                spool.writelines(chunks)
+                chunks.clear()
+            if spool is not None:
+                spool.write(chunk)
+            else:
+                chunks.append(chunk)
+        done = True
+    finally:
+        if spool is not None:
+            spool.close()
+            if not done:
+                with contextlib.suppress(OSError):
+                    os.unlink(spool.name)
+    if spool is not None:
+        return Download(path=spool.name)
+    return Download(chunks[0] if len(chunks) == 1 else b"".join(chunks))
+
+
 class TaskMateAPI:
     """Async HTTP-клиент к TaskMateServer REST API."""
 
@@ -56,22 +147,124 @@ class TaskMateAPI:
         files: list[tuple[str, tuple[str, bytes, str]]] | None = None,
         data: dict[str, Any] | None = None,
         raise_for_status: bool = True,
+        idempotent: bool = False,
     ) -> httpx.Response:
-        url = f"{self._base_url}{path}"
-        client = await get_http_client()
-        resp = await client.request(
-            method,
-            url,
-            headers=self._headers(),
-            json=json,
-            params=params,
-            files=files,
-            data=data,
+        """Запрос с повторами и circuit breaker-ом группы эндпоинтов.
+
+        ``idempotent=True`` для изменяющих вызовов: отправляется заголовок
+        ``Idempotency-Key`` (один на все попытки); повторяется такой запрос
+        только при ``API_RETRY_MUTATIONS``.
+        """
+        headers = self._headers()
+        if idempotent:
+            headers[resilience.IDEMPOTENCY_HEADER] = uuid.uuid4().hex
+        retryable = method in resilience.IDEMPOTENT_METHODS or (
+            idempotent and settings.api_retry_mutations
         )
+        attempts = max(1, settings.api_retry_attempts) if retryable else 1
+        breaker = resilience.breaker_for(path)
+        endpoint = metrics.normalize_endpoint(path)
+
+        for attempt in range(1, attempts + 1):
+            probe = breaker.before_request()
+            try:
+                resp = await self._send(
+                    method, path, endpoint, headers,
+                    json=json, params=params, files=files, data=data,
+                )
+            except httpx.TransportError as e:
+                breaker.record_failure(probe)
+                if attempt == attempts:
+                    raise
+                reason = type(e).__name__
+            except BaseException:
+                # Отмена или ошибка вне сети: проба не дала результата, но
+                # должна освободить место для следующей
+                breaker.release(probe)
+                raise
+            else:
+                if not resilience.is_failure(resp.status_code):
+                    breaker.record_success(probe)
+                    break
+                breaker.record_failure(probe)
+                if attempt == attempts:
+                    break
+                reason = str(resp.status_code)
+            metrics.API_RETRIES.labels(method, endpoint, reason).inc()
+            delay = resilience.retry_delay(attempt)
+            logger.info(
+                "API %s %s: %s, повтор %d/%d через %.2f с",
+                method, endpoint, reason, attempt, attempts - 1, delay,
+            )
+            await asyncio.sleep(delay)
+
         if raise_for_status:
             resp.raise_for_status()
         return resp
 
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        endpoint: str,
+        headers: dict[str, str],
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Одна попытка запроса с метрикой и span-ом."""
+        client = await get_http_client()
+        lane = admission.UPLOAD if kwargs.get("files") else None
+        async with admission.controller.slot(lane):
+            return await self._send_admitted(client, method, path, endpoint, headers, **kwargs)
+
+    async def _send_admitted(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        endpoint: str,
+        headers: dict[str, str],
+        **kwargs: Any,
+    ) -> httpx.Response:
+        status = "error"
+        # Исход для адаптивного лимита; отмену (None) и загрузки файлов (их
+        # время зависит от размера тела) не учитываем
+        ok: bool | None = False
+        start = time.perf_counter()
+        try:
+            with tracing.span(
+                f"TaskMateAPI {method} {endpoint}",
+                kind=tracing.SpanKind.CLIENT,
+                **{"http.request.method": method, "url.path": path},
+            ) as span:
+                resp = await client.request(
+                    method,
+                    f"{self._base_url}{path}",
+                    headers=tracing.inject_headers(dict(headers)),
+                    **kwargs,
+                )
+                span.set_attribute("http.response.status_code", resp.status_code)
+            status = str(resp.status_code)
+            ok = resp.status_code != 429 and resp.status_code < 500
+        except asyncio.CancelledError:
+            ok = None
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.API_REQUEST_LATENCY.labels(method, endpoint, status).observe(elapsed)
+            if ok is not None and not kwargs.get("files"):
+                admission.limiter.record(ok, elapsed)
+        return resp
+
+    @staticmethod
+    async def _json(resp: httpx.Response) -> Any:
+        """Тело ответа из байтов (крупные — в отдельном потоке)."""
+        return await jsonlib.aloads(resp.content)
+
+    async def _fetch(self, path: str, params: dict[str, Any] | None = None) -> Response:
+        """GET с разбором тела в ``Response`` прямо из байтов."""
+        resp = await self._request("GET", path, params=params)
+        return Response(await self._json(resp) if resp.content else {})
+
     # --- Аутентификация ---
 
     async def login(self, login: str, password: str) -> dict[str, Any]:
@@ -79,7 +272,7 @@ class TaskMateAPI:
         resp = await self._request(
             "POST", "/session", json={"login": login, "password": password}
         )
-        return resp.json()
+        return await self._json(resp)
 
     async def logout(self) -> None:
         """DELETE /session — выход."""
@@ -88,26 +281,34 @@ class TaskMateAPI:
     async def current_user(self) -> dict[str, Any]:
         """GET /session/current — текущий пользователь."""
         resp = await self._request("GET", "/session/current")
-        return resp.json()
+        return await self._json(resp)
 
     # --- Задачи ---
 
     async def get_tasks(self, params: dict[str, Any] | None = None) -> dict[str, Any]:
         """GET /tasks — список задач."""
         resp = await self._request("GET", "/tasks", params=params)
-        return resp.json()
+        return await self._json(resp)
 
     async def get_task(self, task_id: int) -> dict[str, Any]:
         """GET /tasks/{id} — детали задачи."""
         resp = await self._request("GET", f"/tasks/{task_id}")
-        return resp.json()
+        return await self._json(resp)
+
+    async def fetch_tasks(self, params: dict[str, Any] | None = None) -> list[Task]:
+        """GET /tasks — список задач моделями."""
+        return list((await self._fetch("/tasks", params)).tasks())
+
+    async def fetch_task(self, task_id: int) -> Task | None:
+        """GET /tasks/{id} — задача моделью (``None`` при пустом ответе)."""
+        return (await self._fetch(f"/tasks/{task_id}")).task()
 
     async def get_my_history(
         self, params: dict[str, Any] | None = None
     ) -> dict[str, Any]:
         """GET /tasks/my-history — история моих задач."""
         resp = await self._request("GET", "/tasks/my-history", params=params)
-        return resp.json()
+        return await self._json(resp)
 
     async def update_task_status(
         self,
@@ -127,28 +328,34 @@ class TaskMateAPI:
             if complete_for_all:
                 data["complete_for_all"] = "1"
             resp = await self._request(
-                "PATCH", f"/tasks/{task_id}/status", files=files, data=data
+                "PATCH",
+                f"/tasks/{task_id}/status",
+                files=files,
+                data=data,
+                idempotent=True,
             )
         else:
             body: dict[str, Any] = {"status": status}
             if complete_for_all:
                 body["complete_for_all"] = True
-            resp = await self._request("PATCH", f"/tasks/{task_id}/status", json=body)
-        return resp.json()
+            resp = await self._request(
+                "PATCH", f"/tasks/{task_id}/status", json=body, idempotent=True
+            )
+        return await self._json(resp)
 
     # --- Смены ---
 
     async def get_my_current_shift(self) -> dict[str, Any]:
         """GET /shifts/my/current — моя текущая смена."""
         resp = await self._request("GET", "/shifts/my/current")
-        return resp.json()
+        return await self._json(resp)
 
     async def get_my_shifts(
         self, params: dict[str, Any] | None = None
     ) -> dict[str, Any]:
         """GET /shifts/my — мои смены."""
         resp = await self._request("GET", "/shifts/my", params=params)
-        return resp.json()
+        return await self._json(resp)
 
     async def open_shift(
         self,
@@ -170,8 +377,9 @@ class TaskMateAPI:
             "/shifts",
             files=[("opening_photo", (filename, content, mime))],
             data=data,
+            idempotent=True,
         )
-        return resp.json()
+        return await self._json(resp)
 
     async def get_available_schedules(self, dealership_id: int) -> list[dict[str, Any]]:
         """GET /shifts/available-schedules — доступные расписания смен для автосалона."""
@@ -180,7 +388,7 @@ class TaskMateAPI:
             "/shifts/available-schedules",
             params={"dealership_id": dealership_id},
         )
-        result = resp.json()
+        result = await self._json(resp)
         return result.get("data", result) if isinstance(result, dict) else result
 
     async def close_shift(
@@ -203,7 +411,7 @@ class TaskMateAPI:
                 f"/shifts/{shift_id}",
                 json={"status": "closed"},
             )
-        return resp.json()
+        return await self._json(resp)
 
     async def get_user_dealerships(self) -> list[dict[str, Any]]:
         """Получить список автосалонов текущего пользователя."""
@@ -225,8 +433,10 @@ class TaskMateAPI:
 
     async def approve_response(self, response_id: int) -> dict[str, Any]:
         """POST /task-responses/{id}/approve — одобрить ответ."""
-        resp = await self._request("POST", f"/task-responses/{response_id}/approve")
-        return resp.json()
+        resp = await self._request(
+            "POST", f"/task-responses/{response_id}/approve", idempotent=True
+        )
+        return await self._json(resp)
 
     async def reject_response(self, response_id: int, reason: str) -> dict[str, Any]:
         """POST /task-responses/{id}/reject — отклонить ответ."""
@@ -234,8 +444,9 @@ class TaskMateAPI:
             "POST",
             f"/task-responses/{response_id}/reject",
             json={"reason": reason},
+            idempotent=True,
         )
-        return resp.json()
+        return await self._json(resp)
 
     async def reject_all_responses(self, task_id: int, reason: str) -> dict[str, Any]:
         """POST /tasks/{id}/reject-all-responses — отклонить все ответы задачи."""
@@ -243,49 +454,76 @@ class TaskMateAPI:
             "POST",
             f"/tasks/{task_id}/reject-all-responses",
             json={"reason": reason},
+            idempotent=True,
         )
-        return resp.json()
+        return await self._json(resp)
 
     # --- Смены (все) ---
 
     async def get_shifts(self, params: dict[str, Any] | None = None) -> dict[str, Any]:
         """GET /shifts — список всех смен."""
         resp = await self._request("GET", "/shifts", params=params)
-        return resp.json()
+        return await self._json(resp)
 
     async def get_shift(self, shift_id: int) -> dict[str, Any]:
         """GET /shifts/{id} — детали смены."""
         resp = await self._request("GET", f"/shifts/{shift_id}")
-        return resp.json()
+        return await self._json(resp)
 
     async def download_shift_photo(
         self, shift_id: int, photo_type: str
-    ) -> bytes | None:
+    ) -> Download | None:
         """GET /shift-photos/{id}/{type} — скачать фото смены."""
+        path = f"/shift-photos/{shift_id}/{photo_type}"
         try:
-            resp = await self._request(
-                "GET",
-                f"/shift-photos/{shift_id}/{photo_type}",
-                raise_for_status=False,
-            )
-            if resp.status_code == 200:
-                return resp.content
+            return await self._download(f"{self._base_url}{path}", path)
         except Exception:
             logger.debug("Фото смены %s/%s недоступно", shift_id, photo_type)
         return None
 
-    async def download_proof_by_url(self, url: str) -> bytes | None:
+    async def download_proof_by_url(self, url: str) -> Download | None:
         """Скачать файл по signed URL (proof или shared proof)."""
         try:
-            client = await get_http_client()
-            resp = await client.get(url, headers=self._headers())
-            if resp.status_code == 200:
-                return resp.content
-            logger.debug("Proof download failed: %s -> %s", url, resp.status_code)
+            return await self._download(url, "proof")
         except Exception:
             logger.debug("Proof download error: %s", url)
         return None
 
+    async def _download(self, url: str, path: str) -> Download | None:
+        """Потоковое скачивание с лимитом ``DOWNLOAD_MAX_BYTES``.
+
+        Ответ больше лимита отбрасывается сразу по ``Content-Length`` или как
+        только поток его превысит. Тело от ``DOWNLOAD_SPOOL_THRESHOLD`` байт
+        пишется во временный файл вместо памяти.
+        """
+        client = await get_http_client()
+        endpoint = metrics.normalize_endpoint(path)
+        limit = settings.download_max_bytes
+        status = "error"
+        async with admission.controller.slot():
+            start = time.perf_counter()
+            try:
+                with tracing.span(
+                    f"TaskMateAPI GET {endpoint}", kind=tracing.SpanKind.CLIENT
+                ) as span:
+                    async with client.stream(
+                        "GET", url, headers=tracing.inject_headers(self._headers())
+                    ) as resp:
+                        status = str(resp.status_code)
+                        span.set_attribute("http.response.status_code", resp.status_code)
+                        if resp.status_code != 200:
+                            logger.debug("Download failed: %s -> %s", path, resp.status_code)
+                            return None
+                        length = resp.headers.get("Content-Length", "")
+                        if length.isdigit() and int(length) > limit:
+                            logger.warning("Файл %s больше лимита: %s байт", path, length)
+                            return None
+                        return await _read_capped(resp, limit, path)
+            finally:
+                metrics.API_REQUEST_LATENCY.labels("GET", endpoint, status).observe(
+                    time.perf_counter() - start
+                )
+
     # --- Dashboard ---
 
     async def get_dashboard(
@@ -293,12 +531,12 @@ class TaskMateAPI:
     ) -> dict[str, Any]:
         """GET /dashboard — данные дашборда."""
         resp = await self._request("GET", "/dashboard", params=params)
-        return resp.json()
+        return await self._json(resp)
 
     async def get_dealership(self, dealership_id: int) -> dict[str, Any]:
         """GET /dealerships/{id} — получить автосалон по id (включает timezone)."""
         resp = await self._request("GET", f"/dealerships/{dealership_id}")
-        return resp.json()
+        return await self._json(resp)
 
     # --- Делегирование ---
 
@@ -312,20 +550,36 @@ class TaskMateAPI:
         body: dict[str, Any] = {"to_user_id": to_user_id}
         if reason:
             body["reason"] = reason
-        resp = await self._request("POST", f"/tasks/{task_id}/delegations", json=body)
-        return resp.json()
+        resp = await self._request(
+            "POST", f"/tasks/{task_id}/delegations", json=body, idempotent=True
+        )
+        return await self._json(resp)
 
     async def get_delegations(
         self, params: dict[str, Any] | None = None
     ) -> dict[str, Any]:
         """GET /task-delegations — список делегаций."""
         resp = await self._request("GET", "/task-delegations", params=params)
-        return resp.json()
+        return await self._json(resp)
+
+    async def fetch_delegations(
+        self, params: dict[str, Any] | None = None
+    ) -> list[Delegation]:
+        """GET /task-delegations — список делегаций моделями."""
+        return list((await self.fetch_delegations_page(params)).delegations())
+
+    async def fetch_delegations_page(
+        self, params: dict[str, Any] | None = None
+    ) -> Response:
+        """GET /task-delegations — одна страница с ``meta`` (``total``, ``last_page``)."""
+        return await self._fetch("/task-delegations", params)
 
     async def accept_delegation(self, delegation_id: int) -> dict[str, Any]:
         """POST /task-delegations/{id}/accept — принять делегирование."""
-        resp = await self._request("POST", f"/task-delegations/{delegation_id}/accept")
-        return resp.json()
+        resp = await self._request(
+            "POST", f"/task-delegations/{delegation_id}/accept", idempotent=True
+        )
+        return await self._json(resp)
 
     async def reject_delegation(
         self, delegation_id: int, reason: str
@@ -335,15 +589,111 @@ class TaskMateAPI:
             "POST",
             f"/task-delegations/{delegation_id}/reject",
             json={"reason": reason},
+            idempotent=True,
         )
-        return resp.json()
+        return await self._json(resp)
 
     async def cancel_delegation(self, delegation_id: int) -> dict[str, Any]:
         """POST /task-delegations/{id}/cancel — отменить делегирование."""
-        resp = await self._request("POST", f"/task-delegations/{delegation_id}/cancel")
-        return resp.json()
+        resp = await self._request(
+            "POST", f"/task-delegations/{delegation_id}/cancel", idempotent=True
+        )
+        return await self._json(resp)
 
     async def get_users(self, params: dict[str, Any] | None = None) -> dict[str, Any]:
         """GET /users — список пользователей."""
         resp = await self._request("GET", "/users", params=params)
-        return resp.json()
+        return await self._json(resp)
+
+    async def get_all_users(
+        self, params: dict[str, Any] | None = None, *, per_page: int = PAGE_SIZE
+    ) -> list[dict[str, Any]]:
+        """GET /users — все страницы списка пользователей."""
+        return [u async for u in self.iter_users(params, per_page=per_page)]
+
+    # --- Постраничные итераторы ---
+
+    async def _paginate(
+        self,
+        path: str,
+        params: dict[str, Any] | None,
+        *,
+        limit: int | None = None,
+        per_page: int = PAGE_SIZE,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Элементы всех страниц ``path`` по порядку.
+
+        Страница N+1 запрашивается, пока вызывающий обходит страницу N, —
+        в памяти не больше двух страниц. ``limit`` останавливает обход (и
+        уменьшает ``per_page``, чтобы не тянуть лишнее).
+        """
+        if limit is not None:
+            if limit <= 0:
+                return
+            per_page = min(per_page, limit)
+        base = {**(params or {}), "per_page": per_page}
+        page = 1
+        pending: asyncio.Future[Response] | None = asyncio.ensure_future(
+            self._fetch(path, {**base, "page": page})
+        )
+        left = limit
+        try:
+            while pending is not None:
+                result = await pending
+                pending = None
+                data = result.items()
+                last_page = result.last_page
+                # Backend может урезать per_page — при известном last_page
+                # короткая страница не означает конец
+                if last_page is not None:
+                    more = bool(data) and page < last_page
+                else:
+                    more = len(data) >= per_page
+                if more and (left is None or left > len(data)):
+                    page += 1
+                    pending = asyncio.ensure_future(self._fetch(path, {**base, "page": page}))
+                for item in data:
+                    yield item
+                    if left is not None:
+                        left -= 1
+                        if left == 0:
+                            return
+        finally:
+            if pending is not None:
+                # Обход прерван: предзагрузка не нужна, её ошибку не логируем
+                pending.cancel()
+                pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    def iter_tasks(
+        self, params: dict[str, Any] | None = None, *, limit: int | None = None
+    ) -> AsyncIterator[Task]:
+        """GET /tasks — задачи всех страниц моделями."""
+        return _mapped(Task, self._paginate("/tasks", params, limit=limit))
+
+    def iter_my_history(
+        self, params: dict[str, Any] | None = None, *, limit: int | None = None
+    ) -> AsyncIterator[Task]:
+        """GET /tasks/my-history — история задач всех страниц."""
+        return _mapped(Task, self._paginate("/tasks/my-history", params, limit=limit))
+
+    def iter_shifts(
+        self, params: dict[str, Any] | None = None, *, limit: int | None = None
+    ) -> AsyncIterator[Shift]:
+        """GET /shifts — смены всех страниц."""
+        return _mapped(Shift, self._paginate("/shifts", params, limit=limit))
+
+    def iter_delegations(
+        self, params: dict[str, Any] | None = None, *, limit: int | None = None
+    ) -> AsyncIterator[Delegation]:
+        """GET /task-delegations — делегирования всех страниц."""
+        return _mapped(Delegation, self._paginate("/task-delegations", params, limit=limit))
+
+    def iter_users(
+        self,
+        params: dict[str, Any] | None = None,
+        *,
+        limit: int | None = None,
+        per_page: int = PAGE_SIZE,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """GET /users — пользователи всех страниц."""
+        return self._paginate("/users", params, limit=limit, per_page=per_page)
@@ -0,0 +1,214 @@
+"""Типизированные модели ответов TaskMateServer API.
+
+Модели со ``__slots__`` хранят исходный dict (``raw``) — шаблоны сообщений и
+``tz_utils`` работают с ним, — а часто читаемые поля разбирают один раз при
+создании. Производные значения (исполнители, дедлайн) считаются лениво при
+первом обращении, элементы списков оборачиваются по мере итерации.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from datetime import datetime
+from typing import Any, TypeVar
+
+from ..utils import jsonlib
+
+M = TypeVar("M")
+
+# Маркер «ещё не вычислено» для ленивых полей (None — допустимое значение)
+_UNSET: Any = object()
+
+
+def _as_id(value: Any) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _user_id(obj: dict[str, Any] | None) -> int | None:
+    """id пользователя из ``{"user_id": …}`` или ``{"user": {"id": …}}``."""
+    if not obj:
+        return None
+    uid = obj.get("user_id") or (obj.get("user") or {}).get("id")
+    return uid if type(uid) is int else _as_id(uid)
+
+
+def _dealership_id(raw: dict[str, Any]) -> int | None:
+    """Автосалон из ``dealership_id`` или вложенного ``dealership``."""
+    return _as_id(raw.get("dealership_id")) or _as_id((raw.get("dealership") or {}).get("id"))
+
+
+def parse_datetime(value: Any) -> datetime | None:
+    """ISO 8601 из API (``Z`` — UTC); None для пустого или некорректного значения."""
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+class Task:
+    """Задача: ``GET /tasks``, ``GET /tasks/{id}``, события RabbitMQ."""
+
+    __slots__ = (
+        "raw",
+        "id",
+        "title",
+        "status",
+        "response_type",
+        "priority",
+        "_assigned_user_ids",
+        "_deadline",
+        "_created_at",
+        "_updated_at",
+    )
+
+    def __init__(self, raw: dict[str, Any]) -> None:
+        self.raw = raw
+        self.id: int = raw["id"]
+        self.title: str = raw.get("title", "")
+        self.status: str = raw.get("status", "")
+        self.response_type: str = raw.get("response_type", "")
+        self.priority: str = raw.get("priority", "medium")
+        self._assigned_user_ids: frozenset[int] = _UNSET
+        self._deadline: datetime | None = _UNSET
+        self._created_at: datetime | None = _UNSET
+        self._updated_at: datetime | None = _UNSET
+
+    @classmethod
+    def of(cls, task: Task | dict[str, Any]) -> Task:
+        """Модель из dict; готовая модель возвращается как есть."""
+        return task if isinstance(task, Task) else cls(task)
+
+    @property
+    def assigned_user_ids(self) -> frozenset[int]:
+        """id исполнителей задачи."""
+        if self._assigned_user_ids is _UNSET:
+            ids = {_user_id(a) for a in self.raw.get("assignments") or ()}
+            ids.discard(None)
+            self._assigned_user_ids = frozenset(ids)
+        return self._assigned_user_ids
+
+    def is_assigned(self, user_id: int) -> bool:
+        return user_id in self.assigned_user_ids
+
+    @property
+    def deadline(self) -> datetime | None:
+        """Дедлайн (None — нет или не разобран)."""
+        if self._deadline is _UNSET:
+            self._deadline = parse_datetime(self.raw.get("deadline"))
+        return self._deadline
+
+    @property
+    def created_at(self) -> datetime | None:
+        if self._created_at is _UNSET:
+            self._created_at = parse_datetime(self.raw.get("created_at"))
+        return self._created_at
+
+    @property
+    def updated_at(self) -> datetime | None:
+        if self._updated_at is _UNSET:
+            self._updated_at = parse_datetime(self.raw.get("updated_at"))
+        return self._updated_at
+
+    @property
+    def dealership_id(self) -> int | None:
+        return _dealership_id(self.raw)
+
+    @property
+    def is_completed(self) -> bool:
+        return self.status in ("completed", "completed_late")
+
+
+class Shift:
+    """Смена: ``GET /shifts``, ``GET /shifts/my/current``."""
+
+    __slots__ = ("raw", "id", "status", "user_id")
+
+    def __init__(self, raw: dict[str, Any]) -> None:
+        self.raw = raw
+        self.id: int | None = _as_id(raw.get("id"))
+        self.status: str = raw.get("status", "")
+        self.user_id = _user_id(raw)
+
+    @property
+    def dealership_id(self) -> int | None:
+        return _dealership_id(self.raw)
+
+
+class Delegation:
+    """Делегирование задачи: ``GET /task-delegations``."""
+
+    __slots__ = ("raw", "id", "status", "task_id", "from_user_id", "to_user_id")
+
+    def __init__(self, raw: dict[str, Any]) -> None:
+        self.raw = raw
+        self.id: int = raw["id"]
+        self.status: str = raw.get("status", "")
+        self.task_id = _as_id(raw.get("task_id") or (raw.get("task") or {}).get("id"))
+        self.from_user_id = _as_id((raw.get("from_user") or {}).get("id"))
+        self.to_user_id = _as_id((raw.get("to_user") or {}).get("id"))
+
+
+class Response:
+    """Конверт ответа API: ``{"data": …, "meta": …}`` или сам объект."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: Any) -> None:
+        self.raw = raw
+
+    @classmethod
+    def from_bytes(cls, content: bytes) -> Response:
+        """Разобрать тело ответа без промежуточной строки."""
+        return cls(jsonlib.loads(content) if content else {})
+
+    @property
+    def data(self) -> Any:
+        """``data`` конверта; без конверта — сам ответ."""
+        if isinstance(self.raw, dict):
+            return self.raw.get("data", self.raw)
+        return self.raw
+
+    def items(self) -> list[dict[str, Any]]:
+        """Элементы списочного ответа (пустой список, если ``data`` не список)."""
+        data = self.data
+        return data if isinstance(data, list) else []
+
+    @property
+    def last_page(self) -> int | None:
+        if not isinstance(self.raw, dict):
+            return None
+        meta = self.raw.get("meta") or self.raw
+        return _as_id(meta.get("last_page"))
+
+    @property
+    def total(self) -> int | None:
+        """Всего элементов по ``meta.total`` (если API его вернул)."""
+        if not isinstance(self.raw, dict):
+            return None
+        meta = self.raw.get("meta") or self.raw
+        return _as_id(meta.get("total"))
+
+    def iter(self, model: Callable[[dict[str, Any]], M]) -> Iterator[M]:
+        """Элементы, обёрнутые в ``model`` по мере итерации."""
+        return map(model, self.items())
+
+    def tasks(self) -> Iterator[Task]:
+        return self.iter(Task)
+
+    def shifts(self) -> Iterator[Shift]:
+        return self.iter(Shift)
+
+    def delegations(self) -> Iterator[Delegation]:
+        return self.iter(Delegation)
+
+    def task(self) -> Task | None:
+        """Задача из ответа; ``None`` — пустой ответ или объект без ``id``."""
+        data = self.data
+        if not isinstance(data, dict) or data.get("id") is None:
+            return None
+        return Task(data)
@@ -0,0 +1,136 @@
+"""Повторы и circuit breaker для запросов к TaskMateServer API.
+
+- Повторяются только безопасные запросы: идемпотентные методы (GET, PUT,
+  DELETE…), а при ``API_RETRY_MUTATIONS=true`` — и изменяющие запросы с
+  заголовком ``Idempotency-Key`` (ключ один на логический вызов, повторы
+  отправляют тот же; включать, только если backend отбрасывает дубликаты по
+  ключу). Повод — сетевая ошибка или ответ 502/503/504; задержка —
+  экспоненциальная с полным jitter.
+- Circuit breaker — на группу эндпоинтов (первый сегмент пути: ``tasks``,
+  ``shifts``, ``task-delegations``…). После ``API_BREAKER_FAILURES`` сбоев
+  подряд группа «открыта»: запросы сразу падают с ``CircuitOpenError``, не
+  нагружая backend. Через ``API_BREAKER_RESET`` секунд пропускаются пробные
+  запросы по одному; ``API_BREAKER_PROBES`` успехов подряд закрывают breaker,
+  любой сбой снова открывает его.
+
+Состояние видно в метрике ``tmbot_api_circuit_state`` (0 — закрыт,
+1 — пробы, 2 — открыт).
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+
+import httpx
+
+from ..config import settings
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Группа эндпоинтов временно недоступна — запрос не отправлялся."""
+
+
+def retry_delay(attempt: int) -> float:
+    """Задержка перед повтором ``attempt`` (1, 2, …): full jitter."""
+    cap = min(settings.api_retry_max_delay, settings.api_retry_base_delay * 2 ** (attempt - 1))
+    return random.uniform(0, cap)
+
+
+def is_failure(status_code: int) -> bool:
+    """Ответ, который считается сбоем backend-а (для повтора и breaker-а)."""
+    return status_code in RETRY_STATUSES
+
+
+class CircuitBreaker:
+    """Breaker одной группы эндпоинтов."""
+
+    def __init__(self, group: str) -> None:
+        self.group = group
+        self.state = CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._export()
+
+    def _export(self) -> None:
+        metrics.API_CIRCUIT_STATE.labels(self.group).set(_STATE_VALUES[self.state])
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Circuit breaker API %s: %s → %s", self.group, self.state, state)
+            self.state = state
+            self._export()
+
+    def before_request(self) -> bool:
+        """Пропустить запрос или отказать ``CircuitOpenError``.
+
+        Возвращает True, если запрос — пробный (breaker в состоянии проб).
+        """
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < settings.api_breaker_reset:
+                raise CircuitOpenError(f"TaskMate API /{self.group}: circuit open")
+            self._set_state(HALF_OPEN)
+            self._successes = 0
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(f"TaskMate API /{self.group}: probing")
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self, probe: bool) -> None:
+        if probe:
+            self._probe_in_flight = False
+            self._successes += 1
+            if self._successes >= settings.api_breaker_probes:
+                self._set_state(CLOSED)
+        self._failures = 0
+
+    def release(self, probe: bool) -> None:
+        """Проба завершилась без ответа (отмена, ошибка вне сети) — не в счёт."""
+        if probe:
+            self._probe_in_flight = False
+
+    def record_failure(self, probe: bool) -> None:
+        if probe:
+            self._probe_in_flight = False
+        self._failures += 1
+        if probe or self._failures >= settings.api_breaker_failures:
+            self._opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def endpoint_group(path: str) -> str:
+    """``/tasks/15/status`` → ``tasks``."""
+    return path.lstrip("/").split("/", 1)[0] or "root"
+
+
+def breaker_for(path: str) -> CircuitBreaker:
+    group = endpoint_group(path)
+    breaker = _breakers.get(group)
+    if breaker is None:
+        breaker = _breakers[group] = CircuitBreaker(group)
+    return breaker
+
+
+def reset_breakers() -> None:
+    """Сбросить все breaker-ы (тесты, бенчмарки)."""
+    for breaker in _breakers.values():
+        metrics.API_CIRCUIT_STATE.remove(breaker.group)
+    _breakers.clear()
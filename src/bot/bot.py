@@ -2,37 +2,248 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from typing import Any, Awaitable, Callable
 
 import httpx
 from aiogram import BaseMiddleware, Bot, Dispatcher, Router
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
 from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.fsm.storage.base import StateType, StorageKey
 from aiogram.fsm.storage.redis import RedisStorage
-from aiogram.types import CallbackQuery, Message, TelegramObject
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update
+from redis.asyncio import Redis
 
 from ..config import settings
+from ..storage import task_index
 from ..storage.notifications import clear_notified
 from ..storage.sessions import delete_session, get_fsm_redis, get_session, refresh_session_ttl
+from ..utils import metrics, tracing
 from . import keyboards
 
 logger = logging.getLogger(__name__)
 
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Request-middleware сессии бота: латентность Bot API, число 429 и span."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = type(method).__name__
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"telegram {name}", kind=tracing.SpanKind.CLIENT):
+                return await make_request(bot, method)
+        except TelegramRetryAfter:
+            metrics.TELEGRAM_RETRY_AFTER.labels(name).inc()
+            raise
+        except Exception as e:
+            metrics.TELEGRAM_ERRORS.labels(name, type(e).__name__).inc()
+            raise
+        finally:
+            metrics.TELEGRAM_REQUEST_LATENCY.labels(name).observe(
+                time.perf_counter() - start
+            )
+
+
 bot = Bot(
     token=settings.telegram_bot_token,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML),
 )
+bot.session.middleware(TelegramMetricsMiddleware())
 
 
-async def create_dispatcher() -> Dispatcher:
-    """Создать Dispatcher с Redis хранилищем."""
-    redis_client = await get_fsm_redis()
-    storage = RedisStorage(redis_client)
-    return Dispatcher(storage=storage)
+class TracingMiddleware(BaseMiddleware):
+    """Корневой span апдейта: включает ожидание очереди чата и обработку."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        chat = data.get("event_chat")
+        with tracing.span(
+            "update",
+            kind=tracing.SpanKind.SERVER,
+            **{
+                "telegram.update_id": getattr(event, "update_id", 0),
+                "telegram.update_type": getattr(event, "event_type", "unknown"),
+                "telegram.chat_id": chat.id if chat else 0,
+            },
+        ):
+            return await handler(event, data)
+
+
+# Ключ data: корутина-функция, которую UpdateSchedulerMiddleware выполняет,
+# заняв очередь чата, но до общего слота (окно сбора альбома)
+CHAT_PRELUDE = "chat_prelude"
+
+
+class UpdateSchedulerMiddleware(BaseMiddleware):
+    """Outer-middleware апдейтов: глобальный лимит и очередь на каждый чат.
+
+    aiogram запускает каждый апдейт отдельной задачей без ограничений. Здесь
+    апдейты одного чата выполняются строго по очереди (FSM-данные чата не
+    гоняются между параллельными обработчиками), а общее число одновременно
+    работающих обработчиков ограничено ``max_concurrency``. Чат сначала ждёт
+    своей очереди и только потом занимает общий слот, поэтому длинная очередь
+    одного чата не блокирует остальные. ``data[CHAT_PRELUDE]``, если задан,
+    выполняется в очереди чата до занятия общего слота.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._chat_locks: dict[int, asyncio.Lock] = {}
+        self._depth: dict[int, int] = {}
+
+    def queue_depth(self, chat_id: int) -> int:
+        """Апдейты чата в работе + в ожидании."""
+        return self._depth.get(chat_id, 0)
+
+    def queue_depths(self) -> dict[int, int]:
+        """Снимок глубины очередей по чатам (только непустые)."""
+        return dict(self._depth)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        chat = data.get("event_chat")
+        prelude = data.pop(CHAT_PRELUDE, None)
+        if chat is None:
+            if prelude is not None:
+                await prelude()
+            async with self._semaphore:
+                return await handler(event, data)
+
+        chat_id = chat.id
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        depth = self._depth[chat_id] = self._depth.get(chat_id, 0) + 1
+        metrics.set_update_queue_depth(chat_id, depth)
+        try:
+            async with lock:
+                if prelude is not None:
+                    await prelude()
+                async with self._semaphore:
+                    return await handler(event, data)
+        finally:
+            depth = self._depth[chat_id] - 1
+            if depth:
+                self._depth[chat_id] = depth
+            else:
+                # Очередь чата пуста — не держать lock для неактивных чатов
+                del self._depth[chat_id]
+                self._chat_locks.pop(chat_id, None)
+            metrics.set_update_queue_depth(chat_id, depth)
+
+
+update_scheduler = UpdateSchedulerMiddleware(settings.update_concurrency_limit)
+
 
+class MediaGroupMiddleware(BaseMiddleware):
+    """Outer-middleware апдейтов: собирает альбом (media_group) в один апдейт.
 
+    Первое сообщение альбома сразу встаёт в очередь чата и, дождавшись её,
+    ждёт ``window`` секунд (``CHAT_PRELUDE``: общий слот при этом не занят).
+    Остальные сообщения того же альбома до конца окна складываются в буфер и
+    дальше не передаются. Обработчик первого сообщения получает весь альбом в
+    ``data["album"]`` (отсортированный по message_id). Апдейт, пришедший после
+    альбома (например, «📤 Отправить»), стоит в очереди чата за ним.
+    Регистрируется перед UpdateSchedulerMiddleware.
+    """
+
+    def __init__(self, window: float) -> None:
+        self._window = window
+        self._albums: dict[tuple[int, str], list[Message]] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        message = event.message if isinstance(event, Update) else None
+        if message is None or not message.media_group_id:
+            return await handler(event, data)
+
+        key = (message.chat.id, message.media_group_id)
+        album = self._albums.get(key)
+        if album is not None:
+            album.append(message)
+            return None
+
+        album = self._albums[key] = [message]
+
+        async def collect() -> None:
+            try:
+                await asyncio.sleep(self._window)
+            finally:
+                self._albums.pop(key, None)
+            data["album"] = sorted(album, key=lambda m: m.message_id)
+
+        data[CHAT_PRELUDE] = collect
+        try:
+            return await handler(event, data)
+        finally:
+            # Апдейт отменён в очереди — буфер альбома не должен остаться
+            self._albums.pop(key, None)
+
+
+class FSMStorage(RedisStorage):
+    """RedisStorage, в котором состояние и данные сценария истекают вместе.
+
+    Ключи состояния и данных у ``RedisStorage`` отдельные, и каждая запись
+    продлевает только свой. Шаг сценария, меняющий лишь состояние, оставлял
+    данные истекать раньше, и обработчик состояния падал на ``data["…"]``.
+    Здесь запись любого из ключей продлевает и второй.
+    """
+
+    def __init__(self, redis: Redis, *, ttl: int) -> None:
+        super().__init__(redis, state_ttl=ttl, data_ttl=ttl)
+
+    async def _touch(self, key: StorageKey, part: str) -> None:
+        await self.redis.expire(self.key_builder.build(key, part), self.state_ttl)
 
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await super().set_state(key, state)
+        if state is not None:
+            await self._touch(key, "data")
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        await super().set_data(key, data)
+        if data:
+            await self._touch(key, "state")
+
+
+async def create_dispatcher() -> Dispatcher:
+    """Создать Dispatcher с Redis хранилищем."""
+    redis_client = await get_fsm_redis()
+    storage = FSMStorage(redis_client, ttl=settings.fsm_ttl)
+    dp = Dispatcher(storage=storage)
+    # Регистрируются после встроенного UserContextMiddleware, поэтому
+    # event_chat уже определён; окно альбома ждёт внутри очереди чата
+    dp.update.outer_middleware(TracingMiddleware())
+    dp.update.outer_middleware(MediaGroupMiddleware(settings.media_group_window))
+    dp.update.outer_middleware(update_scheduler)
+    return dp
 
 
 class AuthMiddleware(BaseMiddleware):
@@ -85,6 +296,7 @@ class AuthMiddleware(BaseMiddleware):
             if e.response.status_code == 401 and chat_id is not None:
                 await delete_session(chat_id)
                 await clear_notified(chat_id)
+                await task_index.clear(chat_id)
                 logger.info("Сессия просрочена для chat_id=%s, сессия удалена", chat_id)
 
                 from . import messages
@@ -102,6 +314,100 @@ class AuthMiddleware(BaseMiddleware):
             raise
 
 
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Латентность и span обработчика по роутеру и префиксу callback/команде.
+
+    Метка ``action`` — только из известных команд и префиксов callback_data,
+    всё остальное (опечатки, старые кнопки, произвольный ввод) — ``other``,
+    чтобы число рядов метрики не зависело от пользователей.
+    """
+
+    COMMANDS = frozenset(
+        {
+            "/start",
+            "/help",
+            "/login",
+            "/logout",
+            "/tasks",
+            "/task",
+            "/shift",
+            "/shifts",
+            "/delegations",
+        }
+    )
+    CALLBACKS = frozenset(
+        {
+            "ack",
+            "complete",
+            "complete_cancel",
+            "complete_confirm",
+            "proof_start",
+            "proof_submit",
+            "proof_cancel",
+            "task_detail",
+            "review_approve",
+            "review_reject",
+            "review_approve_all",
+            "review_reject_all",
+            "review_individual",
+            "reject_cancel",
+            "shift_open",
+            "shift_open_cancel",
+            "shift_dealer",
+            "shift_schedule",
+            "shift_close",
+            "shift_close_nophoto",
+            "shift_close_cancel",
+            "dlgv",
+            "dlg_start",
+            "dlg_user",
+            "dlg_page",
+            "dlg_skip",
+            "dlg_cancel_flow",
+            "dlg_accept",
+            "dlg_reject",
+            "dlg_reject_cancel",
+            "dlg_cancel",
+        }
+    )
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        router = data.get("event_router")
+        router_name = router.name if router is not None else "unknown"
+        if isinstance(event, CallbackQuery):
+            kind = "callback_query"
+            action = (event.data or "").split(":", 1)[0] or "empty"
+            if action not in self.CALLBACKS and action != "empty":
+                action = "other"
+        elif isinstance(event, Message):
+            kind = "message"
+            text = event.text or ""
+            # Команды — по имени, остальное — по типу контента (свободный
+            # текст пользователя не должен попадать в метки)
+            if text.startswith("/"):
+                action = text.split()[0].split("@")[0]
+                if action not in self.COMMANDS:
+                    action = "other"
+            else:
+                action = event.content_type
+        else:
+            kind = type(event).__name__
+            action = "-"
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"handler {router_name}:{action}"):
+                return await handler(event, data)
+        finally:
+            metrics.HANDLER_LATENCY.labels(router_name, kind, action).observe(
+                time.perf_counter() - start
+            )
+
+
 class ReplyKeyboardMiddleware(BaseMiddleware):
     """Передаёт reply_keyboard через data для автоматического прикрепления меню."""
 
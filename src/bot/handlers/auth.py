@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+import time
 
 import httpx
 from aiogram import Router
@@ -10,12 +11,13 @@ from aiogram.filters import Command
 from aiogram.types import Message
 
 from ...api.client import TaskMateAPI
-from ...storage.notifications import bulk_add_notified, clear_notified
+from ...storage import task_index
+from ...storage.notifications import clear_notified
 from ...storage.sessions import UserSession, delete_session, get_session, save_session
 from .. import keyboards, messages
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name="auth")
 
 
 @router.message(Command("login"))
@@ -70,22 +72,11 @@ async def cmd_login(message: Message) -> None:
         full_name=user.get("full_name", ""),
         role=user.get("role", ""),
         login=login,
+        # Старые задачи и события не уведомляются (см. UserSession.predates_login)
+        notify_after=time.time(),
     )
     await save_session(message.chat.id, session)
 
-    # Затушить текущие задачи, чтобы не отправлять старые уведомления
-    try:
-        authed_api = TaskMateAPI(token=token)
-        tasks_result = await authed_api.get_tasks({"per_page": 100})
-        task_ids = [t["id"] for t in tasks_result.get("data", [])]
-        if task_ids:
-            for category in ("tasks", "deadlines", "overdue", "reviews"):
-                await bulk_add_notified(message.chat.id, category, task_ids)
-    except Exception:
-        logger.debug(
-            "Не удалось затушить уведомления при логине для %s", message.chat.id
-        )
-
     await message.answer(
         messages.login_success(session.full_name, session.role),
         reply_markup=keyboards.main_menu(session.role),
@@ -107,6 +98,7 @@ async def cmd_logout(message: Message, **kwargs) -> None:
         pass
 
     await clear_notified(message.chat.id)
+    await task_index.clear(message.chat.id)
     await delete_session(message.chat.id)
     await message.answer(
         messages.logout_success(), reply_markup=keyboards.remove_menu()
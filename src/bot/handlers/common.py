@@ -7,7 +7,7 @@ from aiogram.types import Message
 from ...storage.sessions import get_session
 from .. import keyboards, messages
 
-router = Router()
+router = Router(name="common")
 
 
 @router.message(Command("start"))
@@ -2,22 +2,27 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import AsyncIterator
 from typing import Any
 
 import httpx
-from aiogram import F, Router
+from aiogram import Bot, F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
 from ...api.client import TaskMateAPI
+from ...api.models import Delegation, Response
+from ...storage import directory
 from ...storage.sessions import UserSession
 from .. import keyboards, messages
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name="delegations")
 
 
 class DelegationReason(StatesGroup):
@@ -32,124 +37,228 @@ class DelegationRejectReason(StatesGroup):
     waiting = State()
 
 
-# --- Команда /delegations ---
+# --- Сводка делегирований (/delegations и кнопка меню) ---
 
+DELEGATIONS_PAGE_SIZE = 5
+# Ожидающих делегирований (входящие и исходящие вместе) на одну сводку
+DELEGATIONS_PENDING_LIMIT = 50
+# Сколько последних завершённых делегирований показывать в истории
+DELEGATIONS_HISTORY_LIMIT = 20
+DELEGATIONS_HISTORY_STATUSES = "accepted,rejected,cancelled"
 
-@router.message(Command("delegations"))
-async def cmd_delegations(message: Message, session: UserSession, **kwargs) -> None:
-    """Список активных делегирований пользователя."""
-    reply_kb = kwargs.get("reply_keyboard")
+
+async def _collect(items: AsyncIterator[Delegation]) -> list[Delegation]:
+    return [d async for d in items]
+
+
+def _history_total(resp: Response, page: int, shown: int) -> int:
+    """Записей истории в сводке — не больше ``DELEGATIONS_HISTORY_LIMIT``."""
+    total = resp.total
+    if total is None:
+        # Без meta.total — оценка по последней странице или по полученной
+        last = resp.last_page
+        total = (
+            last * DELEGATIONS_PAGE_SIZE
+            if last
+            else page * DELEGATIONS_PAGE_SIZE + shown
+        )
+    return min(total, DELEGATIONS_HISTORY_LIMIT)
+
+
+async def _load_delegations(
+    api: TaskMateAPI, user_id: int, history_page: int = 0
+) -> tuple[dict[str, list[dict[str, Any]]], int]:
+    """Ожидающие и одна страница истории — два запроса параллельно.
+
+    Входящие и исходящие API отдаёт одним списком, поэтому ожидающие берутся
+    одним запросом не больше ``DELEGATIONS_PENDING_LIMIT``, а история листается
+    на сервере — по странице на нажатие. Возвращает группы и число записей
+    истории. Ошибка pending-запроса пробрасывается, история при ошибке пустая.
+    """
+    pending, history = await asyncio.gather(
+        _collect(
+            api.iter_delegations({"status": "pending"}, limit=DELEGATIONS_PENDING_LIMIT)
+        ),
+        api.fetch_delegations_page(
+            {
+                "status": DELEGATIONS_HISTORY_STATUSES,
+                "page": history_page + 1,
+                "per_page": DELEGATIONS_PAGE_SIZE,
+            }
+        ),
+        return_exceptions=True,
+    )
+    if isinstance(pending, BaseException):
+        raise pending
+    if isinstance(history, BaseException):
+        logger.warning("Не удалось получить историю делегирований: %s", history)
+        hist, hist_total = [], 0
+    else:
+        hist = [d.raw for d in history.delegations()]
+        hist_total = _history_total(history, history_page, len(hist))
+    groups = {
+        "in": [d.raw for d in pending if d.to_user_id == user_id],
+        "out": [d.raw for d in pending if d.from_user_id == user_id],
+        "hist": hist,
+    }
+    return groups, hist_total
+
+
+async def _delegations_view(
+    api: TaskMateAPI, user_id: int, tab: str | None, page: int
+) -> tuple[str, InlineKeyboardMarkup]:
+    """Текст и клавиатура страницы ``page`` вкладки ``tab`` (None — по умолчанию)."""
+    history_pages = -(-DELEGATIONS_HISTORY_LIMIT // DELEGATIONS_PAGE_SIZE)
+    page = min(max(page, 0), history_pages - 1) if tab == "hist" else max(page, 0)
+    groups, hist_total = await _load_delegations(
+        api, user_id, page if tab == "hist" else 0
+    )
+    counts = {"in": len(groups["in"]), "out": len(groups["out"]), "hist": hist_total}
+    if tab not in groups:
+        # По умолчанию — первая непустая вкладка
+        tab = next((key for key in ("in", "out", "hist") if counts[key]), "in")
+    total = counts[tab]
+    pages = max(1, -(-total // DELEGATIONS_PAGE_SIZE))
+    page = min(page, pages - 1)
+    if tab == "hist":
+        # История уже запрошена нужной страницей
+        chunk = groups["hist"]
+    else:
+        chunk = groups[tab][
+            page * DELEGATIONS_PAGE_SIZE:(page + 1) * DELEGATIONS_PAGE_SIZE
+        ]
+    return (
+        messages.delegations_view(tab, chunk, page, pages, total),
+        keyboards.delegations_view(tab, counts, chunk, page, pages),
+    )
+
+
+async def send_delegations_view(
+    message: Message, session: UserSession, reply_kb: Any = None
+) -> None:
+    """Одно сообщение со вкладками вместо сообщения на каждое делегирование."""
     api = TaskMateAPI(token=session.token)
     try:
-        result = await api.get_delegations({"status": "pending", "per_page": 20})
+        text, kb = await _delegations_view(api, session.user_id, None, 0)
     except Exception:
         logger.exception("Ошибка при получении делегирований")
         await message.answer(messages.error_generic(), reply_markup=reply_kb)
         return
 
-    delegations = result.get("data", [])
-    text = messages.delegation_list(delegations)
-    await message.answer(text, reply_markup=reply_kb)
-
-    # Показать кнопки действий для каждой делегации
-    for d in delegations:
-        dlg_id = d.get("id")
-        if not dlg_id:
-            continue
-        to_user_id = d.get("to_user", {}).get("id")
-        from_user_id = d.get("from_user", {}).get("id")
-
-        task = d.get("task", {})
-        task_id = task.get("id", "?")
-        task_title = task.get("title", "—")
-        task_desc = task.get("description", "")
-        deadline = task.get("deadline")
-        priority = task.get("priority", "medium")
-        from_name = d.get("from_user", {}).get("full_name", "—")
-        to_name = d.get("to_user", {}).get("full_name", "—")
-        reason = d.get("reason", "")
-
-        priority_icon = {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "⚪")
-
-        task_info = f"{priority_icon} <b>Задача #{task_id}</b>: {task_title}"
-
-        if task_desc:
-            desc_preview = task_desc[:80] + "..." if len(task_desc) > 80 else task_desc
-            task_info += f"\n   <i>{desc_preview}</i>"
-
-        if deadline:
-            from datetime import datetime
-            try:
-                dt = datetime.fromisoformat(deadline.replace("Z", "+00:00"))
-                task_info += f"\n   📅 Дедлайн: {dt.strftime('%d.%m.%Y %H:%M')}"
-            except Exception:
-                pass
-
-        if reason:
-            task_info += f"\n   💬 Причина: {reason}"
-
-        if to_user_id == session.user_id:
-            kb = keyboards.delegation_incoming_actions(dlg_id)
-            await message.answer(
-                f"📥 Делегирование #{dlg_id} от {from_name}\n\n{task_info}",
-                reply_markup=kb,
-            )
-        elif from_user_id == session.user_id:
-            kb = keyboards.delegation_cancel_button(dlg_id)
-            await message.answer(
-                f"📤 Делегирование #{dlg_id} → {to_name}\n\n{task_info}",
-                reply_markup=kb,
-            )
+    await message.answer(text, reply_markup=kb)
 
 
-# --- Поток создания делегации ---
+@router.message(Command("delegations"))
+async def cmd_delegations(message: Message, session: UserSession, **kwargs) -> None:
+    """Делегирования пользователя: входящие, исходящие, история."""
+    await send_delegations_view(message, session, reply_kb=kwargs.get("reply_keyboard"))
 
 
-@router.callback_query(F.data.startswith("dlg_start:"))
-async def cb_delegation_start(
-    callback: CallbackQuery,
-    session: UserSession,
-) -> None:
-    """Начало делегирования: показать список сотрудников."""
-    task_id = int(callback.data.split(":")[1])
+@router.callback_query(F.data.startswith("dlgv:"))
+async def cb_delegations_view(callback: CallbackQuery, session: UserSession) -> None:
+    """Переключение вкладки / страницы сводки делегирований."""
+    _, tab, page = callback.data.split(":")
     api = TaskMateAPI(token=session.token)
-
     try:
-        task_data = await api.get_task(task_id)
+        text, kb = await _delegations_view(api, session.user_id, tab, int(page))
     except Exception:
-        await callback.answer("Ошибка загрузки задачи", show_alert=True)
+        logger.exception("Ошибка при получении делегирований")
+        await callback.answer("Ошибка загрузки", show_alert=True)
         return
 
-    # Определить dealership_id задачи
-    dealership_id = task_data.get("dealership_id")
-    if not dealership_id:
-        dealership = task_data.get("dealership", {})
-        dealership_id = dealership.get("id") if dealership else None
+    try:
+        await callback.message.edit_text(text, reply_markup=kb)
+    except TelegramBadRequest:
+        # Нажата текущая вкладка/страница — сообщение не изменилось
+        pass
+    await callback.answer()
+
+
+def _view_position(data: str) -> tuple[str, int] | None:
+    """Вкладка и страница сводки из callback_data действия.
 
-    # Получить список сотрудников того же автосалона
-    params: dict[str, Any] = {"per_page": 50, "role": "employee"}
-    if dealership_id:
-        params["dealership_id"] = dealership_id
+    Кнопки сводки — ``dlg_accept:<id>:<tab>:<page>``, кнопки отдельного
+    уведомления — ``dlg_accept:<id>`` (None).
+    """
+    parts = data.split(":")
+    if len(parts) != 4:
+        return None
+    return parts[2], int(parts[3])
 
+
+async def _refresh_view(
+    bot: Bot, chat_id: int, message_id: int, session: UserSession, tab: str, page: int
+) -> None:
+    """Перерисовать сводку после действия над одним из её делегирований."""
     try:
-        users_result = await api.get_users(params)
+        text, kb = await _delegations_view(
+            TaskMateAPI(token=session.token), session.user_id, tab, page
+        )
+        await bot.edit_message_text(
+            text, chat_id=chat_id, message_id=message_id, reply_markup=kb
+        )
     except Exception:
-        await callback.answer("Ошибка загрузки сотрудников", show_alert=True)
+        logger.warning("Не удалось обновить сводку делегирований", exc_info=True)
+
+
+async def _after_action(callback: CallbackQuery, session: UserSession) -> None:
+    """Сводку — перерисовать, отдельное уведомление — оставить без кнопок."""
+    position = _view_position(callback.data)
+    if position is not None:
+        message = callback.message
+        await _refresh_view(
+            callback.bot, message.chat.id, message.message_id, session, *position
+        )
         return
+    try:
+        await callback.message.edit_reply_markup(reply_markup=None)
+    except Exception:
+        pass
+
 
-    users = users_result.get("data", [])
+# --- Поток создания делегации ---
 
-    # Исключить текущего пользователя и уже назначенных
-    assigned_ids = set()
-    for assignment in task_data.get("assignments", []):
-        uid = assignment.get("user_id") or assignment.get("user", {}).get("id")
-        if uid:
-            assigned_ids.add(uid)
 
-    eligible = [
+async def _delegation_candidates(
+    api: TaskMateAPI, task_id: int, session: UserSession
+) -> list[dict[str, Any]]:
+    """Сотрудники автосалона задачи, кроме текущего пользователя и исполнителей.
+
+    Контекст задачи и справочник берутся из кэша; ошибки API пробрасываются.
+    """
+    context = await directory.get_task_context(task_id)
+    if context is None:
+        task = await api.fetch_task(task_id)
+        if task is None:
+            return []
+        dealership_id = task.dealership_id
+        assigned_ids = set(task.assigned_user_ids)
+        await directory.set_task_context(task_id, dealership_id, assigned_ids)
+    else:
+        dealership_id, assigned_ids = context
+
+    users = await directory.get_employees(api, dealership_id)
+    return [
         u for u in users if u["id"] != session.user_id and u["id"] not in assigned_ids
     ]
 
+
+@router.callback_query(F.data.startswith("dlg_start:"))
+async def cb_delegation_start(
+    callback: CallbackQuery,
+    session: UserSession,
+) -> None:
+    """Начало делегирования: показать список сотрудников."""
+    task_id = int(callback.data.split(":")[1])
+    api = TaskMateAPI(token=session.token)
+
+    try:
+        eligible = await _delegation_candidates(api, task_id, session)
+    except Exception:
+        logger.exception("Ошибка загрузки сотрудников для задачи #%s", task_id)
+        await callback.answer("Ошибка загрузки сотрудников", show_alert=True)
+        return
+
     if not eligible:
         await callback.message.answer(messages.no_eligible_users())
         await callback.answer()
@@ -163,6 +272,32 @@ async def cb_delegation_start(
     await callback.answer()
 
 
+@router.callback_query(F.data.startswith("dlg_page:"))
+async def cb_delegation_page(
+    callback: CallbackQuery,
+    session: UserSession,
+) -> None:
+    """Листание списка сотрудников."""
+    _, task_id_str, page_str = callback.data.split(":")
+    task_id = int(task_id_str)
+    api = TaskMateAPI(token=session.token)
+
+    try:
+        eligible = await _delegation_candidates(api, task_id, session)
+    except Exception:
+        logger.exception("Ошибка загрузки сотрудников для задачи #%s", task_id)
+        await callback.answer("Ошибка загрузки сотрудников", show_alert=True)
+        return
+
+    kb = keyboards.delegation_user_selector(task_id, eligible, page=int(page_str))
+    try:
+        await callback.message.edit_reply_markup(reply_markup=kb)
+    except TelegramBadRequest:
+        # Нажата кнопка текущей страницы — клавиатура не изменилась
+        pass
+    await callback.answer()
+
+
 @router.callback_query(F.data.startswith("dlg_user:"))
 async def cb_delegation_user_selected(
     callback: CallbackQuery,
@@ -320,10 +455,7 @@ async def cb_delegation_accept(
         await callback.answer("Ошибка", show_alert=True)
         return
 
-    try:
-        await callback.message.edit_reply_markup(reply_markup=None)
-    except Exception:
-        pass
+    await _after_action(callback, session)
     await callback.message.answer(messages.delegation_accept_success(delegation_id))
     await callback.answer("✅")
 
@@ -336,12 +468,19 @@ async def cb_delegation_reject_start(
     """Начать отклонение — запросить причину."""
     delegation_id = int(callback.data.split(":")[1])
     await state.set_state(DelegationRejectReason.waiting)
-    await state.update_data(delegation_id=delegation_id)
-
-    try:
-        await callback.message.edit_reply_markup(reply_markup=None)
-    except Exception:
-        pass
+    position = _view_position(callback.data)
+    if position is not None:
+        # Сводка остаётся как есть и перерисуется после отклонения
+        await state.update_data(
+            delegation_id=delegation_id,
+            view=[callback.message.message_id, *position],
+        )
+    else:
+        await state.update_data(delegation_id=delegation_id)
+        try:
+            await callback.message.edit_reply_markup(reply_markup=None)
+        except Exception:
+            pass
     kb = keyboards.delegation_reject_cancel()
     await callback.message.answer(
         messages.delegation_reject_reason_prompt(),
@@ -378,6 +517,9 @@ async def on_delegation_reject_reason(
         return
 
     await message.answer(messages.delegation_reject_success(delegation_id))
+    if data.get("view"):
+        message_id, tab, page = data["view"]
+        await _refresh_view(message.bot, message.chat.id, message_id, session, tab, page)
 
 
 @router.callback_query(F.data == "dlg_reject_cancel")
@@ -419,10 +561,7 @@ async def cb_delegation_cancel(
         await callback.answer("Ошибка", show_alert=True)
         return
 
-    try:
-        await callback.message.edit_reply_markup(reply_markup=None)
-    except Exception:
-        pass
+    await _after_action(callback, session)
     await callback.message.answer(messages.delegation_cancel_success(delegation_id))
     await callback.answer()
 
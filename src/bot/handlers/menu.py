@@ -10,13 +10,14 @@ from aiogram import F, Router
 from aiogram.types import Message, ReplyKeyboardMarkup
 
 from ...api.client import TaskMateAPI
+from ...storage import task_index
 from ...storage.notifications import clear_notified
 from ...storage.sessions import UserSession, delete_session, get_session
 from ...utils.tz_utils import attach_dealership_timezone
 from .. import keyboards, messages
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name="menu")
 
 
 def _kb(data: dict) -> ReplyKeyboardMarkup | None:
@@ -39,7 +40,7 @@ async def btn_tasks(message: Message, session: UserSession, **kwargs) -> None:
         params["assigned_to"] = session.user_id
 
     try:
-        result = await api.get_tasks(params)
+        models = await api.fetch_tasks(params)
     except httpx.HTTPStatusError:
         raise
     except Exception:
@@ -47,15 +48,15 @@ async def btn_tasks(message: Message, session: UserSession, **kwargs) -> None:
         await message.answer(messages.error_generic(), reply_markup=kb)
         return
 
-    tasks = result.get("data", [])
+    tasks = [t.raw for t in models]
     # Для менеджеров/владельцев при просмотре общего списка задач
     # исключаем задачи со статусом `pending_review`, т.к. для них
     # есть отдельная кнопка "На проверку".
     text = (message.text or "").strip()
     if text == keyboards.BTN_TASKS and session.role in ("manager", "owner") and tasks:
         original_count = len(tasks)
-        tasks = [t for t in tasks if t.get("status") != "pending_review"]
-        logger.info(
+        tasks = [t.raw for t in models if t.status != "pending_review"]
+        logger.debug(
             "btn_tasks: role=%s — filtered out %d tasks with status=pending_review",
             session.role,
             original_count - len(tasks),
@@ -72,8 +73,8 @@ async def btn_tasks(message: Message, session: UserSession, **kwargs) -> None:
             logger.debug("Не удалось прикрепить timezone для списка задач (menu)")
 
     await message.answer(f"📋 <b>Задачи на сегодня ({len(tasks)})</b>", reply_markup=kb)
-    for t in tasks:
-        text = messages.task_list_item_text(t)
+    texts = messages.render_many(messages.task_list_item_text, tasks)
+    for t, text in zip(tasks, texts):
         item_kb = keyboards.task_list_item(t["id"])
         await message.answer(text, reply_markup=item_kb)
         await asyncio.sleep(0.05)
@@ -231,6 +232,7 @@ async def btn_logout(message: Message, **kwargs) -> None:
         pass
 
     await clear_notified(message.chat.id)
+    await task_index.clear(message.chat.id)
     await delete_session(message.chat.id)
     await message.answer(
         messages.logout_success(), reply_markup=keyboards.remove_menu()
@@ -239,123 +241,7 @@ async def btn_logout(message: Message, **kwargs) -> None:
 
 @router.message(F.text == keyboards.BTN_DELEGATIONS)
 async def btn_delegations(message: Message, session: UserSession, **kwargs) -> None:
-    """Список всех делегирований (входящие + исходящие + история)."""
-    kb = _kb(kwargs)
-    api = TaskMateAPI(token=session.token)
-
-    # Получаем все pending делегации
-    try:
-        result = await api.get_delegations({"status": "pending", "per_page": 50})
-    except Exception:
-        logger.exception("Ошибка при получении делегирований")
-        await message.answer(messages.error_generic(), reply_markup=kb)
-        return
-
-    delegations = result.get("data", [])
-
-    # Разделяем на входящие и исходящие
-    incoming = [
-        d for d in delegations
-        if d.get("to_user", {}).get("id") == session.user_id
-    ]
-    outgoing = [
-        d for d in delegations
-        if d.get("from_user", {}).get("id") == session.user_id
-    ]
-
-    # Показываем входящие с кнопками принятия/отклонения
-    if incoming:
-        await message.answer("📥 <b>Входящие запросы на делегирование</b>", reply_markup=kb)
-        for d in incoming:
-            dlg_id = d.get("id")
-            task = d.get("task", {})
-            from_user = d.get("from_user", {})
-            from_name = from_user.get("full_name", "—")
-            task_id = task.get("id", "?")
-            task_title = task.get("title", "—")
-            task_desc = task.get("description", "")
-            deadline = task.get("deadline")
-            priority = task.get("priority", "medium")
-            reason = d.get("reason", "")
-
-            priority_icon = {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "⚪")
-
-            task_info = f"{priority_icon} <b>Задача #{task_id}</b>: {task_title}"
-            if task_desc:
-                task_info += f"\n   <i>{task_desc[:60]}{'...' if len(task_desc) > 60 else ''}</i>"
-            if deadline:
-                from datetime import datetime
-                try:
-                    dt = datetime.fromisoformat(deadline.replace("Z", "+00:00"))
-                    task_info += f"\n   📅 {dt.strftime('%d.%m.%Y %H:%M')}"
-                except Exception:
-                    pass
-            if reason:
-                task_info += f"\n   💬 {reason}"
-
-            task_info += f"\n\n👤 От: {from_name}"
-
-            task_kb = keyboards.delegation_incoming_actions(dlg_id)
-            await message.answer(task_info, reply_markup=task_kb)
-    else:
-        await message.answer("📥 <b>Входящих нет</b>", reply_markup=kb)
-
-    # Показываем исходящие с кнопкой отмены
-    if outgoing:
-        await message.answer("📤 <b>Исходящие запросы на делегирование</b>")
-        for d in outgoing:
-            dlg_id = d.get("id")
-            task = d.get("task", {})
-            to_user = d.get("to_user", {})
-            to_name = to_user.get("full_name", "—")
-            task_id = task.get("id", "?")
-            task_title = task.get("title", "—")
-            priority = task.get("priority", "medium")
-
-            priority_icon = {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "⚪")
-
-            task_info = f"{priority_icon} <b>Задача #{task_id}</b>: {task_title}\n👤 Кому: {to_name}"
-
-            task_kb = keyboards.delegation_cancel_button(dlg_id)
-            await message.answer(task_info, reply_markup=task_kb)
-    else:
-        await message.answer("📤 <b>Исходящих нет</b>", reply_markup=kb)
+    """Делегирования: входящие, исходящие и история в одном сообщении."""
+    from .delegations import send_delegations_view
 
-    # История — каждое делегирование отдельным сообщением
-    try:
-        history_result = await api.get_delegations({"status": "accepted,rejected,cancelled", "per_page": 20})
-        history = history_result.get("data", [])
-    except Exception:
-        history = []
-
-    if history:
-        await message.answer("📜 <b>История делегирований</b>", reply_markup=kb)
-        for d in history:
-            dlg_id = d.get("id")
-            task = d.get("task", {})
-            from_user = d.get("from_user", {})
-            to_user = d.get("to_user", {})
-            from_name = from_user.get("full_name", "—")
-            to_name = to_user.get("full_name", "—")
-            task_id = task.get("id", "?")
-            task_title = task.get("title", "—")
-            status = d.get("status", "")
-            responded_at = d.get("responded_at")
-
-            status_icon = {"accepted": "✅", "rejected": "❌", "cancelled": "🚫"}.get(status, "⚪")
-            status_text = {"accepted": "Принято", "rejected": "Отклонено", "cancelled": "Отменено"}.get(status, status)
-
-            history_info = f"{status_icon} <b>Задача #{task_id}</b>: {task_title}\n"
-            history_info += f"   {from_name} → {to_name}\n"
-            history_info += f"   📜 {status_text}"
-            if responded_at:
-                from datetime import datetime
-                try:
-                    dt = datetime.fromisoformat(responded_at.replace("Z", "+00:00"))
-                    history_info += f" ({dt.strftime('%d.%m.%Y %H:%M')}"
-                except Exception:
-                    pass
-
-            await message.answer(history_info)
-    else:
-        await message.answer("📜 <b>История пуста</b>", reply_markup=kb)
+    await send_delegations_view(message, session, reply_kb=_kb(kwargs))
@@ -9,7 +9,7 @@ import httpx
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import BufferedInputFile, CallbackQuery, Message
+from aiogram.types import CallbackQuery, Message
 
 from ...api.client import TaskMateAPI
 from ...storage.sessions import UserSession
@@ -17,7 +17,7 @@ from .. import keyboards, messages
 from ...utils.tz_utils import attach_dealership_timezone
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name="review")
 
 
 class RejectReason(StatesGroup):
@@ -67,10 +67,12 @@ async def _send_task_card(
 
     if photo_url:
         try:
-            photo_bytes = await api.download_proof_by_url(photo_url)
-            if photo_bytes:
-                photo = BufferedInputFile(photo_bytes, filename="proof.jpg")
-                await message.answer_photo(photo=photo, caption=text, reply_markup=kb)
+            download = await api.download_proof_by_url(photo_url)
+            if download:
+                with download:
+                    await message.answer_photo(
+                        photo=download.input_file("proof.jpg"), caption=text, reply_markup=kb
+                    )
                 return
         except Exception:
             logger.debug("Не удалось отправить фото для задачи %s", task.get("id"))
@@ -189,7 +191,7 @@ async def cb_review_approve_all(callback: CallbackQuery, session: UserSession) -
     api = TaskMateAPI(token=session.token)
 
     try:
-        result = await api.get_task(task_id)
+        model = await api.fetch_task(task_id)
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             await callback.answer("Задача не найдена", show_alert=True)
@@ -199,10 +201,10 @@ async def cb_review_approve_all(callback: CallbackQuery, session: UserSession) -
         await callback.answer("Ошибка при загрузке", show_alert=True)
         return
 
-    task = result
-    if not task:
+    if model is None:
         await callback.answer("Задача не найдена", show_alert=True)
         return
+    task = model.raw
 
     pending = _find_pending_responses(task)
     if not pending:
@@ -250,7 +252,7 @@ async def cb_review_individual(callback: CallbackQuery, session: UserSession) ->
     api = TaskMateAPI(token=session.token)
 
     try:
-        result = await api.get_task(task_id)
+        model = await api.fetch_task(task_id)
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             await callback.answer("Задача не найдена", show_alert=True)
@@ -260,10 +262,10 @@ async def cb_review_individual(callback: CallbackQuery, session: UserSession) ->
         await callback.answer("Ошибка при загрузке", show_alert=True)
         return
 
-    task = result
-    if not task:
+    if model is None:
         await callback.answer("Задача не найдена", show_alert=True)
         return
+    task = model.raw
 
     pending = _find_pending_responses(task)
     if not pending:
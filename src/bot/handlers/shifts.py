@@ -12,7 +12,7 @@ from aiogram import F, Router
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import BufferedInputFile, CallbackQuery, Message
+from aiogram.types import CallbackQuery, Message
 
 from ...api.client import TaskMateAPI
 from ...storage.sessions import UserSession
@@ -20,7 +20,7 @@ from .. import keyboards, messages
 from ...utils.tz_utils import attach_dealership_timezone
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name="shifts")
 
 
 # --- FSM States ---
@@ -134,10 +134,12 @@ async def send_manager_shifts(
         shift_id = shift.get("id")
         if shift_id:
             try:
-                photo_bytes = await api.download_shift_photo(shift_id, "opening")
-                if photo_bytes:
-                    photo = BufferedInputFile(photo_bytes, filename="opening.jpg")
-                    await message.answer_photo(photo=photo, caption=text)
+                download = await api.download_shift_photo(shift_id, "opening")
+                if download:
+                    with download:
+                        await message.answer_photo(
+                            photo=download.input_file("opening.jpg"), caption=text
+                        )
                     photo_sent = True
             except Exception:
                 logger.debug("Не удалось отправить фото смены %s", shift_id)
@@ -19,83 +19,126 @@ from aiogram.types import (
 )
 
 from ...api.client import TaskMateAPI
+from ...api.models import Delegation, Task
+from ...storage import proof_buffers
 from ...storage.sessions import UserSession
 from .. import keyboards, messages
+from ...utils.tracing import traced
 from ...utils.tz_utils import attach_dealership_timezone
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name="tasks")
 
 MAX_PROOF_FILES = 5
 MAX_PROOF_TOTAL_BYTES = 50 * 1024 * 1024  # 50 MB
 
-# Temporary storage for file contents (keyed by (chat_id, task_id))
-_temp_file_storage: dict[tuple[int, int], list[dict[str, Any]]] = {}
-
 # Статусы, при которых делегирование недоступно
 _NO_DELEGATION_STATUSES = {"completed", "completed_late", "pending_review"}
 
 
-async def _build_delegation_kb(
-    api: TaskMateAPI,
-    task: dict[str, Any],
-    session: UserSession,
-) -> InlineKeyboardMarkup | None:
-    """Построить кнопку делегирования для employee (если доступно)."""
-    if session.role != "employee":
+async def _outgoing_delegations(
+    api: TaskMateAPI, task_id: int
+) -> list[Delegation] | None:
+    """Pending-делегирования задачи от текущего пользователя (None — ошибка)."""
+    try:
+        return [
+            d
+            async for d in api.iter_delegations(
+                {"task_id": task_id, "direction": "outgoing", "status": "pending"},
+                limit=1,
+            )
+        ]
+    except Exception:
         return None
 
-    status = task.get("status", "")
-    if status in _NO_DELEGATION_STATUSES:
-        return None
 
-    # Проверить, назначен ли пользователь
-    assigned = False
-    for a in task.get("assignments", []):
-        uid = a.get("user_id") or a.get("user", {}).get("id")
-        if uid == session.user_id:
-            assigned = True
-            break
-    if not assigned:
+def _delegation_row(
+    task: Task,
+    session: UserSession,
+    pending: list[Delegation] | None,
+) -> list[InlineKeyboardButton] | None:
+    """Кнопка делегирования для employee (если доступно)."""
+    if session.role != "employee" or pending is None:
         return None
-
-    # Проверить, есть ли pending outgoing делегация
-    try:
-        result = await api.get_delegations(
-            {
-                "task_id": task["id"],
-                "direction": "outgoing",
-                "status": "pending",
-                "per_page": 1,
-            }
-        )
-        pending = result.get("data", [])
-    except Exception:
+    if task.status in _NO_DELEGATION_STATUSES or not task.is_assigned(session.user_id):
         return None
 
     if pending:
-        dlg_id = pending[0]["id"]
-        return InlineKeyboardMarkup(
-            inline_keyboard=[
-                [
-                    InlineKeyboardButton(
-                        text="❌ Отменить делегирование",
-                        callback_data=f"dlg_cancel:{dlg_id}",
-                    )
-                ]
-            ]
+        dlg_id = pending[0].id
+        return [
+            InlineKeyboardButton(
+                text="❌ Отменить делегирование",
+                callback_data=f"dlg_cancel:{dlg_id}",
+            )
+        ]
+    return [
+        InlineKeyboardButton(
+            text="🔄 Делегировать",
+            callback_data=f"dlg_start:{task.id}",
         )
+    ]
 
-    return InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text="🔄 Делегировать",
-                    callback_data=f"dlg_start:{task['id']}",
-                )
-            ]
-        ]
+
+async def _attach_timezone_quietly(api: TaskMateAPI, task: dict[str, Any]) -> None:
+    try:
+        await attach_dealership_timezone(api, task)
+    except Exception:
+        logger.debug("Не удалось прикрепить timezone для задачи %s", task.get("id"))
+
+
+@traced("load_task_detail")
+async def _load_task_detail(
+    api: TaskMateAPI, task_id: int, session: UserSession
+) -> tuple[dict[str, Any], InlineKeyboardMarkup | None] | None:
+    """Задача и единая клавиатура (действия + делегирование) для карточки.
+
+    Поиск делегирования нужен только employee и зависит лишь от task_id,
+    поэтому запускается одновременно с get_task; timezone прикрепляется
+    параллельно с его завершением. Ошибки get_task пробрасываются, пустой
+    ответ — ``None``.
+    """
+    lookup = (
+        asyncio.create_task(_outgoing_delegations(api, task_id))
+        if session.role == "employee"
+        else None
     )
+    try:
+        task = await api.fetch_task(task_id)
+    except BaseException:
+        if lookup is not None:
+            lookup.cancel()
+        raise
+    if task is None:
+        if lookup is not None:
+            lookup.cancel()
+        return None
+
+    if lookup is not None:
+        pending, _ = await asyncio.gather(lookup, _attach_timezone_quietly(api, task.raw))
+    else:
+        pending = None
+        await _attach_timezone_quietly(api, task.raw)
+
+    logger.debug(
+        "task detail: task=%s user=%s role=%s assignees=%s response_type=%s status=%s",
+        task.id,
+        session.user_id,
+        session.role,
+        len(task.assigned_user_ids),
+        task.response_type,
+        task.status,
+    )
+    try:
+        kb = keyboards.task_actions(task, session)
+    except Exception:
+        logger.exception("task_actions raised for task %s", task.id)
+        kb = None
+
+    dlg_row = _delegation_row(task, session, pending)
+    if dlg_row:
+        rows = [*kb.inline_keyboard, dlg_row] if kb else [dlg_row]
+        kb = InlineKeyboardMarkup(inline_keyboard=rows)
+    return task.raw, kb
 
 
 class ProofUpload(StatesGroup):
@@ -110,7 +153,7 @@ async def cmd_tasks(message: Message, session: UserSession, **kwargs) -> None:
     kb = kwargs.get("reply_keyboard")
     api = TaskMateAPI(token=session.token)
     try:
-        result = await api.get_tasks({"date_range": "today", "per_page": 20})
+        models = await api.fetch_tasks({"date_range": "today", "per_page": 20})
     except httpx.HTTPStatusError:
         raise
     except Exception:
@@ -118,13 +161,13 @@ async def cmd_tasks(message: Message, session: UserSession, **kwargs) -> None:
         await message.answer(messages.error_generic(), reply_markup=kb)
         return
 
-    tasks = result.get("data", [])
+    tasks = [t.raw for t in models]
     # For managers/owners exclude tasks that are currently "на проверке"
     # (status == "pending_review") so they don't see review-only items
     if getattr(session, "role", None) in ("manager", "owner") and tasks:
         original_count = len(tasks)
-        tasks = [t for t in tasks if t.get("status") != "pending_review"]
-        logger.info(
+        tasks = [t.raw for t in models if t.status != "pending_review"]
+        logger.debug(
             "cmd_tasks: role=%s — filtered out %d tasks with status=pending_review",
             session.role,
             original_count - len(tasks),
@@ -140,8 +183,8 @@ async def cmd_tasks(message: Message, session: UserSession, **kwargs) -> None:
             logger.debug("Не удалось прикрепить timezone для списка задач")
 
     await message.answer(f"📋 <b>Задачи на сегодня ({len(tasks)})</b>", reply_markup=kb)
-    for t in tasks:
-        text = messages.task_list_item_text(t)
+    texts = messages.render_many(messages.task_list_item_text, tasks)
+    for t, text in zip(tasks, texts):
         item_kb = keyboards.task_list_item(t["id"])
         await message.answer(text, reply_markup=item_kb)
         await asyncio.sleep(0.05)
@@ -164,7 +207,7 @@ async def cmd_task(message: Message, session: UserSession, **kwargs) -> None:
 
     api = TaskMateAPI(token=session.token)
     try:
-        result = await api.get_task(task_id)
+        detail = await _load_task_detail(api, task_id, session)
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
             await message.answer(
@@ -177,33 +220,12 @@ async def cmd_task(message: Message, session: UserSession, **kwargs) -> None:
         await message.answer(messages.error_generic(), reply_markup=reply_kb)
         return
 
-    task = result.get("data", result)
-    try:
-        logger.info(
-            "cmd_task: building keyboard for task=%s user=%s role=%s assignments=%s response_type=%s status=%s",
-            task.get("id"),
-            session.user_id,
-            session.role,
-            len(task.get("assignments", [])),
-            task.get("response_type"),
-            task.get("status"),
-        )
-    except Exception:
-        logger.debug("cmd_task: failed to log task/session info")
-    try:
-        kb = keyboards.task_actions(task, session)
-    except Exception:
-        logger.exception("cmd_task: task_actions raised")
-        kb = None
-    try:
-        await attach_dealership_timezone(api, task)
-    except Exception:
-        logger.debug("Не удалось прикрепить timezone для задачи %s", task.get("id"))
-    await message.answer(messages.task_detail(task), reply_markup=kb or reply_kb)
+    if detail is None:
+        await message.answer(f"Задача #{task_id} не найдена.", reply_markup=reply_kb)
+        return
+    task, kb = detail
 
-    dlg_kb = await _build_delegation_kb(api, task, session)
-    if dlg_kb:
-        await message.answer("🔄 Делегирование:", reply_markup=dlg_kb)
+    await message.answer(messages.task_detail(task), reply_markup=kb or reply_kb)
 
 
 # --- Callback handlers ---
@@ -215,40 +237,18 @@ async def cb_task_detail(callback: CallbackQuery, session: UserSession) -> None:
     task_id = int(callback.data.split(":")[1])
     api = TaskMateAPI(token=session.token)
     try:
-        result = await api.get_task(task_id)
+        detail = await _load_task_detail(api, task_id, session)
     except Exception:
         logger.exception("Ошибка при загрузке задачи #%s", task_id)
         await callback.answer("Ошибка загрузки", show_alert=True)
         return
 
-    task = result.get("data", result)
-    try:
-        logger.info(
-            "cb_task_detail: building keyboard for task=%s user=%s role=%s assignments=%s response_type=%s status=%s",
-            task.get("id"),
-            getattr(session, "user_id", None),
-            getattr(session, "role", None),
-            len(task.get("assignments", [])),
-            task.get("response_type"),
-            task.get("status"),
-        )
-    except Exception:
-        logger.debug("cb_task_detail: failed to log task/session info")
-    try:
-        kb = keyboards.task_actions(task, session)
-    except Exception:
-        logger.exception("cb_task_detail: task_actions raised")
-        kb = None
-    try:
-        await attach_dealership_timezone(api, task)
-    except Exception:
-        logger.debug("Не удалось прикрепить timezone для задачи %s (callback)", task.get("id"))
-    await callback.message.answer(messages.task_detail(task), reply_markup=kb)
-
-    dlg_kb = await _build_delegation_kb(api, task, session)
-    if dlg_kb:
-        await callback.message.answer("🔄 Делегирование:", reply_markup=dlg_kb)
+    if detail is None:
+        await callback.answer("Задача не найдена", show_alert=True)
+        return
+    task, kb = detail
 
+    await callback.message.answer(messages.task_detail(task), reply_markup=kb)
     await callback.answer()
 
 
@@ -326,190 +326,134 @@ async def cb_proof_start(
     logger.info("cb_proof_start: Setting state to ProofUpload.collecting for task %s", task_id)
     await state.set_state(ProofUpload.collecting)
     await state.update_data(task_id=task_id, files=[], total_bytes=0)
-    # Initialize temp storage
-    _temp_file_storage[(chat_id, task_id)] = []
+    proof_buffers.start(chat_id, callback.from_user.id, task_id)
     logger.info("cb_proof_start: State and temp storage set successfully")
     kb = keyboards.proof_actions(task_id)
     await callback.message.answer(messages.proof_upload_prompt(), reply_markup=kb)
     await callback.answer()
 
 
-@router.message(ProofUpload.collecting, F.photo)
-async def on_proof_photo(message: Message, state: FSMContext) -> None:
-    """Получить фото как доказательство."""
-    logger.info("on_proof_photo: Handler triggered for message %s", message.message_id)
-    data = await state.get_data()
-    task_id = data["task_id"]
-    chat_id = message.chat.id
-    logger.info("on_proof_photo: State data retrieved: files=%d, total_bytes=%d", len(data.get("files", [])), data.get("total_bytes", 0))
-    files_meta: list[dict[str, Any]] = data.get("files", [])
-    total_bytes: int = data.get("total_bytes", 0)
-
-    if len(files_meta) >= MAX_PROOF_FILES:
-        kb = keyboards.proof_actions(task_id)
-        await message.answer(
-            f"Максимум файлов: {MAX_PROOF_FILES}. Нажмите «📤 Отправить на проверку».",
-            reply_markup=kb,
+# Тип вложения → (префикс имени по умолчанию, расширение, текст ошибки загрузки)
+_PROOF_KINDS: dict[str, tuple[str, str, str]] = {
+    "photo": ("photo", ".jpg", "❌ Ошибка загрузки фото. Попробуйте ещё раз."),
+    "document": ("file", "", "❌ Ошибка загрузки документа. Попробуйте ещё раз."),
+    "video": ("video", ".mp4", "❌ Ошибка загрузки видео. Попробуйте ещё раз."),
+}
+
+
+def _proof_attachment(message: Message) -> tuple[str, str, str | None, str] | None:
+    """(kind, file_id, file_name, mime) вложения сообщения."""
+    if message.photo:
+        return "photo", message.photo[-1].file_id, None, "image/jpeg"  # наибольший размер
+    if message.video:
+        video = message.video
+        return "video", video.file_id, video.file_name, video.mime_type or "video/mp4"
+    if message.document:
+        doc = message.document
+        return (
+            "document",
+            doc.file_id,
+            doc.file_name,
+            doc.mime_type or "application/octet-stream",
         )
-        return
+    return None
 
-    photo = message.photo[-1]  # наибольший размер
-    logger.info("on_proof_photo: Starting file download for photo %s", photo.file_id)
-    try:
-        logger.info("on_proof_photo: Calling get_file")
-        file = await message.bot.get_file(photo.file_id)
-        logger.info("on_proof_photo: get_file completed, file_path=%s", file.file_path)
-        logger.info("on_proof_photo: Calling download_file")
-        file_bytes = await message.bot.download_file(file.file_path)
-        logger.info("on_proof_photo: download_file completed, reading content")
-        content = file_bytes.read()
-        logger.info("on_proof_photo: Content read, size=%d bytes", len(content))
-    except Exception as e:
-        logger.exception("Ошибка загрузки фото")
-        kb = keyboards.proof_actions(task_id)
-        await message.answer("❌ Ошибка загрузки фото. Попробуйте ещё раз.", reply_markup=kb)
-        return
 
-    if total_bytes + len(content) > MAX_PROOF_TOTAL_BYTES:
-        kb = keyboards.proof_actions(task_id)
-        await message.answer("Превышен лимит размера файлов (50 МБ).", reply_markup=kb)
-        return
+async def _download_telegram_file(message: Message, file_id: str) -> bytes:
+    file = await message.bot.get_file(file_id)
+    file_bytes = await message.bot.download_file(file.file_path)
+    return file_bytes.read()
 
-    # Store full file in temp storage
-    file_dict = {
-        "name": f"photo_{len(files_meta) + 1}.jpg",
-        "content": content,
-        "mime": "image/jpeg",
-    }
-    _temp_file_storage[(chat_id, task_id)].append(file_dict)
-
-    # Store metadata in state
-    files_meta.append(
-        {
-            "name": file_dict["name"],
-            "size": len(content),
-            "mime": "image/jpeg",
-        }
-    )
-    logger.info("on_proof_photo: Appended file to list, now %d files", len(files_meta))
-    logger.info("on_proof_photo: Calling state.update_data")
-    await state.update_data(files=files_meta, total_bytes=total_bytes + len(content))
-    logger.info("on_proof_photo: State updated successfully")
-
-    kb = keyboards.proof_actions(task_id)
-    logger.info("on_proof_photo: Sending confirmation message")
-    await message.answer(messages.proof_received(len(files_meta)), reply_markup=kb)
-    logger.info("on_proof_photo: Handler completed successfully")
 
+async def _collect_proofs(
+    message: Message, state: FSMContext, album: list[Message] | None
+) -> None:
+    """Принять одно вложение или целый альбом как доказательства.
 
-@router.message(ProofUpload.collecting, F.document)
-async def on_proof_document(message: Message, state: FSMContext) -> None:
-    """Получить документ как доказательство."""
+    Файлы альбома скачиваются параллельно, FSM обновляется одним
+    update_data, пользователю уходит одно сообщение.
+    """
     data = await state.get_data()
     task_id = data["task_id"]
     chat_id = message.chat.id
     files_meta: list[dict[str, Any]] = data.get("files", [])
     total_bytes: int = data.get("total_bytes", 0)
+    kb = keyboards.proof_actions(task_id)
 
-    if len(files_meta) >= MAX_PROOF_FILES:
-        kb = keyboards.proof_actions(task_id)
+    free_slots = MAX_PROOF_FILES - len(files_meta)
+    if free_slots <= 0:
         await message.answer(
             f"Максимум файлов: {MAX_PROOF_FILES}. Нажмите «📤 Отправить на проверку».",
             reply_markup=kb,
         )
         return
 
-    doc = message.document
-    try:
-        file = await message.bot.get_file(doc.file_id)
-        file_bytes = await message.bot.download_file(file.file_path)
-        content = file_bytes.read()
-    except Exception as e:
-        logger.exception("Ошибка загрузки документа")
-        kb = keyboards.proof_actions(task_id)
-        await message.answer("❌ Ошибка загрузки документа. Попробуйте ещё раз.", reply_markup=kb)
-        return
-
-    if total_bytes + len(content) > MAX_PROOF_TOTAL_BYTES:
-        kb = keyboards.proof_actions(task_id)
-        await message.answer("Превышен лимит размера файлов (50 МБ).", reply_markup=kb)
-        return
+    attachments = [a for a in map(_proof_attachment, album or [message]) if a]
+    skipped_by_count = len(attachments) > free_slots
+    attachments = attachments[:free_slots]
 
-    # Store full file in temp storage
-    file_dict = {
-        "name": doc.file_name or f"file_{len(files_meta) + 1}",
-        "content": content,
-        "mime": doc.mime_type or "application/octet-stream",
-    }
-    _temp_file_storage[(chat_id, task_id)].append(file_dict)
-
-    # Store metadata in state
-    files_meta.append(
-        {
-            "name": file_dict["name"],
-            "size": len(content),
-            "mime": file_dict["mime"],
-        }
+    contents = await asyncio.gather(
+        *(_download_telegram_file(message, file_id) for _, file_id, _, _ in attachments),
+        return_exceptions=True,
     )
-    await state.update_data(files=files_meta, total_bytes=total_bytes + len(content))
 
-    kb = keyboards.proof_actions(task_id)
-    await message.answer(messages.proof_received(len(files_meta)), reply_markup=kb)
+    notes: list[str] = []
+    added = 0
+    over_limit = False
+    for (kind, _, file_name, mime), content in zip(attachments, contents):
+        prefix, ext, error_text = _PROOF_KINDS[kind]
+        if isinstance(content, BaseException):
+            logger.error("Ошибка загрузки вложения (%s)", kind, exc_info=content)
+            if error_text not in notes:
+                notes.append(error_text)
+            continue
+        if total_bytes + len(content) > MAX_PROOF_TOTAL_BYTES:
+            over_limit = True
+            continue
+
+        name = file_name or f"{prefix}_{len(files_meta) + 1}{ext}"
+        # Содержимое — во временном хранилище, в FSM только метаданные
+        proof_buffers.add(chat_id, message.from_user.id, task_id, name, content, mime)
+        files_meta.append({"name": name, "size": len(content), "mime": mime})
+        total_bytes += len(content)
+        added += 1
+
+    if over_limit:
+        notes.append("Превышен лимит размера файлов (50 МБ).")
+    if skipped_by_count:
+        notes.append(
+            f"Максимум файлов: {MAX_PROOF_FILES}. Нажмите «📤 Отправить на проверку»."
+        )
 
+    if added:
+        await state.update_data(files=files_meta, total_bytes=total_bytes)
+        notes.append(messages.proof_received(len(files_meta)))
+    if notes:
+        await message.answer("\n".join(notes), reply_markup=kb)
 
-@router.message(ProofUpload.collecting, F.video)
-async def on_proof_video(message: Message, state: FSMContext) -> None:
-    """Получить видео как доказательство."""
-    data = await state.get_data()
-    task_id = data["task_id"]
-    chat_id = message.chat.id
-    files_meta: list[dict[str, Any]] = data.get("files", [])
-    total_bytes: int = data.get("total_bytes", 0)
 
-    if len(files_meta) >= MAX_PROOF_FILES:
-        kb = keyboards.proof_actions(task_id)
-        await message.answer(
-            f"Максимум файлов: {MAX_PROOF_FILES}. Нажмите «📤 Отправить на проверку».",
-            reply_markup=kb,
-        )
-        return
+@router.message(ProofUpload.collecting, F.photo)
+async def on_proof_photo(
+    message: Message, state: FSMContext, album: list[Message] | None = None
+) -> None:
+    """Получить фото (или альбом) как доказательство."""
+    await _collect_proofs(message, state, album)
 
-    video = message.video
-    try:
-        file = await message.bot.get_file(video.file_id)
-        file_bytes = await message.bot.download_file(file.file_path)
-        content = file_bytes.read()
-    except Exception as e:
-        logger.exception("Ошибка загрузки видео")
-        kb = keyboards.proof_actions(task_id)
-        await message.answer("❌ Ошибка загрузки видео. Попробуйте ещё раз.", reply_markup=kb)
-        return
 
-    if total_bytes + len(content) > MAX_PROOF_TOTAL_BYTES:
-        kb = keyboards.proof_actions(task_id)
-        await message.answer("Превышен лимит размера файлов (50 МБ).", reply_markup=kb)
-        return
+@router.message(ProofUpload.collecting, F.document)
+async def on_proof_document(
+    message: Message, state: FSMContext, album: list[Message] | None = None
+) -> None:
+    """Получить документ (или альбом) как доказательство."""
+    await _collect_proofs(message, state, album)
 
-    # Store full file in temp storage
-    file_dict = {
-        "name": video.file_name or f"video_{len(files_meta) + 1}.mp4",
-        "content": content,
-        "mime": video.mime_type or "video/mp4",
-    }
-    _temp_file_storage[(chat_id, task_id)].append(file_dict)
-
-    # Store metadata in state
-    files_meta.append(
-        {
-            "name": file_dict["name"],
-            "size": len(content),
-            "mime": file_dict["mime"],
-        }
-    )
-    await state.update_data(files=files_meta, total_bytes=total_bytes + len(content))
 
-    kb = keyboards.proof_actions(task_id)
-    await message.answer(messages.proof_received(len(files_meta)), reply_markup=kb)
+@router.message(ProofUpload.collecting, F.video)
+async def on_proof_video(
+    message: Message, state: FSMContext, album: list[Message] | None = None
+) -> None:
+    """Получить видео (или альбом) как доказательство."""
+    await _collect_proofs(message, state, album)
 
 
 @router.callback_query(F.data.startswith("proof_submit:"))
@@ -529,7 +473,7 @@ async def cb_proof_submit(
         return
 
     # Get files from temp storage
-    files = _temp_file_storage.get((chat_id, task_id), [])
+    files = proof_buffers.files(chat_id, task_id)
     if not files:
         logger.error("cb_proof_submit: No files in temp storage for chat_id=%s task_id=%s", chat_id, task_id)
         await callback.answer("Ошибка: файлы не найдены", show_alert=True)
@@ -549,8 +493,7 @@ async def cb_proof_submit(
         await callback.answer("Ошибка отправки", show_alert=True)
         return
 
-    # Clean up temp storage
-    _temp_file_storage.pop((chat_id, task_id), None)
+    proof_buffers.discard(chat_id, task_id)
 
     await state.clear()
     try:
@@ -568,8 +511,7 @@ async def cb_proof_cancel(callback: CallbackQuery, state: FSMContext) -> None:
     task_id = data.get("task_id")
     chat_id = callback.message.chat.id
 
-    # Clean up temp storage
-    _temp_file_storage.pop((chat_id, task_id), None)
+    proof_buffers.discard(chat_id, task_id)
 
     await state.clear()
     try:
@@ -2,6 +2,10 @@
 
 from __future__ import annotations
 
+import functools
+import logging
+from typing import Any
+
 from aiogram.types import (
     InlineKeyboardButton,
     InlineKeyboardMarkup,
@@ -9,13 +13,17 @@ from aiogram.types import (
     ReplyKeyboardMarkup,
     ReplyKeyboardRemove,
 )
-from typing import Any
-import logging
 
+from ..api.models import Task
 from ..storage.sessions import UserSession
 
 logger = logging.getLogger(__name__)
 
+# Клавиатуры без пользовательских данных строятся один раз на (тип, id) и
+# переиспользуются. Экземпляры общие: не изменять их на месте, а собирать
+# новую клавиатуру (``[*kb.inline_keyboard, row]``).
+_memoized = functools.lru_cache(maxsize=4096)
+
 # --- Тексты кнопок меню ---
 
 BTN_MY_TASKS = "📋 Мои задачи"
@@ -29,6 +37,7 @@ BTN_LOGOUT = "🚪 Выход"
 BTN_DELEGATIONS = "🔄 Делегирования"
 
 
+@functools.cache
 def main_menu(role: str) -> ReplyKeyboardMarkup:
     """Главное меню с кнопками по роли."""
     if role == "employee":
@@ -51,12 +60,15 @@ def main_menu(role: str) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(keyboard=rows, resize_keyboard=True)
 
 
+@functools.cache
 def remove_menu() -> ReplyKeyboardRemove:
     """Убрать клавиатуру."""
     return ReplyKeyboardRemove()
 
 
-def task_actions(task: dict[str, Any], session: UserSession | None) -> InlineKeyboardMarkup | None:
+def task_actions(
+    task: Task | dict[str, Any], session: UserSession | None
+) -> InlineKeyboardMarkup | None:
     """Кнопки действий для задачи в зависимости от типа, статуса и прав сессии.
 
     - `session` может быть None (например, в уведомлениях), в этом случае
@@ -64,69 +76,48 @@ def task_actions(task: dict[str, Any], session: UserSession | None) -> InlineKey
     - Managers/Owners могут выполнять/загружать доказательства для любых задач.
     - Employees могут действовать только на задачах, где они назначены.
     """
-    buttons: list[list[InlineKeyboardButton]] = []
-
+    task = Task.of(task)
     if not session:
-        logger.info(
-            "task_actions: no session for task %s — hiding actions",
-            task.get("id"),
-        )
-        return None
-
-    status = task.get("status", "")
-    if status in ("completed", "completed_late"):
-        logger.info(
-            "task_actions: task %s status=%s — hiding actions",
-            task.get("id"),
-            status,
-        )
+        logger.debug("task_actions: no session for task %s — hiding actions", task.id)
         return None
 
     # Role-based access: observers cannot act
-    if session.role == "observer":
-        logger.info(
-            "task_actions: session %s role=observer — hiding actions for task %s",
-            getattr(session, "user_id", None),
-            task.get("id"),
-        )
+    if task.is_completed or session.role == "observer":
         return None
 
-    # Determine if user is assigned (employees must be assigned)
-    assigned = False
-    for a in task.get("assignments", []):
-        uid = a.get("user_id") or a.get("user", {}).get("id")
-        if uid is None:
-            continue
-        try:
-            if str(uid) == str(session.user_id):
-                assigned = True
-                break
-        except Exception:
-            continue
-
-    logger.info(
-        "task_actions: task=%s status=%s response_type=%s assignments=%s assigned=%s session_role=%s session_user=%s",
-        task.get("id"),
-        status,
-        response_type := task.get("response_type", ""),
-        len(task.get("assignments", [])),
-        assigned,
-        session.role,
-        session.user_id,
-    )
-
     # Managers/owners can act even if not assigned
     is_manager_like = session.role in ("manager", "owner")
+    assigned = task.is_assigned(session.user_id)
     if session.role == "employee" and not (assigned or is_manager_like):
         return None
 
-    response_type = task.get("response_type", "")
+    kb = _task_action_keyboard(task.id, task.response_type, task.status, is_manager_like)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "task_actions: task=%s status=%s response_type=%s assigned=%s role=%s user=%s buttons=%s",
+            task.id,
+            task.status,
+            task.response_type,
+            assigned,
+            session.role,
+            session.user_id,
+            kb is not None,
+        )
+    return kb
+
+
+@_memoized
+def _task_action_keyboard(
+    task_id: int, response_type: str, status: str, is_manager_like: bool,
+) -> InlineKeyboardMarkup | None:
+    """Кнопки действий задачи — зависят только от типа, статуса и роли."""
+    buttons: list[list[InlineKeyboardButton]] = []
 
     if response_type == "notification" and status == "pending":
         buttons.append([
             InlineKeyboardButton(
                 text="👁 Ознакомлен",
-                callback_data=f"ack:{task['id']}",
+                callback_data=f"ack:{task_id}",
             )
         ])
 
@@ -134,7 +125,7 @@ def task_actions(task: dict[str, Any], session: UserSession | None) -> InlineKey
         buttons.append([
             InlineKeyboardButton(
                 text="✅ Выполнено",
-                callback_data=f"complete_confirm:{task['id']}",
+                callback_data=f"complete_confirm:{task_id}",
             ),
         ])
 
@@ -148,18 +139,16 @@ def task_actions(task: dict[str, Any], session: UserSession | None) -> InlineKey
             buttons.append([
                 InlineKeyboardButton(
                     text="📎 Загрузить доказательства",
-                    callback_data=f"proof_start:{task['id']}",
+                    callback_data=f"proof_start:{task_id}",
                 ),
             ])
 
     if not buttons:
-        logger.info("task_actions: no buttons built for task %s", task.get("id"))
         return None
-    kb = InlineKeyboardMarkup(inline_keyboard=buttons)
-    logger.info("task_actions: returning keyboard for task %s", task.get("id"))
-    return kb
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@_memoized
 def complete_confirmation(task_id: int) -> InlineKeyboardMarkup:
     """Кнопки подтверждения выполнения задачи."""
     return InlineKeyboardMarkup(
@@ -178,6 +167,7 @@ def complete_confirmation(task_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def proof_actions(task_id: int) -> InlineKeyboardMarkup:
     """Кнопки при загрузке доказательств."""
     return InlineKeyboardMarkup(
@@ -198,6 +188,7 @@ def proof_actions(task_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def task_list_item(task_id: int) -> InlineKeyboardMarkup:
     """Кнопка «Подробнее» для элемента списка."""
     return InlineKeyboardMarkup(
@@ -212,6 +203,7 @@ def task_list_item(task_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def review_actions(response_id: int) -> InlineKeyboardMarkup:
     """Кнопки одобрения/отклонения для одиночной задачи на проверке."""
     return InlineKeyboardMarkup(
@@ -230,6 +222,7 @@ def review_actions(response_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def review_group_actions(task_id: int) -> InlineKeyboardMarkup:
     """Кнопки для групповой задачи на проверке."""
     return InlineKeyboardMarkup(
@@ -257,6 +250,7 @@ def review_group_actions(task_id: int) -> InlineKeyboardMarkup:
 # --- Смены: открытие/закрытие ---
 
 
+@_memoized
 def shift_actions_no_shift() -> InlineKeyboardMarkup:
     """Кнопка открытия смены (нет открытой смены)."""
     return InlineKeyboardMarkup(
@@ -266,6 +260,7 @@ def shift_actions_no_shift() -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def shift_actions_open(shift_id: int) -> InlineKeyboardMarkup:
     """Кнопка закрытия смены (есть открытая смена)."""
     return InlineKeyboardMarkup(
@@ -291,6 +286,7 @@ def dealership_selector(dealerships: list[dict]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@_memoized
 def shift_open_cancel() -> InlineKeyboardMarkup:
     """Кнопка отмены при ожидании фото открытия."""
     return InlineKeyboardMarkup(
@@ -313,6 +309,7 @@ def schedule_selector(candidates: list[dict]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@_memoized
 def shift_close_options(shift_id: int) -> InlineKeyboardMarkup:
     """Кнопки при закрытии смены: без фото / отмена."""
     return InlineKeyboardMarkup(
@@ -326,6 +323,7 @@ def shift_close_options(shift_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def reject_cancel_keyboard() -> InlineKeyboardMarkup:
     """Кнопка отмены при вводе причины отклонения."""
     return InlineKeyboardMarkup(
@@ -343,17 +341,37 @@ def reject_cancel_keyboard() -> InlineKeyboardMarkup:
 # --- Делегирование ---
 
 
+DELEGATION_PAGE_SIZE = 8
+
+
 def delegation_user_selector(
-    task_id: int, users: list[dict],
+    task_id: int, users: list[dict], page: int = 0,
 ) -> InlineKeyboardMarkup:
-    """Список сотрудников для делегирования (inline кнопки)."""
+    """Список сотрудников для делегирования (inline кнопки, по страницам)."""
+    pages = max(1, -(-len(users) // DELEGATION_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    start = page * DELEGATION_PAGE_SIZE
     buttons = [
         [InlineKeyboardButton(
             text=f"👤 {u.get('full_name', u.get('login', '—'))}",
             callback_data=f"dlg_user:{task_id}:{u['id']}",
         )]
-        for u in users[:20]
+        for u in users[start:start + DELEGATION_PAGE_SIZE]
     ]
+    if pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton(
+                text="◀️", callback_data=f"dlg_page:{task_id}:{page - 1}",
+            ))
+        nav.append(InlineKeyboardButton(
+            text=f"{page + 1}/{pages}", callback_data=f"dlg_page:{task_id}:{page}",
+        ))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton(
+                text="▶️", callback_data=f"dlg_page:{task_id}:{page + 1}",
+            ))
+        buttons.append(nav)
     buttons.append([InlineKeyboardButton(
         text="❌ Отмена",
         callback_data=f"dlg_cancel_flow:{task_id}",
@@ -361,6 +379,7 @@ def delegation_user_selector(
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@_memoized
 def delegation_reason_options(
     task_id: int, to_user_id: int,
 ) -> InlineKeyboardMarkup:
@@ -381,6 +400,7 @@ def delegation_reason_options(
     )
 
 
+@_memoized
 def delegation_incoming_actions(delegation_id: int) -> InlineKeyboardMarkup:
     """Принять / отклонить входящую делегацию."""
     return InlineKeyboardMarkup(
@@ -399,6 +419,7 @@ def delegation_incoming_actions(delegation_id: int) -> InlineKeyboardMarkup:
     )
 
 
+@_memoized
 def delegation_cancel_button(delegation_id: int) -> InlineKeyboardMarkup:
     """Отменить исходящую делегацию."""
     return InlineKeyboardMarkup(
@@ -411,6 +432,61 @@ def delegation_cancel_button(delegation_id: int) -> InlineKeyboardMarkup:
     )
 
 
+def delegations_view(
+    tab: str,
+    counts: dict[str, int],
+    items: list[dict],
+    page: int,
+    pages: int,
+) -> InlineKeyboardMarkup:
+    """Вкладки, действия над делегированиями страницы и листание."""
+    tab_icons = {"in": "📥", "out": "📤", "hist": "📜"}
+    buttons = [[
+        InlineKeyboardButton(
+            text=f"· {icon} {counts[key]} ·" if key == tab else f"{icon} {counts[key]}",
+            callback_data=f"dlgv:{key}:0",
+        )
+        for key, icon in tab_icons.items()
+    ]]
+    for d in items:
+        dlg_id = d.get("id")
+        if not dlg_id:
+            continue
+        # Подпись — по номеру задачи, как в тексте сообщения
+        label = f"#{d.get('task', {}).get('id', '?')}"
+        # Вкладка и страница — чтобы перерисовать сводку после действия
+        view = f"{tab}:{page}"
+        if tab == "in":
+            buttons.append([
+                InlineKeyboardButton(
+                    text=f"✅ Принять {label}", callback_data=f"dlg_accept:{dlg_id}:{view}",
+                ),
+                InlineKeyboardButton(
+                    text=f"❌ Отклонить {label}", callback_data=f"dlg_reject:{dlg_id}:{view}",
+                ),
+            ])
+        elif tab == "out":
+            buttons.append([InlineKeyboardButton(
+                text=f"🚫 Отменить {label}", callback_data=f"dlg_cancel:{dlg_id}:{view}",
+            )])
+    if pages > 1:
+        nav = []
+        if page > 0:
+            nav.append(InlineKeyboardButton(
+                text="◀️", callback_data=f"dlgv:{tab}:{page - 1}",
+            ))
+        nav.append(InlineKeyboardButton(
+            text=f"{page + 1}/{pages}", callback_data=f"dlgv:{tab}:{page}",
+        ))
+        if page < pages - 1:
+            nav.append(InlineKeyboardButton(
+                text="▶️", callback_data=f"dlgv:{tab}:{page + 1}",
+            ))
+        buttons.append(nav)
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+@_memoized
 def delegation_reject_cancel() -> InlineKeyboardMarkup:
     """Отмена ввода причины отклонения делегирования."""
     return InlineKeyboardMarkup(
@@ -1,12 +1,99 @@
-"""Шаблоны сообщений на русском языке."""
+"""Шаблоны сообщений на русском языке.
+
+Подписи и иконки — константные таблицы модуля, общие фрагменты задач, смен и
+делегирований собирают форматтеры (``TASK``, ``SHIFT``, ``DELEGATION``).
+Часовые пояса автосалонов разрешаются один раз на имя (``_zone``), списки
+рендерятся через ``render_many``.
+"""
 
 from __future__ import annotations
 
+import functools
 import re
-from datetime import datetime, timedelta, timezone
-from typing import Any
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Any, TypeVar
 from zoneinfo import ZoneInfo
 
+T = TypeVar("T")
+
+# --- Таблицы подписей и иконок ---
+
+ROLE_LABELS = {
+    "owner": "Владелец",
+    "manager": "Менеджер",
+    "observer": "Наблюдатель",
+    "employee": "Сотрудник",
+}
+
+TASK_TYPE_LABELS = {
+    "notification": "📢 Уведомление",
+    "completion": "✅ На выполнение",
+    "completion_with_proof": "📎 С доказательствами",
+}
+
+TASK_STATUS_ICONS = {
+    "pending": "🔵",
+    "acknowledged": "👁",
+    "pending_review": "🟡",
+    "completed": "✅",
+    "completed_late": "⚠️",
+    "overdue": "🔴",
+    "rejected": "❌",
+}
+
+TASK_STATUS_LABELS = {
+    "pending": "Ожидает",
+    "acknowledged": "Ознакомлен",
+    "pending_review": "На проверке",
+    "completed": "Выполнено",
+    "completed_late": "Выполнено с опозданием",
+    "overdue": "Просрочено",
+    "rejected": "Отклонено",
+}
+
+PRIORITY_ICONS = {"low": "🟢", "medium": "🟡", "high": "🔴"}
+
+SHIFT_STATUS_LABELS = {
+    "open": "🟢 Открыта",
+    "late": "🟡 Опоздание",
+    "closed": "⚪ Закрыта",
+    "replaced": "🔄 Замена",
+}
+
+# Для менеджера и при открытии смены статус читается как «пришёл вовремя»
+SHIFT_ARRIVAL_LABELS = {
+    "open": "🟢 Вовремя",
+    "late": "🟡 Опоздание",
+    "closed": "⚪ Закрыта",
+    "replaced": "🔄 Замена",
+}
+
+SHIFT_STATUS_ICONS = {"open": "🟢", "late": "🟡", "closed": "⚪", "replaced": "🔄"}
+
+DELEGATION_STATUS_ICONS = {"accepted": "✅", "rejected": "❌", "cancelled": "🚫"}
+
+DELEGATION_STATUS_LABELS = {
+    "accepted": "Принято",
+    "rejected": "Отклонено",
+    "cancelled": "Отменено",
+}
+
+DELEGATION_TABS = {
+    "in": "📥 Входящие",
+    "out": "📤 Исходящие",
+    "hist": "📜 История",
+}
+
+DELEGATION_EMPTY = {"in": "Входящих нет.", "out": "Исходящих нет.", "hist": "История пуста."}
+
+# Лимит длины сообщения Telegram и запас под строку «… ещё N»
+MESSAGE_LIMIT = 4096
+_MESSAGE_TAIL_RESERVE = 64
+# Длина причины делегирования в сводке
+DELEGATION_REASON_PREVIEW = 120
+
+SEPARATOR = "━━━━━━━━━━━━━━━━━━"
 
 
 def welcome() -> str:
@@ -20,15 +107,9 @@ def welcome() -> str:
 
 
 def welcome_back(full_name: str, role: str) -> str:
-    role_labels = {
-        "owner": "Владелец",
-        "manager": "Менеджер",
-        "observer": "Наблюдатель",
-        "employee": "Сотрудник",
-    }
     return (
         f"👋 С возвращением, <b>{full_name}</b>!\n"
-        f"Роль: {role_labels.get(role, role)}\n\n"
+        f"Роль: {ROLE_LABELS.get(role, role)}\n\n"
         "Используйте кнопки меню для навигации."
     )
 
@@ -55,15 +136,9 @@ def help_text() -> str:
 
 
 def login_success(full_name: str, role: str) -> str:
-    role_labels = {
-        "owner": "Владелец",
-        "manager": "Менеджер",
-        "observer": "Наблюдатель",
-        "employee": "Сотрудник",
-    }
     return (
         f"✅ Вы авторизованы как <b>{full_name}</b>\n"
-        f"Роль: {role_labels.get(role, role)}"
+        f"Роль: {ROLE_LABELS.get(role, role)}"
     )
 
 
@@ -93,34 +168,17 @@ def task_list(tasks: list[dict[str, Any]]) -> str:
     if not tasks:
         return "📋 У вас нет активных задач."
 
-    lines = ["📋 <b>Ваши задачи</b>\n"]
-    for t in tasks:
-        status_icon = _status_icon(t.get("status", ""))
-        priority_icon = _priority_icon(t.get("priority", "medium"))
-        tz = _get_tz(t)
-        deadline = _format_deadline(t.get("deadline"), tz)
-        lines.append(
-            f"{status_icon} {priority_icon} <b>#{t['id']}</b> {t['title']}"
-            f"\n   Дедлайн: {deadline}"
-        )
-    return "\n".join(lines)
+    return "\n".join(["📋 <b>Ваши задачи</b>\n", *render_many(_task_list_line, tasks)])
 
 
-def task_detail(t: dict[str, Any]) -> str:
-    status_icon = _status_icon(t.get("status", ""))
-    priority_icon = _priority_icon(t.get("priority", "medium"))
-    tz = _get_tz(t)
-    deadline = _format_deadline(t.get("deadline"), tz)
-    response_type = t.get("response_type", "")
+def _task_list_line(t: dict[str, Any]) -> str:
+    return f"{TASK.icons(t)} <b>#{t['id']}</b> {t['title']}\n   Дедлайн: {TASK.deadline(t)}"
 
-    type_labels = {
-        "notification": "📢 Уведомление",
-        "completion": "✅ На выполнение",
-        "completion_with_proof": "📎 С доказательствами",
-    }
 
+def task_detail(t: dict[str, Any]) -> str:
+    response_type = t.get("response_type", "")
     lines = [
-        f"{status_icon} {priority_icon} <b>Задача #{t['id']}</b>",
+        f"{TASK.icons(t)} <b>Задача #{t['id']}</b>",
         f"<b>{t['title']}</b>",
         "",
     ]
@@ -129,9 +187,9 @@ def task_detail(t: dict[str, Any]) -> str:
         lines.append("")
     lines.extend(
         [
-            f"Тип: {type_labels.get(response_type, response_type)}",
+            f"Тип: {TASK_TYPE_LABELS.get(response_type, response_type)}",
             f"Статус: {_status_label(t.get('status', ''))}",
-            f"Дедлайн: {deadline}",
+            f"Дедлайн: {TASK.deadline(t)}",
         ]
     )
     if t.get("comment"):
@@ -141,9 +199,7 @@ def task_detail(t: dict[str, Any]) -> str:
         lines.append(f"Автор: {creator.get('full_name', '—')}")
 
     if t.get("assignments"):
-        assignees = [a.get("user", {}).get("full_name", "—") for a in t["assignments"]]
-        if assignees:
-            lines.append(f"Исполнители: {', '.join(assignees)}")
+        lines.append(f"Исполнители: {TASK.assignees(t)}")
 
     # Показать причину отклонения для rejected задач
     if t.get("status") == "rejected":
@@ -155,37 +211,23 @@ def task_detail(t: dict[str, Any]) -> str:
 
 
 def shift_info(s: dict[str, Any]) -> str:
-    tz = _get_tz(s)
-    start = _format_datetime(s.get("shift_start"), tz)
-    status_labels = {
-        "open": "🟢 Открыта",
-        "late": "🟡 Опоздание",
-        "closed": "⚪ Закрыта",
-        "replaced": "🔄 Замена",
-    }
-    status = status_labels.get(s.get("status", ""), s.get("status", ""))
-    dealership = s.get("dealership", {}).get("name", "—")
     return (
         f"🏢 <b>Смена</b>\n\n"
-        f"Статус: {status}\n"
-        f"Начало: {start}\n"
-        f"Автосалон: {dealership}"
+        f"Статус: {SHIFT.status(s)}\n"
+        f"Начало: {SHIFT.time(s)}\n"
+        f"Автосалон: {SHIFT.dealership(s)}"
     )
 
 
 def shift_list(shifts: list[dict[str, Any]]) -> str:
     if not shifts:
         return "📅 У вас нет смен."
-    lines = ["📅 <b>Ваши смены</b>\n"]
-    for s in shifts[:10]:
-        tz = _get_tz(s)
-        start = _format_datetime(s.get("shift_start"), tz)
-        status = s.get("status", "")
-        icon = {"open": "🟢", "late": "🟡", "closed": "⚪", "replaced": "🔄"}.get(
-            status, "⚪"
-        )
-        lines.append(f"{icon} {start} — {status}")
-    return "\n".join(lines)
+    return "\n".join(["📅 <b>Ваши смены</b>\n", *render_many(_shift_list_line, shifts[:10])])
+
+
+def _shift_list_line(s: dict[str, Any]) -> str:
+    status = s.get("status", "")
+    return f"{SHIFT_STATUS_ICONS.get(status, '⚪')} {SHIFT.time(s)} — {status}"
 
 
 def no_current_shift() -> str:
@@ -212,23 +254,18 @@ def proof_submitted() -> str:
 
 
 def notification_new_task(t: dict[str, Any]) -> str:
-    tz = _get_tz(t)
-    deadline = _format_deadline(t.get("deadline"), tz)
-    priority_icon = _priority_icon(t.get("priority", "medium"))
     return (
         f"🔔 <b>Новая задача #{t['id']}</b>\n\n"
-        f"{priority_icon} {t['title']}\n"
-        f"Дедлайн: {deadline}"
+        f"{TASK.priority(t)} {t['title']}\n"
+        f"Дедлайн: {TASK.deadline(t)}"
     )
 
 
 def notification_deadline_soon(t: dict[str, Any], minutes: int) -> str:
-    tz = _get_tz(t)
-    deadline = _format_deadline(t.get("deadline"), tz)
     return (
         f"⏰ <b>Дедлайн через {minutes} мин!</b>\n\n"
         f"Задача #{t['id']}: {t['title']}\n"
-        f"Дедлайн: {deadline}"
+        f"Дедлайн: {TASK.deadline(t)}"
     )
 
 
@@ -250,7 +287,7 @@ def notification_rejected(t: dict[str, Any], reason: str = "") -> str:
 def dashboard_summary(d: dict[str, Any], role: str = "") -> str:
     lines = [
         "📊 <b>Дашборд</b>\n",
-        "━━━━━━━━━━━━━━━━━━",
+        SEPARATOR,
         "<b>📋 Задачи</b>",
         f"  Активных: {d.get('active_tasks', 0)}",
         f"  Выполнено: {d.get('completed_tasks', 0)}",
@@ -283,37 +320,33 @@ def dashboard_summary(d: dict[str, Any], role: str = "") -> str:
     overdue = d.get("overdue_tasks_list", [])
     if overdue:
         lines.append("")
-        lines.append("━━━━━━━━━━━━━━━━━━")
+        lines.append(SEPARATOR)
         lines.append("🔴 <b>Просроченные задачи</b>\n")
         for t in overdue[:5]:
-            pri = _priority_icon(t.get("priority", "medium"))
-            tz = _get_tz(t)
-            deadline = _format_deadline(t.get("deadline"), tz)
-            lines.append(f"  {pri} <b>#{t['id']}</b> {t.get('title', '')}")
-            lines.append(f"     Дедлайн: {deadline}")
+            lines.append(f"  {TASK.priority(t)} <b>#{t['id']}</b> {t.get('title', '')}")
+            lines.append(f"     Дедлайн: {TASK.deadline(t)}")
 
     # На проверке
     pending = d.get("pending_review_tasks", [])
     if pending:
         lines.append("")
-        lines.append("━━━━━━━━━━━━━━━━━━")
+        lines.append(SEPARATOR)
         lines.append("🟡 <b>На проверке</b>\n")
         for t in pending[:5]:
-            pri = _priority_icon(t.get("priority", "medium"))
-            lines.append(f"  {pri} <b>#{t['id']}</b> {t.get('title', '')}")
+            lines.append(f"  {TASK.priority(t)} <b>#{t['id']}</b> {t.get('title', '')}")
 
     # Активные смены
     shifts = d.get("active_shifts", [])
     if shifts:
         lines.append("")
-        lines.append("━━━━━━━━━━━━━━━━━━")
+        lines.append(SEPARATOR)
         lines.append("🟢 <b>Активные смены</b>\n")
         for s in shifts[:5]:
             user = s.get("user", {})
             name = user.get("full_name", "—")
             dealer = s.get("dealership", {}).get("name", "")
             status = s.get("status", "")
-            icon = {"open": "🟢", "late": "🟡"}.get(status, "⚪")
+            icon = SHIFT_STATUS_ICONS[status] if status in ("open", "late") else "⚪"
             line = f"  {icon} {name}"
             if dealer:
                 line += f" — {dealer}"
@@ -323,7 +356,7 @@ def dashboard_summary(d: dict[str, Any], role: str = "") -> str:
     dealer_stats = d.get("dealership_shift_stats", [])
     if dealer_stats:
         lines.append("")
-        lines.append("━━━━━━━━━━━━━━━━━━")
+        lines.append(SEPARATOR)
         lines.append("🏢 <b>Автосалоны</b>\n")
         active_shifts = d.get("active_shifts", []) or []
         for ds in dealer_stats[:5]:
@@ -361,33 +394,21 @@ def dashboard_summary(d: dict[str, Any], role: str = "") -> str:
 
 def task_list_item_text(t: dict[str, Any]) -> str:
     """Краткий текст задачи для списка (одно сообщение на задачу)."""
-    status_icon = _status_icon(t.get("status", ""))
-    priority_icon = _priority_icon(t.get("priority", "medium"))
-    tz = _get_tz(t)
-    deadline = _format_deadline(t.get("deadline"), tz)
-    assignees = []
-    if t.get("assignments"):
-        assignees = [a.get("user", {}).get("full_name", "—") for a in t["assignments"]]
-    assignee_text = f"\nИсполнители: {', '.join(assignees)}" if assignees else ""
+    assignee_text = f"\nИсполнители: {TASK.assignees(t)}" if t.get("assignments") else ""
     return (
-        f"{status_icon} {priority_icon} <b>#{t['id']}</b> {t['title']}\n"
-        f"Дедлайн: {deadline}{assignee_text}"
+        f"{TASK.icons(t)} <b>#{t['id']}</b> {t['title']}\n"
+        f"Дедлайн: {TASK.deadline(t)}{assignee_text}"
     )
 
 
 def overdue_task_list(tasks: list[dict[str, Any]]) -> str:
     if not tasks:
         return "🔴 Нет просроченных задач."
-    lines = ["🔴 <b>Просроченные задачи</b>\n"]
-    for t in tasks:
-        priority_icon = _priority_icon(t.get("priority", "medium"))
-        tz = _get_tz(t)
-        deadline = _format_deadline(t.get("deadline"), tz)
-        lines.append(
-            f"{priority_icon} <b>#{t['id']}</b> {t['title']}"
-            f"\n   Дедлайн: {deadline}"
-        )
-    return "\n".join(lines)
+    return "\n".join(["🔴 <b>Просроченные задачи</b>\n", *render_many(_overdue_line, tasks)])
+
+
+def _overdue_line(t: dict[str, Any]) -> str:
+    return f"{TASK.priority(t)} <b>#{t['id']}</b> {t['title']}\n   Дедлайн: {TASK.deadline(t)}"
 
 
 def review_task_card(
@@ -400,10 +421,6 @@ def review_task_card(
     responses — список pending_review responses (для групповых задач).
     response — одиночный response (обратная совместимость / индивидуальный просмотр).
     """
-    priority_icon = _priority_icon(t.get("priority", "medium"))
-    tz = _get_tz(t)
-    deadline = _format_deadline(t.get("deadline"), tz)
-
     # Собираем список pending responses
     pending = responses or ([response] if response else [])
 
@@ -418,7 +435,7 @@ def review_task_card(
     is_group = len(pending) > 1
 
     lines = [
-        f"🟡 {priority_icon} <b>Задача #{t['id']}</b>",
+        f"🟡 {TASK.priority(t)} <b>Задача #{t['id']}</b>",
         f"<b>{t.get('title', '')}</b>",
     ]
     if t.get("description"):
@@ -453,7 +470,7 @@ def review_task_card(
             name = pending[0]["user"].get("full_name", "—")
         lines.append(f"👤 Исполнитель: {name}")
 
-    lines.append(f"📅 Дедлайн: {deadline}")
+    lines.append(f"📅 Дедлайн: {TASK.deadline(t)}")
 
     if proofs_count:
         lines.append(f"📎 Файлов: {proofs_count}")
@@ -487,14 +504,11 @@ def rejection_reason_prompt() -> str:
 
 def notification_pending_review(t: dict[str, Any], submitted_by: str = "") -> str:
     """Уведомление менеджеру о новой задаче на проверку."""
-    priority_icon = _priority_icon(t.get("priority", "medium"))
-    tz = _get_tz(t)
-    deadline = _format_deadline(t.get("deadline"), tz)
     lines = [
         f"📋 <b>Новая задача на проверку #{t['id']}</b>",
         "",
-        f"{priority_icon} {t.get('title', '')}",
-        f"Дедлайн: {deadline}",
+        f"{TASK.priority(t)} {t.get('title', '')}",
+        f"Дедлайн: {TASK.deadline(t)}",
     ]
     if submitted_by:
         lines.append(f"Отправил: {submitted_by}")
@@ -504,26 +518,14 @@ def notification_pending_review(t: dict[str, Any], submitted_by: str = "") -> st
 def shift_card_for_manager(s: dict[str, Any]) -> str:
     """Карточка смены для менеджера."""
     user_name = s.get("user", {}).get("full_name", "—")
-    dealership = s.get("dealership", {}).get("name", "—")
-    tz = _get_tz(s)
-    start = _format_datetime(s.get("shift_start"), tz)
-    sched_start = _format_datetime(s.get("scheduled_start"), tz)
-    sched_end = _format_datetime(s.get("scheduled_end"), tz)
-    status = s.get("status", "")
-    late_min = s.get("late_minutes", 0)
-
-    status_labels = {
-        "open": "🟢 Вовремя",
-        "late": f"🟡 Опоздание ({late_min} мин)",
-        "closed": "⚪ Закрыта",
-        "replaced": "🔄 Замена",
-    }
-    status_text = status_labels.get(status, status)
+    status_text = SHIFT.status(s, SHIFT_ARRIVAL_LABELS)
+    if s.get("status", "") == "late":
+        status_text += f" ({s.get('late_minutes', 0)} мин)"
 
     lines = [
-        f"<b>{user_name}</b> — {dealership}",
-        f"Открыта: {start}",
-        f"Расписание: {sched_start} – {sched_end}",
+        f"<b>{user_name}</b> — {SHIFT.dealership(s)}",
+        f"Открыта: {SHIFT.time(s)}",
+        f"Расписание: {SHIFT.time(s, 'scheduled_start')} – {SHIFT.time(s, 'scheduled_end')}",
         f"Статус: {status_text}",
     ]
     return "\n".join(lines)
@@ -545,22 +547,12 @@ def no_current_shift_with_action() -> str:
 
 
 def shift_info_with_action(s: dict[str, Any]) -> str:
-    tz = _get_tz(s)
-    start = _format_datetime(s.get("shift_start"), tz)
-    status_labels = {
-        "open": "🟢 Открыта",
-        "late": "🟡 Опоздание",
-        "closed": "⚪ Закрыта",
-        "replaced": "🔄 Замена",
-    }
-    status = status_labels.get(s.get("status", ""), s.get("status", ""))
-    dealership = s.get("dealership", {}).get("name", "—")
     late_min = s.get("late_minutes", 0)
     lines = [
         "🏢 <b>Смена</b>\n",
-        f"Статус: {status}",
-        f"Начало: {start}",
-        f"Автосалон: {dealership}",
+        f"Статус: {SHIFT.status(s)}",
+        f"Начало: {SHIFT.time(s)}",
+        f"Автосалон: {SHIFT.dealership(s)}",
     ]
     if late_min:
         lines.append(f"Опоздание: {late_min} мин")
@@ -584,20 +576,13 @@ def shift_close_photo_prompt() -> str:
 
 
 def shift_opened_success(s: dict[str, Any]) -> str:
-    tz = _get_tz(s)
-    start = _format_datetime(s.get("shift_start"), tz)
-    status_labels = {
-        "open": "🟢 Вовремя",
-        "late": "🟡 Опоздание",
-    }
-    status = status_labels.get(s.get("status", ""), s.get("status", ""))
-    dealership = s.get("dealership", {}).get("name", "—")
+    status = s.get("status", "")
     late_min = s.get("late_minutes", 0)
     lines = [
         "✅ <b>Смена открыта!</b>\n",
-        f"Статус: {status}",
-        f"Начало: {start}",
-        f"Автосалон: {dealership}",
+        f"Статус: {SHIFT_ARRIVAL_LABELS[status] if status in ('open', 'late') else status}",
+        f"Начало: {SHIFT.time(s)}",
+        f"Автосалон: {SHIFT.dealership(s)}",
     ]
     if late_min:
         lines.append(f"Опоздание: {late_min} мин")
@@ -605,15 +590,11 @@ def shift_opened_success(s: dict[str, Any]) -> str:
 
 
 def shift_closed_success(s: dict[str, Any]) -> str:
-    tz = _get_tz(s)
-    start = _format_datetime(s.get("shift_start"), tz)
-    end = _format_datetime(s.get("shift_end"), tz)
-    dealership = s.get("dealership", {}).get("name", "—")
     return (
         "🔒 <b>Смена закрыта</b>\n\n"
-        f"Начало: {start}\n"
-        f"Конец: {end}\n"
-        f"Автосалон: {dealership}"
+        f"Начало: {SHIFT.time(s)}\n"
+        f"Конец: {SHIFT.time(s, 'shift_end')}\n"
+        f"Автосалон: {SHIFT.dealership(s)}"
     )
 
 
@@ -624,27 +605,8 @@ def delegation_requested_notification(
     task: dict[str, Any], from_user: str, reason: str = "",
 ) -> str:
     """Уведомление: входящий запрос на делегирование (RabbitMQ)."""
-    task_id = task.get("id", "?")
-    task_title = task.get("title", "—")
-    task_desc = task.get("description", "")
-    deadline = task.get("deadline")
-    priority = task.get("priority", "medium")
-    priority_icon = {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "⚪")
-
-    lines = [
-        f"🔄 <b>Запрос на делегирование</b>",
-        "",
-        f"{priority_icon} <b>Задача #{task_id}</b>: {task_title}",
-    ]
-
-    if task_desc:
-        desc_preview = task_desc[:100] + "..." if len(task_desc) > 100 else task_desc
-        lines.append(f"<i>{desc_preview}</i>")
-
-    if deadline:
-        tz = _get_tz(task)
-        dl = _format_deadline(deadline, tz)
-        lines.append(f"📅 Дедлайн: {dl}")
+    lines = ["🔄 <b>Запрос на делегирование</b>", "", DELEGATION.task_line(task)]
+    DELEGATION.add_details(lines, task, preview=100)
 
     lines.append(f"👤 От: {from_user}")
 
@@ -659,27 +621,8 @@ def delegation_accepted_notification(
     task: dict[str, Any], to_user: str,
 ) -> str:
     """Уведомление: делегирование принято."""
-    task_id = task.get("id", "?")
-    task_title = task.get("title", "—")
-    task_desc = task.get("description", "")
-    deadline = task.get("deadline")
-    priority = task.get("priority", "medium")
-    priority_icon = {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "⚪")
-
-    lines = [
-        f"✅ <b>Делегирование принято</b>",
-        "",
-        f"{priority_icon} <b>Задача #{task_id}</b>: {task_title}",
-    ]
-
-    if task_desc:
-        desc_preview = task_desc[:80] + "..." if len(task_desc) > 80 else task_desc
-        lines.append(f"<i>{desc_preview}</i>")
-
-    if deadline:
-        tz = _get_tz(task)
-        dl = _format_deadline(deadline, tz)
-        lines.append(f"📅 Дедлайн: {dl}")
+    lines = ["✅ <b>Делегирование принято</b>", "", DELEGATION.task_line(task)]
+    DELEGATION.add_details(lines, task, preview=80)
 
     lines.append(f"👤 Принял: {to_user}")
     return "\n".join(lines)
@@ -689,15 +632,10 @@ def delegation_rejected_notification(
     task: dict[str, Any], to_user: str, reason: str = "",
 ) -> str:
     """Уведомление: делегирование отклонено."""
-    task_id = task.get("id", "?")
-    task_title = task.get("title", "—")
-    priority = task.get("priority", "medium")
-    priority_icon = {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "⚪")
-
     lines = [
-        f"❌ <b>Делегирование отклонено</b>",
+        "❌ <b>Делегирование отклонено</b>",
         "",
-        f"{priority_icon} <b>Задача #{task_id}</b>: {task_title}",
+        DELEGATION.task_line(task),
         f"👤 Отклонил: {to_user}",
     ]
     if reason:
@@ -736,57 +674,63 @@ def delegation_reason_prompt(task_id: int, to_user_name: str) -> str:
     )
 
 
-def delegation_list(
-    delegations: list[dict[str, Any]], direction: str = "",
+def delegations_view(
+    tab: str, items: list[dict[str, Any]], page: int, pages: int, total: int,
 ) -> str:
-    """Список делегаций."""
-    if not delegations:
-        return "🔄 Нет активных делегирований."
-
-    title = "🔄 <b>Делегирования</b>"
-    if direction == "incoming":
-        title = "📥 <b>Входящие делегирования</b>"
-    elif direction == "outgoing":
-        title = "📤 <b>Исходящие делегирования</b>"
-
-    lines = [title, ""]
-    for d in delegations:
-        dlg_id = d.get("id", "?")
-        task = d.get("task", {})
-        from_u = d.get("from_user", {}).get("full_name", "—")
-        to_u = d.get("to_user", {}).get("full_name", "—")
-        status = d.get("status", "")
-        status_icons = {
-            "pending": "🟡",
-            "accepted": "✅",
-            "rejected": "❌",
-            "cancelled": "🚫",
-        }
-        icon = status_icons.get(status, "⚪")
-
-        task_title = task.get("title", "—")
-        task_desc = task.get("description", "")
-        deadline = task.get("deadline")
-        priority = task.get("priority", "medium")
-        priority_icon = _priority_icon(priority)
-
-        lines.append(
-            f"{icon} <b>#{dlg_id}</b> Задача #{task.get('id', '?')}\n"
-            f"{priority_icon} {task_title}"
-        )
-
-        if task_desc:
-            desc_preview = task_desc[:100] + "..." if len(task_desc) > 100 else task_desc
-            lines.append(f"   <i>{desc_preview}</i>")
-
-        if deadline:
-            tz = _get_tz(task)
-            dl = _format_deadline(deadline, tz)
-            lines.append(f"   📅 Дедлайн: {dl}")
-
-        lines.append(f"   {from_u} → {to_u}")
-
-    return "\n".join(lines)
+    """Одна страница вкладки делегирований (входящие / исходящие / история)."""
+    header = f"🔄 <b>Делегирования — {DELEGATION_TABS[tab]}</b> ({total})"
+    if pages > 1:
+        header += f"\nСтраница {page + 1}/{pages}"
+    if not items:
+        return f"{header}\n\n{DELEGATION_EMPTY[tab]}"
+    render = {
+        "in": _incoming_delegation,
+        "out": _outgoing_delegation,
+        "hist": _delegation_history,
+    }[tab]
+    parts = [header]
+    size = len(header)
+    rendered = render_many(render, items)
+    for shown, part in enumerate(rendered):
+        size += len(part) + 2
+        if size > MESSAGE_LIMIT - _MESSAGE_TAIL_RESERVE:
+            # Страница не влезает в сообщение — остальное доступно по кнопкам
+            parts.append(f"… ещё {len(rendered) - shown}")
+            break
+        parts.append(part)
+    return "\n\n".join(parts)
+
+
+def _incoming_delegation(d: dict[str, Any]) -> str:
+    task = d.get("task", {})
+    text = DELEGATION.task_line(task)
+    task_desc = task.get("description", "")
+    if task_desc:
+        text += f"\n   <i>{_preview(task_desc, 60)}</i>"
+    if task.get("deadline"):
+        text += f"\n   📅 {TASK.deadline(task)}"
+    if d.get("reason"):
+        text += f"\n   💬 {_preview(d['reason'], DELEGATION_REASON_PREVIEW)}"
+    return f"{text}\n👤 От: {DELEGATION.name(d, 'from_user')}"
+
+
+def _outgoing_delegation(d: dict[str, Any]) -> str:
+    text = DELEGATION.task_line(d.get("task", {}))
+    return f"{text}\n👤 Кому: {DELEGATION.name(d, 'to_user')}"
+
+
+def _delegation_history(d: dict[str, Any]) -> str:
+    task = d.get("task", {})
+    status = d.get("status", "")
+    text = (
+        f"{DELEGATION_STATUS_ICONS.get(status, '⚪')} "
+        f"<b>Задача #{task.get('id', '?')}</b>: {task.get('title', '—')}\n"
+        f"   {DELEGATION.name(d, 'from_user')} → {DELEGATION.name(d, 'to_user')}\n"
+        f"   📜 {DELEGATION_STATUS_LABELS.get(status, status)}"
+    )
+    if d.get("responded_at"):
+        text += f" ({_format_deadline(d['responded_at'])})"
+    return text
 
 
 def no_eligible_users() -> str:
@@ -810,31 +754,36 @@ def _extract_reject_reason(t: dict[str, Any]) -> str:
 
 
 def _status_icon(status: str) -> str:
-    return {
-        "pending": "🔵",
-        "acknowledged": "👁",
-        "pending_review": "🟡",
-        "completed": "✅",
-        "completed_late": "⚠️",
-        "overdue": "🔴",
-        "rejected": "❌",
-    }.get(status, "⚪")
+    return TASK_STATUS_ICONS.get(status, "⚪")
 
 
 def _status_label(status: str) -> str:
-    return {
-        "pending": "Ожидает",
-        "acknowledged": "Ознакомлен",
-        "pending_review": "На проверке",
-        "completed": "Выполнено",
-        "completed_late": "Выполнено с опозданием",
-        "overdue": "Просрочено",
-        "rejected": "Отклонено",
-    }.get(status, status)
+    return TASK_STATUS_LABELS.get(status, status)
 
 
-def _priority_icon(priority: str) -> str:
-    return {"low": "🟢", "medium": "🟡", "high": "🔴"}.get(priority, "")
+def _preview(text: str, limit: int) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+_DATETIME_FORMAT = "%d.%m.%Y %H:%M"
+_OFFSET_RE = re.compile(r"^([+-])(\d{1,2}):(\d{2})$")
+
+
+@functools.lru_cache(maxsize=256)
+def _zone(tz_name: str) -> tzinfo | None:
+    """Пояс автосалона: IANA-имя (Asia/Tashkent) или смещение (+05:00)."""
+    try:
+        return ZoneInfo(tz_name)
+    except Exception:
+        pass
+    m = _OFFSET_RE.match(tz_name.strip())
+    if not m:
+        return None
+    sign = 1 if m.group(1) == "+" else -1
+    try:
+        return timezone(timedelta(hours=int(m.group(2)), minutes=int(m.group(3))) * sign)
+    except ValueError:
+        return None
 
 
 def _format_deadline(deadline: str | None, tz_name: str | None = None) -> str:
@@ -842,30 +791,12 @@ def _format_deadline(deadline: str | None, tz_name: str | None = None) -> str:
         return "—"
     try:
         dt = datetime.fromisoformat(deadline.replace("Z", "+00:00"))
-        if tz_name:
-            try:
-                # Попытка как IANA-имя (Asia/Tashkent)
-                local_tz = ZoneInfo(tz_name)
-                dt = dt.astimezone(local_tz)
-                return dt.strftime("%d.%m.%Y %H:%M")
-            except (KeyError, Exception):
-                pass
-            try:
-                # Попытка как offset-строка (+05:00, +05:30, -03:00)
-                m = re.match(r'^([+-])(\d{1,2}):(\d{2})$', tz_name.strip())
-                if m:
-                    sign = 1 if m.group(1) == '+' else -1
-                    hours = int(m.group(2))
-                    minutes = int(m.group(3))
-                    offset = timedelta(hours=hours, minutes=minutes) * sign
-                    local_dt = dt.astimezone(timezone(offset))
-                    return local_dt.strftime("%d.%m.%Y %H:%M")
-            except Exception:
-                pass
-        return dt.strftime("%d.%m.%Y %H:%M") + " (UTC)"
     except (ValueError, AttributeError):
         return deadline
-
+    zone = _zone(tz_name) if tz_name and isinstance(tz_name, str) else None
+    if zone is not None:
+        return dt.astimezone(zone).strftime(_DATETIME_FORMAT)
+    return dt.strftime(_DATETIME_FORMAT) + " (UTC)"
 
 
 def _format_datetime(dt_str: str | None, tz_name: str | None = None) -> str:
@@ -878,3 +809,77 @@ def _get_tz(obj: dict[str, Any]) -> str | None:
     if isinstance(d, dict):
         return d.get("timezone")
     return None
+
+
+# --- Форматтеры ---
+
+
+class TaskFormatter:
+    """Общие фрагменты задачи: иконки, дедлайн в поясе автосалона, исполнители."""
+
+    __slots__ = ()
+
+    def icons(self, t: dict[str, Any]) -> str:
+        return f"{_status_icon(t.get('status', ''))} {self.priority(t)}"
+
+    def priority(self, t: dict[str, Any]) -> str:
+        return PRIORITY_ICONS.get(t.get("priority", "medium"), "")
+
+    def deadline(self, t: dict[str, Any]) -> str:
+        return _format_deadline(t.get("deadline"), _get_tz(t))
+
+    def assignees(self, t: dict[str, Any]) -> str:
+        """Имена исполнителей через запятую."""
+        return ", ".join(
+            a.get("user", {}).get("full_name", "—") for a in t.get("assignments") or ()
+        )
+
+
+class ShiftFormatter:
+    """Общие фрагменты смены: статус, время в поясе автосалона, автосалон."""
+
+    __slots__ = ()
+
+    def status(self, s: dict[str, Any], labels: dict[str, str] = SHIFT_STATUS_LABELS) -> str:
+        status = s.get("status", "")
+        return labels.get(status, status)
+
+    def time(self, s: dict[str, Any], field: str = "shift_start") -> str:
+        return _format_datetime(s.get(field), _get_tz(s))
+
+    def dealership(self, s: dict[str, Any]) -> str:
+        return s.get("dealership", {}).get("name", "—")
+
+
+class DelegationFormatter:
+    """Общие фрагменты делегирования: строка задачи, участники, детали."""
+
+    __slots__ = ()
+
+    def task_line(self, task: dict[str, Any]) -> str:
+        icon = PRIORITY_ICONS.get(task.get("priority", "medium"), "⚪")
+        return f"{icon} <b>Задача #{task.get('id', '?')}</b>: {task.get('title', '—')}"
+
+    def name(self, d: dict[str, Any], role: str) -> str:
+        return d.get(role, {}).get("full_name", "—")
+
+    def add_details(self, lines: list[str], task: dict[str, Any], *, preview: int) -> None:
+        """Описание (обрезанное до ``preview``) и дедлайн задачи."""
+        if task.get("description", ""):
+            lines.append(f"<i>{_preview(task['description'], preview)}</i>")
+        if task.get("deadline"):
+            lines.append(f"📅 Дедлайн: {TASK.deadline(task)}")
+
+
+TASK = TaskFormatter()
+SHIFT = ShiftFormatter()
+DELEGATION = DelegationFormatter()
+
+
+def render_many(render: Callable[[T], str], items: Iterable[T]) -> list[str]:
+    """Отрисовать элементы списка одним шаблоном.
+
+    Пояс каждого автосалона разрешается один раз (``_zone``) и переиспользуется
+    всеми элементами списка и последующими вызовами.
+    """
+    return [render(item) for item in items]
@@ -14,14 +14,76 @@ class Settings(BaseSettings):
     valkey_db: int = 1
     valkey_fsm_db: int = 2
 
+    # Пул соединений Valkey: максимум соединений, ожидание свободного
+    # (секунды), таймаут сокета и интервал health-check (секунды)
+    valkey_max_connections: int = 50
+    valkey_pool_timeout: float = 5.0
+    valkey_socket_timeout: float = 5.0
+    valkey_health_check_interval: int = 30
+
+    # Локальный кэш сессий с инвалидацией через CLIENT TRACKING и его размер
+    valkey_client_cache: bool = False
+    valkey_client_cache_size: int = 10000
+
     rabbitmq_host: str = "rabbitmq"
     rabbitmq_port: int = 5672
     rabbitmq_user: str = "taskmate"
     rabbitmq_password: str = "taskmate_secret"
     rabbitmq_vhost: str = "/"
 
+    # Повторы недоставленных уведомлений: число попыток и экспоненциальная
+    # задержка (секунды) между ними, после чего сообщение уходит в DLQ
+    rabbitmq_retry_max_attempts: int = 5
+    rabbitmq_retry_base_delay: int = 5
+    rabbitmq_retry_max_delay: int = 600
+
+    # Повторы запросов к API (идемпотентные методы и вызовы с Idempotency-Key):
+    # всего попыток и границы задержки с jitter (секунды)
+    api_retry_attempts: int = 3
+    api_retry_base_delay: float = 0.2
+    api_retry_max_delay: float = 2.0
+    # Повторять и изменяющие вызовы (POST/PATCH с Idempotency-Key) — только
+    # если backend отбрасывает дубликаты по этому ключу
+    api_retry_mutations: bool = False
+
+    # Одновременные запросы к API на процесс: адаптивный общий лимит
+    # (AIMD) в пределах min…limit, латентность, выше которой он снижается
+    # (секунды), и бюджеты фоновых (поллер, worker) и multipart-загрузок;
+    # interactive может занять весь общий лимит
+    api_concurrency_limit: int = 64
+    api_concurrency_min: int = 4
+    api_latency_target: float = 2.0
+    api_background_concurrency: int = 24
+    api_upload_concurrency: int = 8
+
+    # Circuit breaker группы эндпоинтов API: сбоев подряд до открытия, пауза
+    # до пробных запросов (секунды) и успешных проб до закрытия
+    api_breaker_failures: int = 5
+    api_breaker_reset: float = 30.0
+    api_breaker_probes: int = 3
+
     log_level: str = "INFO"
 
+    # Порт HTTP-эндпоинта Prometheus /metrics (0 — отключить)
+    metrics_port: int = 9100
+
+    # Экспорт трассировки: none | console | file | otlp
+    tracing_exporter: str = "none"
+    tracing_file: str = "traces.jsonl"
+
+    # Сколько апдейтов Telegram обрабатывается одновременно (все чаты вместе);
+    # апдейты одного чата всегда обрабатываются по очереди
+    update_concurrency_limit: int = 64
+
+    # TTL состояния FSM вместе с его данными в Valkey (секунды): брошенные
+    # сценарии (доказательства, смены, причины отклонения) истекают сами;
+    # интервал проверки буферов доказательств (секунды)
+    fsm_ttl: int = 3600
+    proof_sweep_interval: int = 300
+
+    # Окно сбора альбома (media_group) в одну пачку (секунды)
+    media_group_window: float = 0.6
+
     # Интервал polling дедлайнов (секунды)
     polling_interval_deadlines: int = 300
 
@@ -29,8 +91,32 @@ class Settings(BaseSettings):
     polling_interval_new_tasks: int = 120
     polling_interval_overdue: int = 600
 
-    # TTL сессий в Valkey (секунды, по умолчанию 7 дней)
+    # Доля интервала, на которую разносятся сессии внутри прохода polling
+    polling_jitter: float = 0.5
+
+    # Синхронизация задач для polling: incremental — только изменённые с
+    # курсора (updated_since) с индексом активных задач в Valkey, full —
+    # все задачи на каждом проходе; интервал полной сверки индекса (секунды)
+    task_sync_mode: str = "incremental"
+    task_sync_full_interval: int = 3600
+
+    # JSON-бэкенд: auto | orjson | msgspec | json; тела от порога (байт)
+    # разбираются в отдельном потоке
+    json_backend: str = "auto"
+    json_thread_threshold: int = 262144
+
+    # Скачивание фото (proof, смены): максимум байт (лимит Telegram на фото —
+    # 10 МБ) и порог, с которого тело пишется во временный файл
+    download_max_bytes: int = 10485760
+    download_spool_threshold: int = 1048576
+
+    # TTL кэша справочника сотрудников автосалона (секунды)
+    employee_directory_ttl: int = 3600
+
+    # TTL сессий в Valkey (секунды, по умолчанию 7 дней); продлевается не
+    # чаще раза в session_refresh_interval секунд на чат
     session_ttl_seconds: int = 604800
+    session_refresh_interval: int = 3600
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
@@ -5,15 +5,25 @@ from __future__ import annotations
 import asyncio
 import logging
 
+from aiogram import Dispatcher
 from apscheduler import AsyncScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from src.api.client import close_http_client
-from src.bot.bot import AuthMiddleware, ReplyKeyboardMiddleware, bot, create_dispatcher
+from src.bot.bot import (
+    AuthMiddleware,
+    HandlerMetricsMiddleware,
+    ReplyKeyboardMiddleware,
+    bot,
+    create_dispatcher,
+)
 from src.bot.handlers import auth, common, delegations, menu, review, shifts, tasks
 from src.config import settings
-from src.scheduler.polling import check_deadlines
+from src.scheduler.polling import check_deadlines, check_new_tasks, check_overdue
+from src.scheduler.sweeper import sweep_proof_buffers
 from src.storage import sessions
+from src.utils.metrics import start_metrics_server
+from src.utils.tracing import setup_tracing, shutdown_tracing
 
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper(), logging.INFO),
@@ -22,13 +32,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def main() -> None:
-    logger.info("Запуск TaskMateBot...")
+def setup_routers(dp: Dispatcher) -> None:
+    """Подключить роутеры обработчиков и их middleware к диспетчеру."""
+    # Регистрация роутеров (common без auth middleware, остальные с ним).
+    # Метрики — inner middleware: к этому моменту роутер и фильтры уже выбраны
+    for r in (common.router, auth.router, tasks.router, shifts.router, review.router, delegations.router, menu.router):
+        r.message.middleware(HandlerMetricsMiddleware())
+        r.callback_query.middleware(HandlerMetricsMiddleware())
 
-    # Создание диспетчера с Redis хранилищем
-    dp = await create_dispatcher()
-
-    # Регистрация роутеров (common без auth middleware, остальные с ним)
     dp.include_router(common.router)
 
     # Роутеры, требующие авторизации
@@ -39,17 +50,42 @@ async def main() -> None:
         r.callback_query.middleware(ReplyKeyboardMiddleware())
         dp.include_router(r)
 
-    # Запуск scheduler для polling дедлайнов
+
+async def main() -> None:
+    logger.info("Запуск TaskMateBot...")
+    start_metrics_server(settings.metrics_port)
+    setup_tracing("taskmate-bot")
+
+    # Создание диспетчера с Redis хранилищем
+    dp = await create_dispatcher()
+
+    setup_routers(dp)
+
+    # Запуск scheduler для polling новых задач, дедлайнов и просрочек
     async with AsyncScheduler() as scheduler:
+        for job, interval in (
+            (check_new_tasks, settings.polling_interval_new_tasks),
+            (check_deadlines, settings.polling_interval_deadlines),
+            (check_overdue, settings.polling_interval_overdue),
+        ):
+            await scheduler.add_schedule(
+                job,
+                IntervalTrigger(seconds=interval),
+                id=job.__name__,
+                kwargs={"bot": bot},
+                # Проход растянут jitter-ом почти на интервал — не запускать
+                # следующий, пока не закончился текущий
+                max_running_jobs=1,
+            )
         await scheduler.add_schedule(
-            check_deadlines,
-            IntervalTrigger(seconds=settings.polling_interval_deadlines),
-            id="check_deadlines",
-            kwargs={"bot": bot},
+            sweep_proof_buffers,
+            IntervalTrigger(seconds=settings.proof_sweep_interval),
+            id="sweep_proof_buffers",
+            kwargs={"storage": dp.storage, "bot_id": bot.id},
         )
         await scheduler.start_in_background()
 
-        logger.info("Scheduler дедлайнов запущен")
+        logger.info("Scheduler polling запущен")
 
         try:
             await dp.start_polling(bot)
@@ -58,6 +94,7 @@ async def main() -> None:
             await close_http_client()
             await sessions.close()
             await bot.session.close()
+            shutdown_tracing()
 
 
 if __name__ == "__main__":
@@ -1,25 +1,58 @@
-"""RabbitMQ consumer для получения событий задач от backend."""
+"""RabbitMQ consumer для получения событий задач от backend.
+
+Топология:
+- ``telegram_notifications`` — основная очередь (привязана к fanout ``task_events``);
+- ``telegram_notifications.retry.<N>s`` — очереди отложенного повтора с TTL,
+  по истечении которого сообщение возвращается в основную очередь;
+- ``telegram_notifications.dlq`` — сообщения, которые не удалось обработать
+  (битый JSON или исчерпаны попытки). Просмотр/повтор: ``python -m src.rabbitmq.dlq``.
+
+Повторяется не весь payload, а только получатели, которым не удалось доставить
+уведомление (``user_ids`` в повторном сообщении сужается до них).
+"""
 
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 import time
+from datetime import datetime, timezone
+from typing import Any
 
 import aio_pika
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
 
+from ..api import admission
 from ..api.client import TaskMateAPI
+from ..api.models import Task
 from ..bot import keyboards, messages
 from ..config import settings
+from ..storage import directory
 from ..storage.notifications import add_notified, is_notified
 from ..storage.sessions import UserSession, get_all_sessions
+from ..utils import jsonlib, metrics, tracing
 from ..utils.tz_utils import attach_dealership_timezone
 
 logger = logging.getLogger(__name__)
 
 EXCHANGE_NAME = "task_events"
 QUEUE_NAME = "telegram_notifications"
+RETRY_QUEUE_PREFIX = f"{QUEUE_NAME}.retry."
+DLQ_NAME = f"{QUEUE_NAME}.dlq"
+
+# Заголовки служебных сообщений (повтор / DLQ)
+RETRY_HEADER = "x-tmbot-retry"
+REASON_HEADER = "x-tmbot-reason"
+FAILED_AT_HEADER = "x-tmbot-failed-at"
+
+# Ошибки Telegram, которые не исправятся повтором (бот заблокирован, чат удалён…)
+_PERMANENT_SEND_ERRORS = (TelegramForbiddenError, TelegramBadRequest)
+
+# События, после которых закэшированные исполнители задачи устаревают
+_ASSIGNMENT_EVENTS = frozenset(
+    {"task.assigned", "task.updated", "task.delegation_accepted"}
+)
 
 # Кэш сессий: обновляется не чаще раз в 60 секунд
 _sessions_cache: dict[int, UserSession] = {}
@@ -31,50 +64,251 @@ async def _get_cached_sessions() -> dict[int, UserSession]:
     """Получить сессии с кэшированием."""
     global _sessions_cache, _cache_updated_at
     now = time.monotonic()
-    if now - _cache_updated_at > _CACHE_TTL:
+    expired = now - _cache_updated_at > _CACHE_TTL
+    metrics.record_cache("sessions", not expired)
+    if expired:
         _sessions_cache = await get_all_sessions()
         _cache_updated_at = now
     return _sessions_cache
 
 
-async def start_consumer(bot: Bot) -> None:
-    """Запустить RabbitMQ consumer. Блокирующий — запускать как asyncio task."""
-    url = (
+def amqp_url() -> str:
+    """URL подключения к RabbitMQ из настроек."""
+    return (
         f"amqp://{settings.rabbitmq_user}:{settings.rabbitmq_password}"
         f"@{settings.rabbitmq_host}:{settings.rabbitmq_port}{settings.rabbitmq_vhost}"
     )
 
-    connection = await aio_pika.connect_robust(url)
-    channel = await connection.channel()
-    await channel.set_qos(prefetch_count=10)
 
+def retry_delays() -> list[int]:
+    """Задержки (сек) для каждой попытки: base * 2^n, но не больше max."""
+    base = max(1, settings.rabbitmq_retry_base_delay)
+    cap = max(base, settings.rabbitmq_retry_max_delay)
+    return [
+        min(base * 2**attempt, cap)
+        for attempt in range(max(0, settings.rabbitmq_retry_max_attempts))
+    ]
+
+
+def retry_queue_name(delay: int) -> str:
+    return f"{RETRY_QUEUE_PREFIX}{delay}s"
+
+
+async def declare_topology(
+    channel: aio_pika.abc.AbstractChannel,
+) -> aio_pika.abc.AbstractQueue:
+    """Объявить exchange, основную очередь, очереди повторов и DLQ.
+
+    Возвращает основную очередь. Аргументы основной очереди не меняются,
+    чтобы не конфликтовать с уже существующей очередью на брокере.
+    """
     exchange = await channel.declare_exchange(
         EXCHANGE_NAME, aio_pika.ExchangeType.FANOUT, durable=True
     )
     queue = await channel.declare_queue(QUEUE_NAME, durable=True)
     await queue.bind(exchange)
 
+    for delay in sorted(set(retry_delays())):
+        await channel.declare_queue(
+            retry_queue_name(delay),
+            durable=True,
+            arguments={
+                "x-message-ttl": delay * 1000,
+                "x-dead-letter-exchange": "",
+                "x-dead-letter-routing-key": QUEUE_NAME,
+            },
+        )
+    await channel.declare_queue(DLQ_NAME, durable=True)
+    return queue
+
+
+async def publish_batch(
+    channel: aio_pika.abc.AbstractChannel,
+    items: list[tuple[str, aio_pika.Message]],
+) -> None:
+    """Опубликовать пачку сообщений в default exchange и дождаться всех confirm.
+
+    Публикации отправляются разом, подтверждения ожидаются одним gather —
+    вместо round-trip на каждое сообщение.
+    """
+    if not items:
+        return
+    await asyncio.gather(
+        *(
+            channel.default_exchange.publish(message, routing_key=routing_key)
+            for routing_key, message in items
+        )
+    )
+
+
+def _service_message(
+    origin: aio_pika.abc.AbstractIncomingMessage,
+    body: bytes,
+    headers: dict[str, Any],
+    *,
+    retry: int,
+    reason: str,
+) -> aio_pika.Message:
+    """Сообщение повтора/DLQ: заголовки попытки, timestamp и message_id исходного.
+
+    Исходный timestamp нужен метрике задержки и ``predates_login`` получателей
+    на повторе.
+    """
+    out_headers = dict(headers)
+    out_headers[RETRY_HEADER] = retry
+    out_headers[REASON_HEADER] = reason
+    out_headers[FAILED_AT_HEADER] = datetime.now(timezone.utc).isoformat()
+    # Повтор продолжает трассу неудачной попытки
+    tracing.inject_headers(out_headers)
+    return aio_pika.Message(
+        body,
+        headers=out_headers,
+        content_type="application/json",
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        timestamp=origin.timestamp,
+        message_id=origin.message_id,
+    )
+
+
+async def _dead_letter(
+    channel: aio_pika.abc.AbstractChannel,
+    origin: aio_pika.abc.AbstractIncomingMessage,
+    body: bytes,
+    headers: dict[str, Any],
+    *,
+    retry: int,
+    reason: str,
+) -> None:
+    logger.error("RabbitMQ сообщение отправлено в DLQ (%s, попыток: %s)", reason, retry)
+    message = _service_message(origin, body, headers, retry=retry, reason=reason)
+    await publish_batch(channel, [(DLQ_NAME, message)])
+
+
+async def _schedule_retry(
+    channel: aio_pika.abc.AbstractChannel,
+    origin: aio_pika.abc.AbstractIncomingMessage,
+    payload: dict[str, Any],
+    headers: dict[str, Any],
+    *,
+    retry: int,
+    reason: str,
+) -> None:
+    """Отправить payload в очередь отложенного повтора (или в DLQ, если попытки исчерпаны)."""
+    body = jsonlib.dumps(payload)
+    delays = retry_delays()
+    if retry >= len(delays):
+        await _dead_letter(channel, origin, body, headers, retry=retry, reason=reason)
+        return
+    delay = delays[retry]
+    logger.warning(
+        "RabbitMQ сообщение будет повторено через %s сек (попытка %s/%s, %s)",
+        delay,
+        retry + 1,
+        len(delays),
+        reason,
+    )
+    message = _service_message(origin, body, headers, retry=retry + 1, reason=reason)
+    await publish_batch(channel, [(retry_queue_name(delay), message)])
+
+
+async def _process_message(
+    channel: aio_pika.abc.AbstractChannel,
+    bot: Bot,
+    msg: aio_pika.abc.AbstractIncomingMessage,
+) -> None:
+    """Обработать входящее сообщение и разложить сбои по retry/DLQ."""
+    headers = dict(msg.headers or {})
+    try:
+        retry = int(headers.get(RETRY_HEADER) or 0)
+    except (TypeError, ValueError):
+        # Битый счётчик попыток: повтор по нему невозможен, возврат в очередь
+        # зациклил бы сообщение
+        metrics.RABBITMQ_MESSAGES.labels("invalid").inc()
+        await _dead_letter(
+            channel, msg, msg.body, headers, retry=0, reason="invalid_retry_header"
+        )
+        return
+    if msg.timestamp is not None:
+        lag = datetime.now(timezone.utc) - msg.timestamp.astimezone(timezone.utc)
+        metrics.RABBITMQ_CONSUME_LAG.observe(max(lag.total_seconds(), 0.0))
+
+    try:
+        payload = await jsonlib.aloads(msg.body)
+        if not isinstance(payload, dict):
+            raise ValueError("payload is not an object")
+    except ValueError:
+        metrics.RABBITMQ_MESSAGES.labels("invalid").inc()
+        await _dead_letter(channel, msg, msg.body, headers, retry=retry, reason="invalid_payload")
+        return
+
+    try:
+        failed = await _handle_message(bot, payload, occurred_at=msg.timestamp)
+    except Exception:
+        # Сбой до рассылки (Valkey, сессии…) — повторить весь payload
+        logger.exception("Ошибка обработки RabbitMQ сообщения")
+        metrics.RABBITMQ_MESSAGES.labels("error").inc()
+        await _schedule_retry(channel, msg, payload, headers, retry=retry, reason="handler_error")
+        return
+
+    if failed:
+        metrics.RABBITMQ_MESSAGES.labels("partial").inc()
+        await _schedule_retry(
+            channel,
+            msg,
+            {**payload, "user_ids": failed},
+            headers,
+            retry=retry,
+            reason="send_failed",
+        )
+    else:
+        metrics.RABBITMQ_MESSAGES.labels("ok").inc()
+
+
+async def start_consumer(bot: Bot) -> None:
+    """Запустить RabbitMQ consumer. Блокирующий — запускать как asyncio task."""
+    connection = await aio_pika.connect_robust(amqp_url())
+    channel = await connection.channel(publisher_confirms=True)
+    await channel.set_qos(prefetch_count=10)
+
+    queue = await declare_topology(channel)
+
     logger.info("RabbitMQ consumer запущен, слушаю %s", QUEUE_NAME)
 
     async with queue.iterator() as iter_:
         async for msg in iter_:
-            async with msg.process():
-                try:
-                    await _handle_message(bot, msg.body)
-                except Exception:
-                    logger.exception("Ошибка обработки RabbitMQ сообщения")
+            # Исключение здесь возможно только при публикации в retry/DLQ —
+            # тогда исходное сообщение возвращается в очередь, а не теряется
+            async with msg.process(requeue=True):
+                # Span потребителя — дочерний к span публикации на backend,
+                # если тот передал traceparent в заголовках
+                with tracing.span(
+                    f"{QUEUE_NAME} process",
+                    kind=tracing.SpanKind.CONSUMER,
+                    parent=tracing.extract_context(msg.headers),
+                ), admission.lane(admission.BACKGROUND):
+                    await _process_message(channel, bot, msg)
+
 
+async def _handle_message(
+    bot: Bot, payload: dict[str, Any], *, occurred_at: datetime | None = None
+) -> list[int]:
+    """Обработать одно событие из RabbitMQ.
 
-async def _handle_message(bot: Bot, body: bytes) -> None:
-    """Обработать одно сообщение из RabbitMQ."""
-    payload = json.loads(body)
+    ``occurred_at`` — время публикации события (AMQP timestamp). Получатели,
+    вошедшие позже, его не получают; без timestamp по задачам сравнивается
+    время создания задачи.
+
+    Возвращает user_id получателей, которым доставка не удалась по временной
+    причине и которых стоит попробовать ещё раз.
+    """
     event = payload.get("event", "")
     task = payload.get("task", {})
     user_ids = payload.get("user_ids", [])
     task_id = task.get("id")
 
+    await _invalidate_directory(event, payload, task_id)
     if not task_id or not user_ids:
-        return
+        return []
 
     # Найти chat_id по user_id из кэшированных сессий
     sessions = await _get_cached_sessions()
@@ -93,17 +327,22 @@ async def _handle_message(bot: Bot, body: bytes) -> None:
     else:
         category = "tasks"
         dedup_key = task_id
+    if occurred_at is None and not is_delegation:
+        occurred_at = Task.of(task).created_at
 
+    failed: list[int] = []
     for user_id in user_ids:
         chat_id = user_to_chat.get(user_id)
         if chat_id is None:
             continue
 
+        session = sessions.get(chat_id)
+        if session and session.predates_login(occurred_at):
+            continue
         if await is_notified(chat_id, category, dedup_key):
             continue
 
         # Ensure task has dealership.timezone for correct local formatting
-        session = sessions.get(chat_id)
         api = TaskMateAPI(token=session.token) if session else TaskMateAPI(token=None)
         try:
             await attach_dealership_timezone(api, task)
@@ -135,9 +374,33 @@ async def _handle_message(bot: Bot, body: bytes) -> None:
                         delegation_id
                     )
             await bot.send_message(chat_id, text, **kwargs)
-            await add_notified(chat_id, category, dedup_key)
+        except _PERMANENT_SEND_ERRORS as e:
+            logger.warning("Уведомление chat_id=%s отброшено: %s", chat_id, e)
+            continue
         except Exception:
             logger.warning("Не удалось отправить уведомление chat_id=%s", chat_id)
+            failed.append(user_id)
+            continue
+        await add_notified(chat_id, category, dedup_key)
+
+    return failed
+
+
+async def _invalidate_directory(
+    event: str, payload: dict[str, Any], task_id: int | None
+) -> None:
+    """Сбросить кэш справочника сотрудников по событию (ошибки не фатальны)."""
+    try:
+        if event.startswith("user."):
+            # Без автосалона в событии — сбросить все справочники
+            for dealership_id in payload.get("dealership_ids") or [
+                payload.get("dealership_id")
+            ]:
+                await directory.invalidate_dealership(dealership_id)
+        elif task_id and event in _ASSIGNMENT_EVENTS:
+            await directory.invalidate_task(task_id)
+    except Exception:
+        logger.warning("Не удалось сбросить кэш справочника (%s)", event, exc_info=True)
 
 
 def _format_message(event: str, task: dict, payload: dict) -> str | None:
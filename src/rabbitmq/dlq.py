@@ -0,0 +1,156 @@
+"""CLI для просмотра и повтора сообщений из dead-letter очереди уведомлений.
+
+Использование::
+
+    python -m src.rabbitmq.dlq list [--limit N]
+    python -m src.rabbitmq.dlq replay [--limit N]
+    python -m src.rabbitmq.dlq purge
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+
+import aio_pika
+
+from ..utils import jsonlib
+from .consumer import (
+    DLQ_NAME,
+    FAILED_AT_HEADER,
+    QUEUE_NAME,
+    REASON_HEADER,
+    RETRY_HEADER,
+    amqp_url,
+    declare_topology,
+    publish_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+# Сколько сообщений публиковать до ожидания пачки confirm при replay
+REPLAY_BATCH_SIZE = 50
+
+
+def _describe(msg: aio_pika.abc.AbstractIncomingMessage) -> str:
+    headers = msg.headers or {}
+    try:
+        payload = jsonlib.loads(msg.body)
+        summary = (
+            f"event={payload.get('event', '?')} "
+            f"task={payload.get('task', {}).get('id', '?')} "
+            f"user_ids={payload.get('user_ids', [])}"
+        )
+    except ValueError:
+        summary = f"raw={msg.body[:200]!r}"
+    return (
+        f"[{headers.get(FAILED_AT_HEADER, '?')}] "
+        f"reason={headers.get(REASON_HEADER, '?')} "
+        f"retries={headers.get(RETRY_HEADER, 0)} {summary}"
+    )
+
+
+async def _fetch(
+    queue: aio_pika.abc.AbstractQueue, limit: int | None
+) -> list[aio_pika.abc.AbstractIncomingMessage]:
+    fetched: list[aio_pika.abc.AbstractIncomingMessage] = []
+    while limit is None or len(fetched) < limit:
+        msg = await queue.get(no_ack=False, fail=False)
+        if msg is None:
+            break
+        fetched.append(msg)
+    return fetched
+
+
+async def cmd_list(channel: aio_pika.abc.AbstractChannel, limit: int | None) -> int:
+    """Показать сообщения DLQ, не удаляя их из очереди."""
+    queue = await channel.get_queue(DLQ_NAME)
+    fetched = await _fetch(queue, limit)
+    for msg in fetched:
+        print(_describe(msg))
+    # Вернуть все просмотренные сообщения в очередь
+    for msg in fetched:
+        await msg.nack(requeue=True)
+    print(f"Всего показано: {len(fetched)}")
+    return 0
+
+
+async def cmd_replay(channel: aio_pika.abc.AbstractChannel, limit: int | None) -> int:
+    """Переложить сообщения из DLQ обратно в основную очередь со сброшенным счётчиком."""
+    queue = await channel.get_queue(DLQ_NAME)
+    replayed = 0
+    while limit is None or replayed < limit:
+        batch_limit = REPLAY_BATCH_SIZE
+        if limit is not None:
+            batch_limit = min(batch_limit, limit - replayed)
+        batch = await _fetch(queue, batch_limit)
+        if not batch:
+            break
+        items = []
+        for msg in batch:
+            headers = dict(msg.headers or {})
+            for key in (RETRY_HEADER, REASON_HEADER, FAILED_AT_HEADER):
+                headers.pop(key, None)
+            items.append(
+                (
+                    QUEUE_NAME,
+                    aio_pika.Message(
+                        msg.body,
+                        headers=headers,
+                        content_type=msg.content_type,
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    ),
+                )
+            )
+        try:
+            await publish_batch(channel, items)
+        except Exception:
+            for msg in batch:
+                await msg.nack(requeue=True)
+            raise
+        # Подтвердить исходные только после confirm всей пачки
+        for msg in batch:
+            await msg.ack()
+        replayed += len(batch)
+    print(f"Повторно отправлено: {replayed}")
+    return 0
+
+
+async def cmd_purge(channel: aio_pika.abc.AbstractChannel) -> int:
+    """Удалить все сообщения из DLQ."""
+    queue = await channel.get_queue(DLQ_NAME)
+    result = await queue.purge()
+    print(f"Удалено: {result.message_count}")
+    return 0
+
+
+async def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.rabbitmq.dlq",
+        description="Dead-letter очередь уведомлений TaskMateBot",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("list", "replay"):
+        p = sub.add_parser(name)
+        p.add_argument("--limit", type=int, default=None)
+    sub.add_parser("purge")
+    args = parser.parse_args(argv)
+
+    connection = await aio_pika.connect_robust(amqp_url())
+    try:
+        channel = await connection.channel(publisher_confirms=True)
+        await declare_topology(channel)
+        if args.command == "list":
+            return await cmd_list(channel, args.limit)
+        if args.command == "replay":
+            return await cmd_replay(channel, args.limit)
+        return await cmd_purge(channel)
+    finally:
+        await connection.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(main()))
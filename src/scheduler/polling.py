@@ -1,78 +1,212 @@
-"""Polling-уведомления: периодическая проверка приближающихся дедлайнов."""
+"""Polling-уведомления: новые задачи, приближающиеся дедлайны, просрочки.
+
+Три задачи scheduler-а со своими интервалами (``POLLING_INTERVAL_NEW_TASKS``,
+``POLLING_INTERVAL_DEADLINES``, ``POLLING_INTERVAL_OVERDUE``) читают общий
+снимок задач сессии: он запрашивается у API не чаще раза в самый короткий из
+интервалов, одновременные проходы ждут один и тот же запрос. Сессии
+обрабатываются по очереди со стабильным смещением от начала прохода
+(доля ``POLLING_JITTER`` интервала по хэшу chat_id), чтобы запросы к API не
+шли пачкой в начале каждого тика.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+import zlib
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
 
 import httpx
 from aiogram import Bot
 
+from ..api import admission
 from ..api.client import TaskMateAPI
-from ..bot import messages
-from ..storage.notifications import add_notified, is_notified
-from ..storage.sessions import get_all_sessions
+from ..api.models import Task
+from ..bot import keyboards, messages
+from ..config import settings
+from ..storage import task_index
+from ..storage.notifications import claim_notified
+from ..storage.sessions import UserSession, get_all_sessions
+from ..utils import metrics
 from ..utils.tz_utils import attach_dealership_timezone
 
 logger = logging.getLogger(__name__)
 
+SessionCheck = Callable[[Bot, int, UserSession, TaskMateAPI, list[Task]], Awaitable[None]]
 
-async def check_deadlines(bot: Bot) -> None:
-    """Проверить приближающиеся дедлайны (30 мин)."""
-    now = datetime.now(timezone.utc)
+
+class _Snapshot:
+    """Задачи сессии, полученные одним запросом к API."""
+
+    __slots__ = ("token", "fetched", "tasks")
+
+    def __init__(self, token: str, tasks: asyncio.Future[list[Task]]) -> None:
+        self.token = token
+        self.fetched = time.monotonic()
+        self.tasks = tasks
+
+
+_snapshots: dict[int, _Snapshot] = {}
+
+
+def _snapshot_ttl() -> float:
+    return min(
+        settings.polling_interval_new_tasks,
+        settings.polling_interval_deadlines,
+        settings.polling_interval_overdue,
+    )
+
+
+async def _fetch(api: TaskMateAPI, chat_id: int) -> list[Task]:
+    if settings.task_sync_mode == "incremental":
+        return await task_index.sync(api, chat_id)
+    return [t async for t in api.iter_tasks()]
+
+
+async def snapshot(api: TaskMateAPI, chat_id: int, session: UserSession) -> list[Task]:
+    """Задачи сессии из снимка тика; при устаревшем снимке — новый запрос."""
+    entry = _snapshots.get(chat_id)
+    if (
+        entry is None
+        or entry.token != session.token
+        or time.monotonic() - entry.fetched >= _snapshot_ttl()
+        or (entry.tasks.done() and (entry.tasks.cancelled() or entry.tasks.exception()))
+    ):
+        entry = _snapshots[chat_id] = _Snapshot(
+            session.token, asyncio.ensure_future(_fetch(api, chat_id))
+        )
+        metrics.POLL_SNAPSHOTS.labels(result="fetch").inc()
+    else:
+        metrics.POLL_SNAPSHOTS.labels(result="shared").inc()
+    return await asyncio.shield(entry.tasks)
+
+
+def reset_snapshots() -> None:
+    _snapshots.clear()
+
+
+def _prune(sessions: dict[int, UserSession]) -> None:
+    """Убрать снимки вышедших сессий и устаревшие снимки."""
+    now = time.monotonic()
+    ttl = _snapshot_ttl()
+    for chat_id, entry in list(_snapshots.items()):
+        if chat_id not in sessions or (now - entry.fetched >= ttl and entry.tasks.done()):
+            del _snapshots[chat_id]
+
+
+def _offset(job: str, chat_id: int, interval: int) -> float:
+    """Стабильное смещение сессии от начала прохода (секунды)."""
+    share = zlib.crc32(f"{job}:{chat_id}".encode()) / 0x1_0000_0000
+    return share * interval * settings.polling_jitter
+
+
+async def _run(job: str, interval: int, bot: Bot, check: SessionCheck) -> None:
     sessions = await get_all_sessions()
-    for chat_id, session in sessions.items():
+    _prune(sessions)
+    order = sorted(sessions, key=lambda chat_id: _offset(job, chat_id, interval))
+    started = time.monotonic()
+    for chat_id in order:
+        delay = started + _offset(job, chat_id, interval) - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        session = sessions[chat_id]
         try:
             api = TaskMateAPI(token=session.token)
-            result = await api.get_tasks({"per_page": 50})
-            tasks = result.get("data", [])
-
-            for task in tasks:
-                task_id = task["id"]
-                if await is_notified(chat_id, "deadlines", task_id):
-                    continue
-                deadline_str = task.get("deadline")
-                if not deadline_str:
-                    continue
-                status = task.get("status", "")
-                if status in ("completed", "completed_late"):
-                    continue
-                try:
-                    deadline = datetime.fromisoformat(
-                        deadline_str.replace("Z", "+00:00")
-                    )
-                except ValueError:
-                    continue
-                diff = (deadline - now).total_seconds()
-                if 0 < diff <= 1800:  # 30 минут
-                    await add_notified(chat_id, "deadlines", task_id)
-                    minutes = int(diff / 60)
-                    try:
-                        await attach_dealership_timezone(api, task)
-                    except Exception:
-                        logger.debug(
-                            "Не удалось прикрепить timezone для уведомления дедлайна task=%s",
-                            task_id,
-                        )
-                    await bot.send_message(
-                        chat_id,
-                        messages.notification_deadline_soon(task, minutes),
-                    )
-                elif diff <= 0 and status in ("pending", "acknowledged"):
-                    if not await is_notified(chat_id, "overdue", task_id):
-                        await add_notified(chat_id, "overdue", task_id)
-                        try:
-                            await attach_dealership_timezone(api, task)
-                        except Exception:
-                            logger.debug(
-                                "Не удалось прикрепить timezone для уведомления просрочки task=%s",
-                                task_id,
-                            )
-                        await bot.send_message(
-                            chat_id,
-                            messages.notification_overdue(task),
-                        )
+            tasks = await snapshot(api, chat_id, session)
+            await check(bot, chat_id, session, api, tasks)
         except httpx.HTTPStatusError:
             pass
         except Exception:
-            logger.exception("Ошибка polling deadlines для %s", chat_id)
+            logger.exception("Ошибка polling %s для %s", job, chat_id)
+
+
+async def _with_timezone(api: TaskMateAPI, task: Task) -> dict:
+    """Копия задачи с timezone автосалона (снимок общий для всех проходов)."""
+    raw = dict(task.raw)
+    try:
+        await attach_dealership_timezone(api, raw)
+    except Exception:
+        logger.debug("Не удалось прикрепить timezone для уведомления task=%s", task.id)
+    return raw
+
+
+async def check_new_tasks(bot: Bot) -> None:
+    """Уведомить о назначенных задачах, пропущенных событиями RabbitMQ."""
+    with metrics.observe_tick("check_new_tasks"), admission.lane(admission.BACKGROUND):
+        await _run("check_new_tasks", settings.polling_interval_new_tasks, bot, _new_tasks)
+
+
+async def _new_tasks(
+    bot: Bot, chat_id: int, session: UserSession, api: TaskMateAPI, tasks: list[Task]
+) -> None:
+    for model in tasks:
+        # Менеджер видит все задачи автосалона — уведомляем только о своих
+        if session.user_id not in model.assigned_user_ids or model.is_completed:
+            continue
+        # Задачи, существовавшие до входа, не уведомляются
+        if session.predates_login(model.created_at):
+            continue
+        # Категория общая с consumer-ом: событие task.assigned уже отмечает задачу
+        if not await claim_notified(chat_id, "tasks", model.id):
+            continue
+        task = await _with_timezone(api, model)
+        await bot.send_message(
+            chat_id,
+            messages.notification_new_task(task),
+            reply_markup=keyboards.task_actions(task, session),
+        )
+
+
+async def check_deadlines(bot: Bot) -> None:
+    """Проверить приближающиеся дедлайны (30 мин)."""
+    with metrics.observe_tick("check_deadlines"), admission.lane(admission.BACKGROUND):
+        await _run("check_deadlines", settings.polling_interval_deadlines, bot, _deadlines)
+
+
+async def _deadlines(
+    bot: Bot, chat_id: int, session: UserSession, api: TaskMateAPI, tasks: list[Task]
+) -> None:
+    now = datetime.now(timezone.utc)
+    for model in tasks:
+        deadline = model.deadline
+        if deadline is None or model.is_completed:
+            continue
+        diff = (deadline - now).total_seconds()
+        if not 0 < diff <= 1800:  # 30 минут
+            continue
+        if session.predates_login(model.created_at):
+            continue
+        if not await claim_notified(chat_id, "deadlines", model.id):
+            continue
+        task = await _with_timezone(api, model)
+        await bot.send_message(
+            chat_id,
+            messages.notification_deadline_soon(task, int(diff / 60)),
+        )
+
+
+async def check_overdue(bot: Bot) -> None:
+    """Уведомить о просроченных невыполненных задачах."""
+    with metrics.observe_tick("check_overdue"), admission.lane(admission.BACKGROUND):
+        await _run("check_overdue", settings.polling_interval_overdue, bot, _overdue)
+
+
+async def _overdue(
+    bot: Bot, chat_id: int, session: UserSession, api: TaskMateAPI, tasks: list[Task]
+) -> None:
+    now = datetime.now(timezone.utc)
+    for model in tasks:
+        deadline = model.deadline
+        if deadline is None or deadline > now:
+            continue
+        if model.status not in ("pending", "acknowledged"):
+            continue
+        if session.predates_login(model.created_at):
+            continue
+        # Дедлайн, о котором предупреждали, тоже может просрочиться
+        if not await claim_notified(chat_id, "overdue", model.id):
+            continue
+        task = await _with_timezone(api, model)
+        await bot.send_message(chat_id, messages.notification_overdue(task))
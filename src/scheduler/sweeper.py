@@ -0,0 +1,22 @@
+"""Периодическая очистка брошенных загрузок доказательств."""
+
+from __future__ import annotations
+
+import logging
+
+from aiogram.fsm.storage.base import BaseStorage
+
+from ..bot.handlers.tasks import ProofUpload
+from ..storage import proof_buffers
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_proof_buffers(storage: BaseStorage, bot_id: int) -> None:
+    """Освободить файлы загрузок, чей FSM истёк или сменился."""
+    with metrics.observe_tick("sweep_proof_buffers"):
+        try:
+            await proof_buffers.sweep(storage, bot_id, ProofUpload.collecting.state)
+        except Exception:
+            logger.exception("Ошибка очистки буферов доказательств")
@@ -0,0 +1,171 @@
+"""Локальный кэш ключей Valkey с серверной инвалидацией (``CLIENT TRACKING``).
+
+Горячие ключи (сессии) читаются из памяти процесса, а Valkey сообщает, когда
+их меняет любой процесс или реплика бота. Используется режим ``BCAST`` с
+префиксом и ``REDIRECT``: отдельное соединение подписано на
+``__redis__:invalidate``, второе включает на себя tracking с перенаправлением
+в первое. Оба соединения — без автоматического переподключения: любой сбой
+сбрасывает кэш и отключает его, пока tracking не будет поднят заново, —
+устаревшее значение не может пережить потерянную инвалидацию.
+
+Значение, прочитанное из Valkey, кладётся в кэш, только если за время чтения
+не пришла ни одна инвалидация (``generation``): так ответ, обогнанный
+сообщением об изменении, не закрепится в кэше.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any
+
+from redis.asyncio.connection import Connection
+
+from ..config import settings
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+MISSING = object()
+
+
+class TrackedCache:
+    """LRU-кэш значений ключей с префиксом ``prefix``."""
+
+    def __init__(self, name: str, prefix: str, max_size: int) -> None:
+        self.name = name
+        self.prefix = prefix
+        self.max_size = max_size
+        self.active = False
+        self.generation = 0
+        self._data: OrderedDict[str, Any] = OrderedDict()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Any:
+        """Значение из кэша или ``MISSING``."""
+        if not self.active:
+            return MISSING
+        value = self._data.get(key, MISSING)
+        if value is not MISSING:
+            self._data.move_to_end(key)
+        metrics.record_cache(self.name, value is not MISSING)
+        return value
+
+    def put(self, key: str, value: Any, generation: int) -> None:
+        """Запомнить значение, прочитанное при ``generation``."""
+        if not self.active or generation != self.generation:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def invalidate(self, keys: list[str] | None = None) -> None:
+        """Сбросить ключи (``None`` — весь кэш)."""
+        self.generation += 1
+        if keys is None:
+            self._data.clear()
+            return
+        for key in keys:
+            self._data.pop(key, None)
+
+    def _deactivate(self) -> None:
+        self.active = False
+        self.invalidate()
+
+    # --- Tracking ---
+
+    def start(self) -> None:
+        """Запустить фоновое поддержание tracking (идемпотентно)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"{self.name}-tracking")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._deactivate()
+
+    async def _run(self) -> None:
+        delay = 1.0
+        while True:
+            try:
+                await self._track()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Tracking кэша %s прерван: %s", self.name, e)
+            if self.active:
+                delay = 1.0
+            self._deactivate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    async def _track(self) -> None:
+        listener = _connection()
+        tracker = _connection()
+        try:
+            await listener.connect()
+            await listener.send_command("CLIENT", "ID")
+            client_id = await listener.read_response()
+            await listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+            await listener.read_response()
+
+            await tracker.connect()
+            await tracker.send_command(
+                "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", "PREFIX", self.prefix
+            )
+            await tracker.read_response()
+
+            self.invalidate()
+            self.active = True
+            logger.info("Локальный кэш %s включён (CLIENT TRACKING)", self.name)
+            interval = settings.valkey_health_check_interval or 30
+            awaiting_pong = False
+            while True:
+                message = await listener.read_response(timeout=interval)
+                if message is None:
+                    if awaiting_pong:
+                        raise ConnectionError("нет ответа на PING в канале инвалидации")
+                    # Тишина — проверить оба соединения
+                    await listener.send_command("PING")
+                    await tracker.send_command("PING")
+                    await tracker.read_response()
+                    awaiting_pong = True
+                    continue
+                if isinstance(message, list) and message and message[0] == "pong":
+                    awaiting_pong = False
+                self._on_message(message)
+        finally:
+            await listener.disconnect(nowait=True)
+            await tracker.disconnect(nowait=True)
+
+    def _on_message(self, message: Any) -> None:
+        if not isinstance(message, list) or len(message) < 3:
+            return
+        kind = message[0]
+        if kind == "message" and message[1] == INVALIDATE_CHANNEL:
+            keys = message[2]
+            self.invalidate(list(keys) if keys is not None else None)
+
+
+def _connection() -> Connection:
+    return Connection(
+        host=settings.valkey_host,
+        port=settings.valkey_port,
+        db=settings.valkey_db,
+        decode_responses=True,
+        socket_keepalive=True,
+        socket_connect_timeout=settings.valkey_socket_timeout,
+    )
+
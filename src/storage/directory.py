@@ -0,0 +1,135 @@
+"""Кэш справочника сотрудников автосалона в Valkey (для выбора при делегировании).
+
+- ``tmbot:directory:<dealership_id>`` — JSON-список ``{id, full_name}`` всех
+  сотрудников автосалона (все страницы ``GET /users``), TTL
+  ``EMPLOYEE_DIRECTORY_TTL``. Задачи без автосалона не кэшируются: выдача
+  ``GET /users`` без фильтра зависит от прав запросившего;
+- ``tmbot:directory:task:<task_id>`` — автосалон задачи и её исполнители, чтобы
+  листание и повторные нажатия «Делегировать» не ходили за задачей.
+
+Сбрасывается по событиям RabbitMQ (``user.*`` — справочник автосалона,
+изменения назначений — контекст задачи) и по истечении TTL.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from ..api.client import TaskMateAPI
+from ..config import settings
+from ..utils import jsonlib
+from ..utils.metrics import observe_redis, record_cache
+from .sessions import get_redis
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "tmbot:directory:"
+TASK_KEY_PREFIX = f"{KEY_PREFIX}task:"
+TASK_CONTEXT_TTL = 600
+
+# Один прогрев на автосалон: параллельные нажатия ждут его, а не дублируют;
+# блокировка удаляется после прогрева
+_warmup_locks: dict[str, asyncio.Lock] = {}
+
+
+def _directory_key(dealership_id: int) -> str:
+    return f"{KEY_PREFIX}{dealership_id}"
+
+
+async def _load_employees(
+    api: TaskMateAPI, dealership_id: int | None
+) -> list[dict[str, Any]]:
+    params: dict[str, Any] = {"role": "employee"}
+    if dealership_id:
+        params["dealership_id"] = dealership_id
+    return [
+        {"id": u["id"], "full_name": u.get("full_name") or u.get("login") or "—"}
+        for u in await api.get_all_users(params)
+    ]
+
+
+async def get_employees(
+    api: TaskMateAPI, dealership_id: int | None
+) -> list[dict[str, Any]]:
+    """Сотрудники автосалона: из кэша или полной выгрузкой всех страниц."""
+    if not dealership_id:
+        return await _load_employees(api, None)
+    key = _directory_key(dealership_id)
+    r = await get_redis()
+    with observe_redis("directory_get"):
+        raw = await r.get(key)
+    record_cache("employee_directory", raw is not None)
+    if raw is not None:
+        return jsonlib.loads(raw)
+
+    lock = _warmup_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            with observe_redis("directory_get"):
+                raw = await r.get(key)
+            if raw is not None:
+                return jsonlib.loads(raw)
+
+            users = await _load_employees(api, dealership_id)
+            with observe_redis("directory_set"):
+                await r.set(
+                    key,
+                    jsonlib.dumps(users),
+                    ex=settings.employee_directory_ttl,
+                )
+            logger.info("Справочник сотрудников %s загружен: %d", dealership_id, len(users))
+            return users
+    finally:
+        # Ждущие прогрева перепроверят кэш под этой же блокировкой, новые
+        # запросы уже найдут справочник в Valkey
+        if _warmup_locks.get(key) is lock:
+            del _warmup_locks[key]
+
+
+async def invalidate_dealership(dealership_id: int | None = None) -> None:
+    """Сбросить справочник автосалона (без id — все справочники)."""
+    r = await get_redis()
+    with observe_redis("directory_invalidate"):
+        if dealership_id:
+            await r.delete(_directory_key(dealership_id))
+            return
+        keys = [
+            k
+            async for k in r.scan_iter(match=f"{KEY_PREFIX}*", count=500)
+            if not k.startswith(TASK_KEY_PREFIX)
+        ]
+        if keys:
+            await r.delete(*keys)
+
+
+async def get_task_context(task_id: int) -> tuple[int | None, set[int]] | None:
+    """(dealership_id, user_id исполнителей) задачи, если закэшированы."""
+    r = await get_redis()
+    with observe_redis("directory_task_get"):
+        raw = await r.get(f"{TASK_KEY_PREFIX}{task_id}")
+    if raw is None:
+        return None
+    data = jsonlib.loads(raw)
+    return data["d"], set(data["a"])
+
+
+async def set_task_context(
+    task_id: int, dealership_id: int | None, assigned_ids: set[int]
+) -> None:
+    """Запомнить автосалон и исполнителей задачи на ``TASK_CONTEXT_TTL``."""
+    r = await get_redis()
+    with observe_redis("directory_task_set"):
+        await r.set(
+            f"{TASK_KEY_PREFIX}{task_id}",
+            jsonlib.dumps({"d": dealership_id, "a": sorted(assigned_ids)}),
+            ex=TASK_CONTEXT_TTL,
+        )
+
+
+async def invalidate_task(task_id: int) -> None:
+    """Сбросить контекст задачи (изменились назначения)."""
+    r = await get_redis()
+    with observe_redis("directory_invalidate"):
+        await r.delete(f"{TASK_KEY_PREFIX}{task_id}")
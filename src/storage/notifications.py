@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from ..utils.metrics import observe_redis
 from .sessions import get_redis
 
 KEY_PREFIX = "tmbot:notified:"
@@ -11,26 +12,29 @@ CATEGORIES = ("tasks", "deadlines", "overdue", "reviews", "delegations")
 async def is_notified(chat_id: int, category: str, task_id: int) -> bool:
     """Проверить, было ли уже отправлено уведомление."""
     r = await get_redis()
-    return bool(await r.sismember(f"{KEY_PREFIX}{chat_id}:{category}", str(task_id)))
+    with observe_redis("is_notified"):
+        return bool(
+            await r.sismember(f"{KEY_PREFIX}{chat_id}:{category}", str(task_id))
+        )
 
 
 async def add_notified(chat_id: int, category: str, task_id: int) -> None:
     """Отметить задачу как уведомлённую."""
     r = await get_redis()
-    await r.sadd(f"{KEY_PREFIX}{chat_id}:{category}", str(task_id))
+    with observe_redis("add_notified"):
+        await r.sadd(f"{KEY_PREFIX}{chat_id}:{category}", str(task_id))
 
 
-async def bulk_add_notified(chat_id: int, category: str, task_ids: list[int]) -> None:
-    """Массово отметить задачи как уведомлённые."""
-    if not task_ids:
-        return
+async def claim_notified(chat_id: int, category: str, task_id: int) -> bool:
+    """Атомарно отметить задачу; False — уведомление уже отправил другой проход."""
     r = await get_redis()
-    members = [str(tid) for tid in task_ids]
-    await r.sadd(f"{KEY_PREFIX}{chat_id}:{category}", *members)
+    with observe_redis("claim_notified"):
+        return bool(await r.sadd(f"{KEY_PREFIX}{chat_id}:{category}", str(task_id)))
 
 
 async def clear_notified(chat_id: int) -> None:
     """Очистить все уведомления для chat_id (при logout)."""
     r = await get_redis()
     keys = [f"{KEY_PREFIX}{chat_id}:{cat}" for cat in CATEGORIES]
-    await r.delete(*keys)
+    with observe_redis("clear_notified"):
+        await r.delete(*keys)
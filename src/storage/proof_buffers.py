@@ -0,0 +1,109 @@
+"""Содержимое загружаемых доказательств на время FSM ``ProofUpload``.
+
+В FSM (Valkey) хранятся только метаданные файлов, байты — здесь, в памяти
+процесса, по ключу ``(chat_id, task_id)``. Брошенную загрузку (FSM истёк по
+``FSM_TTL``, пользователь ушёл в другой сценарий) освобождает
+``sweep``; число буферов и их объём — в ``tmbot_proof_flows`` и
+``tmbot_proof_buffer_bytes``.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+
+from ..config import settings
+from ..utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ProofBuffer:
+    """Файлы одной загрузки доказательств."""
+
+    __slots__ = ("user_id", "files", "size", "touched")
+
+    def __init__(self, user_id: int) -> None:
+        self.user_id = user_id
+        self.files: list[dict[str, Any]] = []
+        self.size = 0
+        self.touched = time.monotonic()
+
+
+_buffers: dict[tuple[int, int], ProofBuffer] = {}
+_total_bytes = 0
+
+
+def _export() -> None:
+    metrics.PROOF_FLOWS.set(len(_buffers))
+    metrics.PROOF_BUFFER_BYTES.set(_total_bytes)
+
+
+def start(chat_id: int, user_id: int, task_id: int) -> None:
+    """Начать (или начать заново) буфер загрузки."""
+    discard(chat_id, task_id)
+    _buffers[(chat_id, task_id)] = ProofBuffer(user_id)
+    _export()
+
+
+def add(chat_id: int, user_id: int, task_id: int, name: str, content: bytes, mime: str) -> None:
+    global _total_bytes
+    buffer = _buffers.get((chat_id, task_id))
+    if buffer is None:
+        buffer = _buffers[(chat_id, task_id)] = ProofBuffer(user_id)
+    buffer.files.append({"name": name, "content": content, "mime": mime})
+    buffer.size += len(content)
+    buffer.touched = time.monotonic()
+    _total_bytes += len(content)
+    _export()
+
+
+def files(chat_id: int, task_id: int) -> list[dict[str, Any]]:
+    buffer = _buffers.get((chat_id, task_id))
+    return buffer.files if buffer is not None else []
+
+
+def discard(chat_id: int, task_id: int | None) -> None:
+    global _total_bytes
+    if task_id is None:
+        return
+    buffer = _buffers.pop((chat_id, task_id), None)
+    if buffer is not None:
+        _total_bytes -= buffer.size
+        _export()
+
+
+def stats() -> tuple[int, int]:
+    """(число буферов, байт в них)."""
+    return len(_buffers), _total_bytes
+
+
+async def sweep(storage: BaseStorage, bot_id: int, state: str) -> int:
+    """Освободить буферы, чей FSM больше не в состоянии ``state`` этой задачи.
+
+    Буферы, тронутые за последние ``PROOF_SWEEP_INTERVAL`` секунд, не
+    проверяются; простоявшие дольше ``FSM_TTL`` освобождаются без
+    обращения к FSM. Возвращает число освобождённых буферов.
+    """
+    now = time.monotonic()
+    dropped = 0
+    for (chat_id, task_id), buffer in list(_buffers.items()):
+        idle = now - buffer.touched
+        if idle < settings.proof_sweep_interval:
+            continue
+        alive = idle < settings.fsm_ttl
+        if alive:
+            key = StorageKey(bot_id=bot_id, chat_id=chat_id, user_id=buffer.user_id)
+            alive = await storage.get_state(key) == state and (
+                (await storage.get_data(key)).get("task_id") == task_id
+            )
+        if not alive and _buffers.get((chat_id, task_id)) is buffer:
+            discard(chat_id, task_id)
+            dropped += 1
+    if dropped:
+        logger.info("Освобождено брошенных загрузок доказательств: %d", dropped)
+    _export()
+    return dropped
@@ -1,14 +1,29 @@
-"""Хранение сессий telegram_chat_id ↔ token в Valkey (Redis)."""
+"""Хранение сессий telegram_chat_id ↔ token в Valkey (Redis).
+
+Сессия хранится как hash (``HSET``/``HGETALL``) с полем версии схемы ``v``.
+Ключи в старом формате (JSON-строка) прозрачно мигрируют при первом чтении.
+Сессии без момента входа (``notify_after``, созданные до его появления)
+при первом чтении получают момент миграции: иначе первый проход поллера
+уведомил бы обо всех уже существующих задачах.
+
+С ``VALKEY_CLIENT_CACHE`` прочитанные сессии держатся в памяти процесса
+(``client_cache.TrackedCache``) и сбрасываются по инвалидации от Valkey.
+"""
 
 from __future__ import annotations
 
 import json
 import logging
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
+from datetime import datetime
 
 import redis.asyncio as redis
 
 from ..config import settings
+from ..utils.metrics import observe_redis
+from .client_cache import MISSING, TrackedCache
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +31,24 @@ _pool: redis.Redis | None = None
 
 KEY_PREFIX = "tmbot:session:"
 
+# Версия схемы hash-сессии; JSON-строки без версии считаются версией 1
+SCHEMA_VERSION = 2
+VERSION_FIELD = "v"
+
+# Сколько HGETALL отправлять одним pipeline при обходе всех сессий
+_SCAN_BATCH = 500
+
+# Сессии в памяти процесса (только при VALKEY_CLIENT_CACHE); объекты общие
+# для всех читателей и не изменяются
+_session_cache = TrackedCache(
+    "session", KEY_PREFIX, settings.valkey_client_cache_size
+)
+
+# chat_id → момент последнего продления TTL (monotonic)
+_ttl_refreshed: OrderedDict[int, float] = OrderedDict()
+
 
-@dataclass
+@dataclass(slots=True)
 class UserSession:
     """Сессия авторизованного пользователя."""
 
@@ -26,18 +57,39 @@ class UserSession:
     full_name: str
     role: str
     login: str
+    # Момент входа (unix time): события и задачи до него не уведомляются
+    notify_after: float = 0.0
+
+    def predates_login(self, moment: datetime | None) -> bool:
+        """Событие или задача появились до входа — уведомление не нужно."""
+        return bool(self.notify_after) and moment is not None and (
+            moment.timestamp() <= self.notify_after
+        )
+
+
+def _make_client(db: int, *, decode_responses: bool = False) -> redis.Redis:
+    pool = redis.BlockingConnectionPool(
+        host=settings.valkey_host,
+        port=settings.valkey_port,
+        db=db,
+        decode_responses=decode_responses,
+        max_connections=settings.valkey_max_connections,
+        timeout=settings.valkey_pool_timeout,
+        socket_timeout=settings.valkey_socket_timeout,
+        socket_connect_timeout=settings.valkey_socket_timeout,
+        socket_keepalive=True,
+        health_check_interval=settings.valkey_health_check_interval,
+    )
+    return redis.Redis.from_pool(pool)
 
 
 async def get_redis() -> redis.Redis:
     """Получить подключение к Valkey."""
     global _pool
     if _pool is None:
-        _pool = redis.Redis(
-            host=settings.valkey_host,
-            port=settings.valkey_port,
-            db=settings.valkey_db,
-            decode_responses=True,
-        )
+        _pool = _make_client(settings.valkey_db, decode_responses=True)
+        if settings.valkey_client_cache:
+            _session_cache.start()
     return _pool
 
 
@@ -48,71 +100,205 @@ async def get_fsm_redis() -> redis.Redis:
     """Получить подключение к Valkey для FSM."""
     global _fsm_pool
     if _fsm_pool is None:
-        _fsm_pool = redis.Redis(
-            host=settings.valkey_host,
-            port=settings.valkey_port,
-            db=settings.valkey_fsm_db,
-        )
+        _fsm_pool = _make_client(settings.valkey_fsm_db)
     return _fsm_pool
 
 
+def encode_session(session: UserSession) -> dict[str, str | int]:
+    """Поля hash для сессии (текущая версия схемы)."""
+    return {
+        VERSION_FIELD: SCHEMA_VERSION,
+        "token": session.token,
+        "user_id": session.user_id,
+        "full_name": session.full_name,
+        "role": session.role,
+        "login": session.login,
+        "notify_after": session.notify_after,
+    }
+
+
+def decode_session(fields: dict[str, str]) -> UserSession:
+    """Собрать сессию из полей hash (значения — строки)."""
+    return UserSession(
+        token=fields["token"],
+        user_id=int(fields["user_id"]),
+        full_name=fields["full_name"],
+        role=fields["role"],
+        login=fields["login"],
+        notify_after=float(fields.get("notify_after") or 0),
+    )
+
+
+def decode_legacy_session(data: str | bytes) -> UserSession:
+    """Собрать сессию из JSON-строки старого формата (версия 1)."""
+    parsed = json.loads(data)
+    return UserSession(
+        token=parsed["token"],
+        user_id=int(parsed["user_id"]),
+        full_name=parsed["full_name"],
+        role=parsed["role"],
+        login=parsed["login"],
+    )
+
+
+async def _write_session(
+    r: redis.Redis, key: str, session: UserSession, ttl: int
+) -> None:
+    async with r.pipeline(transaction=True) as pipe:
+        # DELETE нужен для ключей старого формата: HSET поверх строки даёт WRONGTYPE
+        pipe.delete(key)
+        pipe.hset(key, mapping=encode_session(session))
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+
+async def _stamp_notify_after(
+    r: redis.Redis, key: str, session: UserSession
+) -> UserSession:
+    """Записать сессии без ``notify_after`` момент миграции (один раз)."""
+    stamp = time.time()
+
+    async def apply(pipe: redis.client.Pipeline) -> float:
+        token, current = await pipe.hmget(key, "token", "notify_after")
+        if current and float(current):
+            # Другой читатель уже записал момент
+            return float(current)
+        if token is not None:
+            # Ключ мог истечь после чтения — HSET не должен воскрешать его без TTL
+            pipe.multi()
+            pipe.hset(key, "notify_after", stamp)
+        return stamp
+
+    with observe_redis("stamp_notify_after"):
+        session.notify_after = await r.transaction(apply, key, value_from_callable=True)
+    logger.debug("Сессии %s записан момент входа %s", key, session.notify_after)
+    return session
+
+
+async def _migrate_legacy(r: redis.Redis, key: str) -> UserSession | None:
+    """Перечитать ключ старого формата и перезаписать его hash-ом с тем же TTL."""
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.get(key)
+        pipe.ttl(key)
+        data, ttl = await pipe.execute()
+    if data is None:
+        return None
+    try:
+        session = decode_legacy_session(data)
+    except (ValueError, KeyError, TypeError):
+        logger.warning("Повреждённая сессия %s — ключ удалён", key)
+        await r.delete(key)
+        return None
+    session.notify_after = time.time()
+    await _write_session(
+        r, key, session, ttl if ttl and ttl > 0 else settings.session_ttl_seconds
+    )
+    logger.debug("Сессия %s мигрирована в hash (v%s)", key, SCHEMA_VERSION)
+    return session
+
+
 async def save_session(chat_id: int, session: UserSession) -> None:
     """Сохранить сессию для chat_id."""
     r = await get_redis()
-    data = json.dumps(
-        {
-            "token": session.token,
-            "user_id": session.user_id,
-            "full_name": session.full_name,
-            "role": session.role,
-            "login": session.login,
-        }
-    )
-    await r.set(f"{KEY_PREFIX}{chat_id}", data, ex=settings.session_ttl_seconds)
+    key = f"{KEY_PREFIX}{chat_id}"
+    with observe_redis("save_session"):
+        await _write_session(r, key, session, settings.session_ttl_seconds)
+    _session_cache.invalidate([key])
+    _ttl_refreshed[chat_id] = time.monotonic()
 
 
 async def get_session(chat_id: int) -> UserSession | None:
     """Получить сессию по chat_id."""
     r = await get_redis()
-    data = await r.get(f"{KEY_PREFIX}{chat_id}")
-    if data is None:
-        return None
-    parsed = json.loads(data)
-    return UserSession(**parsed)
+    key = f"{KEY_PREFIX}{chat_id}"
+    cached = _session_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    generation = _session_cache.generation
+    try:
+        with observe_redis("get_session"):
+            fields = await r.hgetall(key)
+    except redis.ResponseError:
+        # WRONGTYPE: ключ ещё хранится JSON-строкой
+        return await _migrate_legacy(r, key)
+    session = decode_session(fields) if fields else None
+    if session is not None and not session.notify_after:
+        session = await _stamp_notify_after(r, key, session)
+    _session_cache.put(key, session, generation)
+    return session
 
 
 async def refresh_session_ttl(chat_id: int) -> None:
-    """Продлить TTL сессии при активности пользователя."""
+    """Продлить TTL сессии при активности пользователя.
+
+    Не чаще раза в ``SESSION_REFRESH_INTERVAL`` на чат: каждый EXPIRE — запрос
+    к Valkey и инвалидация локального кэша сессии.
+    """
+    now = time.monotonic()
+    last = _ttl_refreshed.get(chat_id)
+    if last is not None and now - last < settings.session_refresh_interval:
+        return
     r = await get_redis()
-    await r.expire(f"{KEY_PREFIX}{chat_id}", settings.session_ttl_seconds)
+    with observe_redis("refresh_session_ttl"):
+        await r.expire(f"{KEY_PREFIX}{chat_id}", settings.session_ttl_seconds)
+    _ttl_refreshed[chat_id] = now
+    _ttl_refreshed.move_to_end(chat_id)
+    if len(_ttl_refreshed) > settings.valkey_client_cache_size:
+        _ttl_refreshed.popitem(last=False)
 
 
 async def delete_session(chat_id: int) -> None:
     """Удалить сессию."""
     r = await get_redis()
-    await r.delete(f"{KEY_PREFIX}{chat_id}")
+    key = f"{KEY_PREFIX}{chat_id}"
+    with observe_redis("delete_session"):
+        await r.delete(key)
+    _session_cache.invalidate([key])
+    _ttl_refreshed.pop(chat_id, None)
 
 
 async def get_all_sessions() -> dict[int, UserSession]:
     """Получить все активные сессии (для polling уведомлений)."""
     r = await get_redis()
     sessions: dict[int, UserSession] = {}
-    async for key in r.scan_iter(match=f"{KEY_PREFIX}*"):
+    batch: list[tuple[int, str]] = []
+
+    async def flush() -> None:
+        with observe_redis("get_all_sessions_batch"):
+            async with r.pipeline(transaction=False) as pipe:
+                for _, key in batch:
+                    pipe.hgetall(key)
+                results = await pipe.execute(raise_on_error=False)
+        for (chat_id, key), fields in zip(batch, results):
+            if isinstance(fields, redis.ResponseError):
+                session = await _migrate_legacy(r, key)
+                if session is not None:
+                    sessions[chat_id] = session
+            elif isinstance(fields, dict) and fields:
+                session = decode_session(fields)
+                if not session.notify_after:
+                    session = await _stamp_notify_after(r, key, session)
+                sessions[chat_id] = session
+        batch.clear()
+
+    async for key in r.scan_iter(match=f"{KEY_PREFIX}*", count=_SCAN_BATCH):
         chat_id_str = key.removeprefix(KEY_PREFIX)
         try:
             chat_id = int(chat_id_str)
         except ValueError:
             continue
-        data = await r.get(key)
-        if data:
-            parsed = json.loads(data)
-            sessions[chat_id] = UserSession(**parsed)
+        batch.append((chat_id, key))
+        if len(batch) >= _SCAN_BATCH:
+            await flush()
+    if batch:
+        await flush()
     return sessions
 
 
 async def close() -> None:
     """Закрыть подключения."""
     global _pool, _fsm_pool
+    await _session_cache.stop()
     if _pool is not None:
         await _pool.aclose()
         _pool = None
@@ -0,0 +1,96 @@
+"""Инкрементальная синхронизация активных задач пользователя для поллера.
+
+- ``tmbot:tasks:<chat_id>`` — hash ``task_id → JSON задачи``: незавершённые
+  задачи пользователя, по которым поллер проверяет дедлайны;
+- ``tmbot:sync:<chat_id>`` — hash курсора: ``cursor`` (наибольший
+  ``updated_at`` из полученных задач) и ``reconciled_at`` (unix time
+  последней полной сверки).
+
+Обычный проход запрашивает только ``GET /tasks?updated_since=<cursor>`` и
+применяет изменения к индексу (завершённые задачи удаляются). Полная сверка —
+все страницы ``GET /tasks`` с заменой индекса — раз в ``TASK_SYNC_FULL_INTERVAL``
+секунд, при пустом курсоре и после выхода пользователя: она убирает задачи,
+которые перестали быть видны (сняли исполнителя, удалили), — такие изменения
+в инкрементальный ответ не попадают.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from ..api.client import TaskMateAPI
+from ..api.models import Task, parse_datetime
+from ..config import settings
+from ..utils import jsonlib
+from ..utils.metrics import observe_redis
+from .sessions import get_redis
+
+logger = logging.getLogger(__name__)
+
+INDEX_PREFIX = "tmbot:tasks:"
+SYNC_PREFIX = "tmbot:sync:"
+
+
+def _cursor(tasks: list[Task], cursor: str | None) -> str | None:
+    """Наибольший ``updated_at`` (сравниваются разобранные даты, хранится строка)."""
+    best = cursor
+    best_at = parse_datetime(cursor)
+    for task in tasks:
+        at = task.updated_at
+        if at is not None and (best_at is None or at > best_at):
+            best, best_at = task.raw["updated_at"], at
+    return best
+
+
+async def sync(api: TaskMateAPI, chat_id: int) -> list[Task]:
+    """Актуальные незавершённые задачи пользователя из индекса."""
+    r = await get_redis()
+    index_key = f"{INDEX_PREFIX}{chat_id}"
+    sync_key = f"{SYNC_PREFIX}{chat_id}"
+    with observe_redis("task_sync_get"):
+        state = await r.hgetall(sync_key)
+    cursor = state.get("cursor") or None
+    now = time.time()
+    reconciled_at = float(state.get("reconciled_at") or 0)
+
+    if cursor is None or now - reconciled_at >= settings.task_sync_full_interval:
+        tasks = [t async for t in api.iter_tasks()]
+        active = [t for t in tasks if not t.is_completed]
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.delete(index_key)
+            if active:
+                pipe.hset(index_key, mapping={t.id: jsonlib.dumps(t.raw) for t in active})
+            pipe.hset(
+                sync_key,
+                mapping={"cursor": _cursor(tasks, None) or "", "reconciled_at": now},
+            )
+            pipe.expire(index_key, settings.session_ttl_seconds)
+            pipe.expire(sync_key, settings.session_ttl_seconds)
+            with observe_redis("task_sync_reconcile"):
+                await pipe.execute()
+        logger.debug("Полная сверка задач chat=%s: %d активных", chat_id, len(active))
+        return active
+
+    changed = [t async for t in api.iter_tasks({"updated_since": cursor})]
+    async with r.pipeline(transaction=True) as pipe:
+        done = [t.id for t in changed if t.is_completed]
+        fresh = {t.id: jsonlib.dumps(t.raw) for t in changed if not t.is_completed}
+        if done:
+            pipe.hdel(index_key, *done)
+        if fresh:
+            pipe.hset(index_key, mapping=fresh)
+        pipe.hset(sync_key, "cursor", _cursor(changed, cursor) or "")
+        pipe.expire(index_key, settings.session_ttl_seconds)
+        pipe.expire(sync_key, settings.session_ttl_seconds)
+        pipe.hgetall(index_key)
+        with observe_redis("task_sync_apply"):
+            results = await pipe.execute()
+    return [Task(jsonlib.loads(raw)) for raw in results[-1].values()]
+
+
+async def clear(chat_id: int) -> None:
+    """Удалить индекс и курсор (при выходе пользователя)."""
+    r = await get_redis()
+    with observe_redis("task_sync_clear"):
+        await r.delete(f"{INDEX_PREFIX}{chat_id}", f"{SYNC_PREFIX}{chat_id}")
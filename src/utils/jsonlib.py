@@ -0,0 +1,84 @@
+"""JSON для ответов API и сообщений RabbitMQ с выбираемым бэкендом.
+
+Бэкенд задаётся настройкой ``JSON_BACKEND``: ``auto`` (orjson, затем msgspec,
+затем stdlib), ``orjson``, ``msgspec`` или ``json``. Декодирование идёт прямо
+из ``bytes``, без промежуточной строки. ``aloads`` разбирает крупные тела
+(от ``JSON_THREAD_THRESHOLD`` байт) в отдельном потоке, чтобы большой дашборд не
+останавливал event loop.
+
+Ошибки разбора любого бэкенда — ``ValueError``, как у stdlib.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import Callable
+from typing import Any
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _stdlib() -> tuple[Callable[[bytes | str], Any], Callable[[Any], bytes]]:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    return json.loads, dumps
+
+
+def _orjson() -> tuple[Callable[[bytes | str], Any], Callable[[Any], bytes]]:
+    import orjson
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    # orjson.JSONDecodeError — подкласс ValueError
+    return orjson.loads, dumps
+
+
+def _msgspec() -> tuple[Callable[[bytes | str], Any], Callable[[Any], bytes]]:
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+
+    def loads(data: bytes | str) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+    return loads, encoder.encode
+
+
+_BACKENDS = {"orjson": _orjson, "msgspec": _msgspec, "json": _stdlib}
+
+
+def _select(name: str) -> tuple[str, Callable[[bytes | str], Any], Callable[[Any], bytes]]:
+    if name == "auto":
+        candidates: tuple[str, ...] = ("orjson", "msgspec")
+    elif name in _BACKENDS:
+        candidates = (name,)
+    else:
+        logger.warning("Неизвестный JSON_BACKEND=%s — используется json", name)
+        candidates = ()
+    for candidate in candidates:
+        try:
+            return (candidate, *_BACKENDS[candidate]())
+        except ImportError:
+            if name != "auto":
+                logger.warning("JSON_BACKEND=%s не установлен — используется json", name)
+    return ("json", *_stdlib())
+
+
+backend, loads, dumps = _select(settings.json_backend.lower())
+
+
+async def aloads(data: bytes) -> Any:
+    """``loads``; крупные тела разбираются в потоке, не блокируя event loop."""
+    if len(data) >= settings.json_thread_threshold:
+        return await asyncio.to_thread(loads, data)
+    return loads(data)
@@ -0,0 +1,177 @@
+"""Prometheus-метрики бота, поллера и notification worker-а.
+
+Метрики регистрируются в общем registry prometheus_client и отдаются по HTTP
+на ``/metrics`` (порт ``METRICS_PORT``, 0 — не поднимать сервер).
+Доля попаданий в кэши считается в PromQL по ``tmbot_cache_requests_total``.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# Бакеты для сетевых операций: от единиц миллисекунд до таймаута httpx (30 с)
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+HANDLER_LATENCY = Histogram(
+    "tmbot_handler_duration_seconds",
+    "Время работы обработчика aiogram",
+    ["router", "event", "action"],
+    buckets=_LATENCY_BUCKETS,
+)
+API_REQUEST_LATENCY = Histogram(
+    "tmbot_api_request_duration_seconds",
+    "Время запроса к TaskMate API",
+    ["method", "endpoint", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+API_RETRIES = Counter(
+    "tmbot_api_retries_total",
+    "Повторы запросов к TaskMate API по причине",
+    ["method", "endpoint", "reason"],
+)
+API_CIRCUIT_STATE = Gauge(
+    "tmbot_api_circuit_state",
+    "Circuit breaker группы эндпоинтов API: 0 — закрыт, 1 — пробы, 2 — открыт",
+    ["group"],
+)
+API_ADMISSION_WAIT = Histogram(
+    "tmbot_api_admission_wait_seconds",
+    "Ожидание слота запроса к API по классу",
+    ["lane"],
+    buckets=_FAST_BUCKETS + (2.5, 5, 10),
+)
+API_CONCURRENCY_LIMIT = Gauge(
+    "tmbot_api_concurrency_limit",
+    "Текущий адаптивный лимит одновременных запросов к API",
+)
+API_LANE_LATENCY = Histogram(
+    "tmbot_api_lane_duration_seconds",
+    "Время запроса к API с ожиданием слота по классу",
+    ["lane"],
+    buckets=_LATENCY_BUCKETS,
+)
+REDIS_OP_LATENCY = Histogram(
+    "tmbot_redis_op_duration_seconds",
+    "Время операции с Valkey",
+    ["op"],
+    buckets=_FAST_BUCKETS,
+)
+TELEGRAM_REQUEST_LATENCY = Histogram(
+    "tmbot_telegram_request_duration_seconds",
+    "Время запроса к Telegram Bot API",
+    ["method"],
+    buckets=_LATENCY_BUCKETS,
+)
+TELEGRAM_RETRY_AFTER = Counter(
+    "tmbot_telegram_retry_after_total",
+    "Ответы Telegram 429 (flood control)",
+    ["method"],
+)
+TELEGRAM_ERRORS = Counter(
+    "tmbot_telegram_errors_total",
+    "Ошибки запросов к Telegram Bot API",
+    ["method", "error"],
+)
+RABBITMQ_CONSUME_LAG = Histogram(
+    "tmbot_rabbitmq_consume_lag_seconds",
+    "Задержка между публикацией события и началом его обработки",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900),
+)
+RABBITMQ_MESSAGES = Counter(
+    "tmbot_rabbitmq_messages_total",
+    "Обработанные сообщения RabbitMQ по исходу",
+    ["outcome"],
+)
+POLL_SNAPSHOTS = Counter(
+    "tmbot_poll_snapshots_total",
+    "Снимки задач сессии для polling: запрошенные у API и переиспользованные",
+    ["result"],
+)
+POLL_TICK_DURATION = Histogram(
+    "tmbot_poll_tick_duration_seconds",
+    "Длительность одного прохода фоновой задачи",
+    ["job"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+CACHE_REQUESTS = Counter(
+    "tmbot_cache_requests_total",
+    "Обращения к локальным кэшам",
+    ["cache", "result"],
+)
+PROOF_FLOWS = Gauge(
+    "tmbot_proof_flows",
+    "Загрузки доказательств с файлами в памяти",
+)
+PROOF_BUFFER_BYTES = Gauge(
+    "tmbot_proof_buffer_bytes",
+    "Байт доказательств в памяти до отправки на проверку",
+)
+UPDATE_QUEUE_DEPTH = Gauge(
+    "tmbot_update_queue_depth",
+    "Апдейты чата в обработке и в очереди",
+    ["chat_id"],
+)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_endpoint(path: str) -> str:
+    """Путь API без идентификаторов: ``/tasks/15/status`` → ``/tasks/{id}/status``."""
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+@contextmanager
+def observe_redis(op: str) -> Iterator[None]:
+    """Замерить операцию с Valkey (гистограмма и span ``valkey <op>``)."""
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"valkey {op}", kind=tracing.SpanKind.CLIENT):
+            yield
+    finally:
+        REDIS_OP_LATENCY.labels(op).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def observe_tick(job: str) -> Iterator[None]:
+    """Замерить один проход фоновой задачи (корневой span ``poll <job>``)."""
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"poll {job}"):
+            yield
+    finally:
+        POLL_TICK_DURATION.labels(job).observe(time.perf_counter() - start)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Учесть обращение к кэшу (попадание или промах)."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def set_update_queue_depth(chat_id: int, depth: int) -> None:
+    """Глубина очереди чата; пустые очереди не экспортируются."""
+    if depth:
+        UPDATE_QUEUE_DEPTH.labels(str(chat_id)).set(depth)
+    else:
+        try:
+            UPDATE_QUEUE_DEPTH.remove(str(chat_id))
+        except KeyError:
+            pass
+
+
+def start_metrics_server(port: int) -> None:
+    """Поднять HTTP-сервер ``/metrics`` (в фоновом потоке)."""
+    if not port:
+        return
+    start_http_server(port)
+    logger.info("Prometheus /metrics слушает порт %s", port)
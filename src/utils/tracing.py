@@ -0,0 +1,159 @@
+"""OpenTelemetry-трассировка: апдейт → обработчик → TaskMate API / Valkey → Bot API.
+
+Экспортёр выбирается настройкой ``TRACING_EXPORTER``:
+
+- ``none`` — трассировка выключена (no-op tracer, накладные расходы минимальны);
+- ``console`` — spans печатаются в stdout;
+- ``file`` — spans пишутся построчно в JSON (``TRACING_FILE``);
+- ``otlp`` — OTLP/HTTP, адрес из стандартных ``OTEL_EXPORTER_OTLP_*``
+  (нужен пакет ``opentelemetry-exporter-otlp-proto-http``).
+
+Контекст трассы передаётся в заголовках W3C ``traceparent``/``tracestate``:
+в запросах к TaskMate API и в сообщениях RabbitMQ (backend → worker,
+а также при повторе через retry-очереди).
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from typing import Any, ParamSpec, TypeVar
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import Span, SpanKind
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+tracer = trace.get_tracer("taskmate-bot")
+
+_provider: TracerProvider | None = None
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Экспортёр в файл: один span — одна строка JSON."""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        with self._lock:
+            for span in spans:
+                self._file.write(span.to_json(indent=None) + "\n")
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def _make_exporter(kind: str) -> SpanExporter | None:
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind == "file":
+        return JsonLinesSpanExporter(settings.tracing_file)
+    if kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+        except ImportError:
+            logger.warning(
+                "TRACING_EXPORTER=otlp, но opentelemetry-exporter-otlp-proto-http "
+                "не установлен — трассировка выключена"
+            )
+            return None
+        return OTLPSpanExporter()
+    if kind != "none":
+        logger.warning("Неизвестный TRACING_EXPORTER=%s — трассировка выключена", kind)
+    return None
+
+
+def setup_tracing(service_name: str) -> None:
+    """Включить экспорт spans для процесса (бот или worker)."""
+    global _provider
+    exporter = _make_exporter(settings.tracing_exporter.lower())
+    if exporter is None:
+        return
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name})
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    logger.info("Трассировка включена: %s", settings.tracing_exporter)
+
+
+def shutdown_tracing() -> None:
+    """Выгрузить накопленные spans и остановить экспортёр."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+@contextmanager
+def span(
+    name: str,
+    *,
+    kind: SpanKind = SpanKind.INTERNAL,
+    parent: Context | None = None,
+    **attributes: Any,
+) -> Iterator[Span]:
+    """Span вокруг блока; исключение записывается в span и пробрасывается.
+
+    ``parent`` — родительский контекст (например, извлечённый из заголовков
+    сообщения); по умолчанию — текущий.
+    """
+    with tracer.start_as_current_span(
+        name, context=parent, kind=kind, attributes=attributes or None
+    ) as current:
+        yield current
+
+
+def traced(name: str) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Декоратор: обернуть корутину в span ``name``."""
+
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        @functools.wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with tracer.start_as_current_span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inject_headers(headers: dict[str, Any]) -> dict[str, Any]:
+    """Дописать в заголовки контекст текущей трассы (``traceparent``)."""
+    propagate.inject(headers)
+    return headers
+
+
+def extract_context(headers: Mapping[str, Any] | None) -> Context:
+    """Контекст трассы из заголовков AMQP/HTTP (значения могут быть bytes)."""
+    carrier: dict[str, str] = {}
+    for key, value in (headers or {}).items():
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", "replace")
+        if isinstance(value, str):
+            carrier[key] = value
+    return propagate.extract(carrier)
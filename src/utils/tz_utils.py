@@ -18,6 +18,8 @@ from typing import Any
 from zoneinfo import ZoneInfo
 
 from ..api.client import TaskMateAPI
+from . import metrics
+from .tracing import traced
 
 
 _TZ_CACHE: dict[int, tuple[str, float]] = {}
@@ -71,6 +73,7 @@ def format_for_user(iso_or_dt: str | datetime | None, tz_name: str | None) -> st
     return local.strftime("%d.%m.%Y %H:%M")
 
 
+@traced("attach_dealership_timezone")
 async def attach_dealership_timezone(api: TaskMateAPI, obj: dict[str, Any]) -> None:
     """Ensure `obj['dealership']['timezone']` exists.
 
@@ -106,7 +109,9 @@ async def attach_dealership_timezone(api: TaskMateAPI, obj: dict[str, Any]) -> N
 
     # Check cache
     cached = _TZ_CACHE.get(int(did))
-    if cached and cached[1] > time.time():
+    hit = bool(cached and cached[1] > time.time())
+    metrics.record_cache("dealership_tz", hit)
+    if hit:
         tz_name = cached[0]
         if isinstance(d, dict):
             d["timezone"] = tz_name
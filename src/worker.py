@@ -10,6 +10,8 @@ from src.bot.bot import bot
 from src.config import settings
 from src.rabbitmq.consumer import start_consumer
 from src.storage import sessions
+from src.utils.metrics import start_metrics_server
+from src.utils.tracing import setup_tracing, shutdown_tracing
 
 logging.basicConfig(
     level=getattr(logging, settings.log_level.upper(), logging.INFO),
@@ -20,6 +22,8 @@ logger = logging.getLogger(__name__)
 
 async def main() -> None:
     logger.info("Запуск TaskMate Notification Worker...")
+    start_metrics_server(settings.metrics_port)
+    setup_tracing("taskmate-worker")
 
     try:
         while True:
@@ -35,6 +39,7 @@ async def main() -> None:
         await close_http_client()
         await sessions.close()
         await bot.session.close()
+        shutdown_tracing()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from collections.abc import Callable
+
+import fakeredis
+import httpx
+import pytest
+
+# Ensure the repository root is importable so tests can use `src.*`
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# src.config требует токен бота при импорте; тесты к Telegram не обращаются
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test-token")
+
+from src.api import client as api_client  # noqa: E402
+from src.storage import sessions  # noqa: E402
+
+Handler = Callable[[httpx.Request], httpx.Response]
+
+
+@pytest.fixture
+def run():
+    """Выполнить корутину теста в отдельном event loop."""
+    return asyncio.run
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Подменить общий httpx-клиент API транспортом ``MockTransport``.
+
+    ``mock_api(handle)`` можно вызывать в тесте несколько раз; все созданные
+    клиенты закрываются после теста.
+    """
+    clients: list[httpx.AsyncClient] = []
+
+    def install(handle: Handler) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handle))
+        clients.append(client)
+        monkeypatch.setattr(api_client, "_shared_client", client)
+        return client
+
+    yield install
+    for client in clients:
+        asyncio.run(client.aclose())
+
+
+@pytest.fixture
+def valkey(monkeypatch):
+    """fakeredis вместо подключения к Valkey (сессии, уведомления, кэши)."""
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(sessions, "_pool", redis)
+    yield redis
+    asyncio.run(redis.aclose())
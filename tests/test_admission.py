@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import asyncio
+
+from src.api import admission
+from src.api.admission import (
+    BACKGROUND,
+    INTERACTIVE,
+    UPLOAD,
+    Admission,
+    AIMDLimit,
+    current_lane,
+    lane,
+)
+
+
+def test_interactive_admitted_before_queued_background(run):
+    async def scenario():
+        gate = Admission(1, {})
+        order: list[str] = []
+
+        async def request(name: str) -> None:
+            async with gate.slot(name):
+                order.append(name)
+
+        await gate.acquire(INTERACTIVE)
+        waiting = [asyncio.create_task(request(BACKGROUND)), asyncio.create_task(request(UPLOAD))]
+        await asyncio.sleep(0)
+        waiting.append(asyncio.create_task(request(INTERACTIVE)))
+        await asyncio.sleep(0)
+        gate.release(INTERACTIVE)
+        await asyncio.gather(*waiting)
+        return order
+
+    assert run(scenario()) == [INTERACTIVE, UPLOAD, BACKGROUND]
+
+
+def test_background_budget_leaves_room_for_interactive(run):
+    async def scenario():
+        gate = Admission(3, {BACKGROUND: 1})
+        await gate.acquire(BACKGROUND)
+        blocked = asyncio.create_task(gate.acquire(BACKGROUND))
+        await asyncio.sleep(0)
+        await asyncio.wait_for(gate.acquire(INTERACTIVE), 1)
+        assert not blocked.done() and gate.waiting(BACKGROUND) == 1
+
+        blocked.cancel()
+        await asyncio.sleep(0)
+        assert gate.waiting() == 0
+        gate.release(BACKGROUND)
+        gate.release(INTERACTIVE)
+        return gate.in_flight
+
+    assert run(scenario()) == 0
+
+
+def test_lane_context():
+    assert current_lane.get() == INTERACTIVE
+    with lane(BACKGROUND):
+        assert current_lane.get() == BACKGROUND
+    assert current_lane.get() == INTERACTIVE
+
+
+def test_aimd_grows_when_saturated_and_backs_off(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: clock[0])
+    gate = Admission(10, {})
+    limiter = AIMDLimit(gate, minimum=2, maximum=12, target=1.0)
+
+    # Лимит не занят — рост не нужен
+    limiter.record(True, 0.1)
+    assert gate.limit == 10
+
+    gate._total = 10
+    for _ in range(11):
+        limiter.record(True, 0.1)
+    assert gate.limit == 11
+
+    limiter.record(False, 0.1)
+    assert gate.limit == 7
+    # Повторные сбои той же волны не режут лимит ещё раз
+    limiter.record(True, 5.0)
+    assert gate.limit == 7
+
+    for _ in range(5):
+        clock[0] += 1.0
+        limiter.record(False, 0.1)
+    assert gate.limit == 2
+
+
+def test_budgets_shrink_with_limit(run):
+    async def scenario():
+        gate = Admission(64, {BACKGROUND: 24, UPLOAD: 8}, full=64)
+        limiter = AIMDLimit(gate, minimum=4, maximum=64, target=1.0)
+        limiter.value = 4
+        limiter._apply()
+        assert (gate.budget(BACKGROUND), gate.budget(UPLOAD)) == (1, 1)
+
+        await gate.acquire(BACKGROUND)
+        await gate.acquire(UPLOAD)
+        blocked = asyncio.create_task(gate.acquire(BACKGROUND))
+        await asyncio.sleep(0)
+        # Сниженный лимит не занят фоном целиком — нажатия проходят
+        await asyncio.wait_for(gate.acquire(INTERACTIVE), 1)
+        await asyncio.wait_for(gate.acquire(INTERACTIVE), 1)
+        assert not blocked.done()
+        blocked.cancel()
+        await asyncio.sleep(0)
+
+        limiter.value = 64
+        limiter._apply()
+        return gate.budget(BACKGROUND), gate.budget(UPLOAD)
+
+    assert run(scenario()) == (24, 8)
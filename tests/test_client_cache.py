@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from src.storage.client_cache import INVALIDATE_CHANNEL, MISSING, TrackedCache
+
+
+def make_cache(size: int = 2) -> TrackedCache:
+    cache = TrackedCache("test", "k:", size)
+    cache.active = True
+    return cache
+
+
+def test_inactive_cache_never_hits():
+    cache = TrackedCache("test", "k:", 10)
+    cache.put("k:1", "v", cache.generation)
+    assert cache.get("k:1") is MISSING
+
+
+def test_read_overtaken_by_invalidation_is_not_stored():
+    cache = make_cache()
+    generation = cache.generation
+    cache.invalidate(["k:other"])
+    cache.put("k:1", "stale", generation)
+    assert cache.get("k:1") is MISSING
+
+    cache.put("k:1", "fresh", cache.generation)
+    assert cache.get("k:1") == "fresh"
+
+
+def test_lru_eviction_and_invalidation_messages():
+    cache = make_cache(size=2)
+    for key in ("k:1", "k:2"):
+        cache.put(key, key, cache.generation)
+    cache.get("k:1")
+    cache.put("k:3", "k:3", cache.generation)
+    assert cache.get("k:2") is MISSING and cache.get("k:1") == "k:1"
+
+    cache._on_message(["message", INVALIDATE_CHANNEL, ["k:1"]])
+    assert cache.get("k:1") is MISSING and cache.get("k:3") == "k:3"
+    # None — сброс всего кэша (FLUSHDB, переполнение таблицы tracking)
+    cache._on_message(["message", INVALIDATE_CHANNEL, None])
+    assert len(cache) == 0
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+
+from src.config import settings
+from src.rabbitmq import consumer
+from src.storage.sessions import UserSession
+
+OK_CHAT, FLAKY_CHAT, BLOCKED_CHAT = 101, 102, 103
+
+
+class FakeChannel:
+    """Default exchange, запоминающий публикации ``(routing_key, message)``."""
+
+    def __init__(self) -> None:
+        self.published: list[tuple[str, object]] = []
+        self.default_exchange = self
+
+    async def publish(self, message, routing_key: str) -> None:
+        self.published.append((routing_key, message))
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent: list[int] = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id == FLAKY_CHAT:
+            raise TelegramNetworkError(method=None, message="timeout")
+        if chat_id == BLOCKED_CHAT:
+            raise TelegramForbiddenError(method=None, message="bot was blocked")
+        self.sent.append(chat_id)
+
+
+def incoming(payload, timestamp=None, **headers):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    return SimpleNamespace(body=body, headers=headers, timestamp=timestamp, message_id="m-1")
+
+
+def assigned(user_ids):
+    return {"event": "task.assigned", "task": {"id": 5, "title": "Задача"}, "user_ids": user_ids}
+
+
+@pytest.fixture
+def env(monkeypatch, valkey):
+    monkeypatch.setattr(settings, "rabbitmq_retry_max_attempts", 3)
+    monkeypatch.setattr(settings, "rabbitmq_retry_base_delay", 5)
+    monkeypatch.setattr(settings, "rabbitmq_retry_max_delay", 600)
+    chats = {
+        user_id: UserSession(token="t", user_id=user_id, full_name="U", role="employee", login="u")
+        for user_id in (1, 2, 3)
+    }
+    by_chat = {100 + user_id: session for user_id, session in chats.items()}
+
+    async def cached_sessions():
+        return by_chat
+
+    monkeypatch.setattr(consumer, "_get_cached_sessions", cached_sessions)
+    return FakeChannel(), FakeBot()
+
+
+def test_partial_failure_requeues_only_failed_recipients(env, run):
+    channel, bot = env
+    run(consumer._process_message(channel, bot, incoming(assigned([1, 2, 3]))))
+
+    assert bot.sent == [OK_CHAT]
+    # Временная ошибка — в повтор, заблокированный бот — отброшен
+    [(queue, message)] = channel.published
+    assert queue == consumer.retry_queue_name(5)
+    assert json.loads(message.body)["user_ids"] == [2]
+    assert message.headers[consumer.RETRY_HEADER] == 1
+    assert message.headers[consumer.REASON_HEADER] == "send_failed"
+
+
+def test_retry_keeps_original_timestamp_and_id(env, run):
+    channel, bot = env
+    published = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+    run(consumer._process_message(channel, bot, incoming(assigned([2]), timestamp=published)))
+
+    [(_, message)] = channel.published
+    assert message.timestamp == published
+    assert message.message_id == "m-1"
+
+
+def test_permanent_errors_are_not_retried(env, run):
+    channel, bot = env
+    run(consumer._process_message(channel, bot, incoming(assigned([3]))))
+    assert channel.published == [] and bot.sent == []
+
+
+def test_exhausted_retries_go_to_dlq(env, run):
+    channel, bot = env
+    msg = incoming(assigned([2]), **{consumer.RETRY_HEADER: 3})
+    run(consumer._process_message(channel, bot, msg))
+
+    [(queue, message)] = channel.published
+    assert queue == consumer.DLQ_NAME
+    assert message.headers[consumer.RETRY_HEADER] == 3
+
+
+def test_invalid_json_goes_to_dlq(env, run):
+    channel, bot = env
+    run(consumer._process_message(channel, bot, incoming(b"{not json")))
+    run(consumer._process_message(channel, bot, incoming([1, 2])))
+
+    assert [queue for queue, _ in channel.published] == [consumer.DLQ_NAME] * 2
+    assert channel.published[0][1].body == b"{not json"
+    assert channel.published[0][1].headers[consumer.REASON_HEADER] == "invalid_payload"
+
+
+def test_retry_delays_capped(monkeypatch, env, run):
+    monkeypatch.setattr(settings, "rabbitmq_retry_max_attempts", 5)
+    monkeypatch.setattr(settings, "rabbitmq_retry_max_delay", 30)
+    assert consumer.retry_delays() == [5, 10, 20, 30, 30]
+
+    channel, bot = env
+    msg = incoming(assigned([2]), **{consumer.RETRY_HEADER: 4})
+    run(consumer._process_message(channel, bot, msg))
+    assert channel.published[0][0] == consumer.retry_queue_name(30)
+
+
+def test_malformed_retry_header_goes_to_dlq(env, run):
+    channel, bot = env
+    msg = incoming(assigned([1]), **{consumer.RETRY_HEADER: "abc"})
+    run(consumer._process_message(channel, bot, msg))
+
+    [(queue, message)] = channel.published
+    assert queue == consumer.DLQ_NAME
+    assert message.headers[consumer.REASON_HEADER] == "invalid_retry_header"
+    assert bot.sent == []
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import httpx
+
+from src.api.client import TaskMateAPI
+from src.bot.handlers import delegations
+
+USER_ID = 7
+
+
+def _delegation(dlg_id: int, to_user: int, from_user: int) -> dict:
+    return {
+        "id": dlg_id,
+        "task": {"id": 100 + dlg_id, "title": f"Задача {dlg_id}"},
+        "from_user": {"id": from_user, "full_name": "От"},
+        "to_user": {"id": to_user, "full_name": "Кому"},
+    }
+
+
+def test_view_fetches_capped_pending_and_one_history_page(run, mock_api):
+    seen: list[dict] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        seen.append(params)
+        if params["status"] == "pending":
+            data = [_delegation(i, USER_ID, 1) for i in range(1, 4)]
+            return httpx.Response(200, json={"data": data, "meta": {"last_page": 1}})
+        data = [_delegation(10 + i, 1, USER_ID) for i in range(5)]
+        return httpx.Response(200, json={"data": data, "meta": {"total": 240}})
+
+    mock_api(handle)
+    text, kb = run(delegations._delegations_view(TaskMateAPI("t"), USER_ID, "hist", 1))
+
+    pending, history = sorted(seen, key=lambda p: p["status"] != "pending")
+    assert pending["per_page"] == str(delegations.DELEGATIONS_PENDING_LIMIT)
+    assert (history["page"], history["per_page"]) == ("2", "5")
+    # История ограничена последними DELEGATIONS_HISTORY_LIMIT записями
+    assert "(20)" in text and "Страница 2/4" in text
+    assert [b.text for b in kb.inline_keyboard[0]] == ["📥 3", "📤 0", "· 📜 20 ·"]
+
+
+def test_view_without_history_meta_counts_what_it_got(run, mock_api):
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.params["status"] == "pending":
+            return httpx.Response(200, json={"data": []})
+        return httpx.Response(200, json={"data": [_delegation(1, 1, USER_ID)]})
+
+    mock_api(handle)
+    text, kb = run(delegations._delegations_view(TaskMateAPI("t"), USER_ID, None, 0))
+    # Пустые ожидающие — сводка открывается на истории
+    assert kb.inline_keyboard[0][2].text == "· 📜 1 ·"
+
+
+def test_action_buttons_carry_view_position():
+    from src.bot import keyboards
+
+    items = [_delegation(7, USER_ID, 1)]
+    counts = {"in": 12, "out": 1, "hist": 2}
+    incoming = keyboards.delegations_view("in", counts, items, 1, 3)
+    accept, reject = incoming.inline_keyboard[1]
+    assert delegations._view_position(accept.callback_data) == ("in", 1)
+    assert delegations._view_position(reject.callback_data) == ("in", 1)
+    outgoing = keyboards.delegations_view("out", counts, items, 0, 1)
+    (cancel,) = outgoing.inline_keyboard[1]
+    assert delegations._view_position(cancel.callback_data) == ("out", 0)
+    # Кнопки отдельного уведомления — не сводка
+    for row in keyboards.delegation_incoming_actions(7).inline_keyboard:
+        for button in row:
+            assert delegations._view_position(button.callback_data) is None
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.api.client import TaskMateAPI
+from src.storage import directory
+
+
+@pytest.fixture
+def users(mock_api, valkey):
+    calls: list[dict[str, str]] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        calls.append(dict(request.url.params))
+        token = request.headers["Authorization"].removeprefix("Bearer ")
+        data = [{"id": 1, "full_name": f"Сотрудник {token}"}]
+        return httpx.Response(200, json={"data": data, "meta": {"last_page": 1}})
+
+    mock_api(handle)
+    return calls
+
+
+def test_dealership_directory_cached_once(users, run):
+    async def scenario():
+        api = TaskMateAPI("a")
+        return await asyncio.gather(*(directory.get_employees(api, 7) for _ in range(5)))
+
+    results = run(scenario())
+    assert len(users) == 1 and users[0]["dealership_id"] == "7"
+    assert all(r == results[0] for r in results)
+    assert directory._warmup_locks == {}
+
+
+def test_directory_without_dealership_not_shared_between_users(users, run):
+    async def scenario():
+        first = await directory.get_employees(TaskMateAPI("a"), None)
+        second = await directory.get_employees(TaskMateAPI("b"), None)
+        return first, second
+
+    first, second = run(scenario())
+    assert first[0]["full_name"] == "Сотрудник a"
+    assert second[0]["full_name"] == "Сотрудник b"
+    assert len(users) == 2
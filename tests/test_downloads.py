@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import os
+
+import httpx
+import pytest
+from aiogram.types import BufferedInputFile, FSInputFile
+
+from src.api.client import TaskMateAPI
+from src.config import settings
+
+
+@pytest.fixture(autouse=True)
+def small_limits(monkeypatch):
+    monkeypatch.setattr(settings, "download_max_bytes", 1000)
+    monkeypatch.setattr(settings, "download_spool_threshold", 100)
+
+
+@pytest.fixture
+def serve(mock_api):
+    def install(body: bytes, *, chunked: bool = False) -> None:
+        async def stream():
+            for i in range(0, len(body), 64):
+                yield body[i:i + 64]
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, content=stream() if chunked else body)
+
+        mock_api(handle)
+
+    return install
+
+
+def test_small_file_stays_in_memory(serve, run):
+    serve(b"x" * 50)
+    download = run(TaskMateAPI("t").download_proof_by_url("http://files/p.jpg"))
+    assert download.content == b"x" * 50 and download.path is None
+    assert isinstance(download.input_file("p.jpg"), BufferedInputFile)
+
+
+def test_large_file_spooled_and_removed(serve, run):
+    serve(b"y" * 500, chunked=True)
+    download = run(TaskMateAPI("t").download_shift_photo(1, "opening"))
+    with download:
+        assert isinstance(download.input_file("o.jpg"), FSInputFile)
+        with open(download.path, "rb") as f:
+            assert f.read() == b"y" * 500
+        path = download.path
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_oversized_file_rejected(chunked, serve, run):
+    serve(b"z" * 1500, chunked=chunked)
+    assert run(TaskMateAPI("t").download_proof_by_url("http://files/big.mp4")) is None
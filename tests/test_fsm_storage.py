@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import fakeredis
+from aiogram.fsm.storage.base import StorageKey
+
+from src.bot.bot import FSMStorage
+
+
+def test_fsm_state_and_data_expire_together(run):
+    async def main():
+        redis = fakeredis.FakeAsyncRedis()
+        storage = FSMStorage(redis, ttl=100)
+        key = StorageKey(bot_id=1, chat_id=7, user_id=7)
+        await storage.set_state(key, "ShiftOpen:waiting_photo")
+        await storage.set_data(key, {"dealership_id": 3})
+        state_key = storage.key_builder.build(key, "state")
+        data_key = storage.key_builder.build(key, "data")
+        # Шаг, меняющий только состояние, продлевает и данные
+        await redis.expire(data_key, 5)
+        await storage.set_state(key, "ShiftOpen:selecting_schedule")
+        ttls = await redis.ttl(state_key), await redis.ttl(data_key)
+        await redis.expire(state_key, 5)
+        await storage.set_data(key, {"dealership_id": 4})
+        ttls += await redis.ttl(state_key), await redis.ttl(data_key)
+        await storage.set_state(key, None)
+        await storage.set_data(key, {})
+        left = await redis.exists(state_key, data_key)
+        await redis.aclose()
+        return ttls, left
+
+    assert run(main()) == ((100, 100, 100, 100), 0)
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import re
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import CallbackQuery, Message
+
+from src.bot.bot import HandlerMetricsMiddleware
+from src.utils import metrics
+
+HANDLERS = Path(__file__).resolve().parents[1] / "src" / "bot" / "handlers"
+
+
+def _registered(pattern: str) -> set[str]:
+    found: set[str] = set()
+    for path in HANDLERS.glob("*.py"):
+        found.update(re.findall(pattern, path.read_text(encoding="utf-8")))
+    return found
+
+
+def test_labels_cover_registered_handlers():
+    commands = {f"/{name}" for name in _registered(r'Command\("(\w+)"\)')}
+    callbacks = _registered(r'F\.data\.startswith\("(\w+):"\)') | _registered(
+        r'F\.data == "(\w+)"'
+    )
+    assert commands and callbacks
+    assert commands <= HandlerMetricsMiddleware.COMMANDS
+    assert callbacks <= HandlerMetricsMiddleware.CALLBACKS
+
+
+def _message(text: str) -> Message:
+    return Message.model_validate(
+        {"message_id": 1, "date": 0, "chat": {"id": 7, "type": "private"}, "text": text}
+    )
+
+
+def _callback(data: str) -> CallbackQuery:
+    return CallbackQuery.model_validate(
+        {
+            "id": "1",
+            "from": {"id": 7, "is_bot": False, "first_name": "U"},
+            "chat_instance": "c",
+            "data": data,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("event", "action"),
+    [
+        (_message("/tasks@bot"), "/tasks"),
+        (_message("/drop_table_users"), "other"),
+        (_callback("dlg_accept:5"), "dlg_accept"),
+        (_callback("legacy_button:5"), "other"),
+    ],
+)
+def test_unknown_actions_share_one_label(event, action, run, monkeypatch):
+    seen: list[tuple] = []
+    monkeypatch.setattr(
+        metrics.HANDLER_LATENCY,
+        "labels",
+        lambda *labels: seen.append(labels) or SimpleNamespace(observe=lambda v: None),
+    )
+
+    async def handler(event, data):
+        return None
+
+    data = {"event_router": SimpleNamespace(name="r")}
+    run(HandlerMetricsMiddleware()(handler, event, data))
+    ((router, _, label),) = seen
+    assert (router, label) == ("r", action)
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from src.config import settings
+from src.utils import jsonlib
+
+
+def test_roundtrip_matches_stdlib():
+    payload = {"event": "task.assigned", "task": {"id": 1, "title": "Задача"}, "user_ids": [1, 2]}
+    body = jsonlib.dumps(payload)
+    assert isinstance(body, bytes)
+    assert json.loads(body) == payload
+    assert jsonlib.loads(body) == payload
+    with pytest.raises(ValueError):
+        jsonlib.loads(b"{broken")
+
+
+def test_aloads_offloads_large_bodies(monkeypatch, run):
+    calls = []
+    real_to_thread = asyncio.to_thread
+
+    async def to_thread(func, *args):
+        calls.append(len(args[0]))
+        return await real_to_thread(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", to_thread)
+    monkeypatch.setattr(settings, "json_thread_threshold", 64)
+    small = jsonlib.dumps({"data": []})
+    large = jsonlib.dumps({"data": list(range(100))})
+
+    async def scenario():
+        return await jsonlib.aloads(small), await jsonlib.aloads(large)
+
+    assert run(scenario()) == ({"data": []}, {"data": list(range(100))})
+    assert calls == [len(large)]
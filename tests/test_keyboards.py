@@ -1,16 +1,7 @@
 from __future__ import annotations
 
-import os
-import sys
-
-# Ensure src is importable for tests
-HERE = os.path.dirname(__file__)
-SRC = os.path.abspath(os.path.join(HERE, "..", "src"))
-if SRC not in sys.path:
-    sys.path.insert(0, SRC)
-
-from bot import keyboards
-from storage.sessions import UserSession
+from src.bot import keyboards
+from src.storage.sessions import UserSession
 
 
 def make_task(response_type: str = "completion_with_proof", status: str = "pending", assignments=None):
@@ -67,3 +58,26 @@ def test_owner_sees_proof_on_pending_review():
     kb = keyboards.task_actions(task, session)
     assert kb is not None
     assert kb.inline_keyboard[0][0].text == "📎 Загрузить доказательства"
+
+
+def test_delegation_selector_paginates():
+    users = [{"id": i, "full_name": f"User {i}"} for i in range(1, 21)]
+    kb = keyboards.delegation_user_selector(7, users, page=2)
+    rows = kb.inline_keyboard
+    # 20 сотрудников по 8 на страницу: последняя страница — 4 кнопки
+    assert [r[0].callback_data for r in rows[:4]] == [f"dlg_user:7:{i}" for i in range(17, 21)]
+    assert [b.text for b in rows[4]] == ["◀️", "3/3"]
+    assert rows[4][0].callback_data == "dlg_page:7:1"
+    assert rows[-1][0].callback_data == "dlg_cancel_flow:7"
+
+
+def test_keyboards_are_shared_per_role_and_task():
+    assert keyboards.main_menu("manager") is keyboards.main_menu("manager")
+    assert keyboards.main_menu("manager") is not keyboards.main_menu("employee")
+
+    mgr = UserSession(token="t", user_id=1, full_name="Mgr", role="manager", login="mgr")
+    owner = UserSession(token="t", user_id=2, full_name="Owner", role="owner", login="owner")
+    kb = keyboards.task_actions(make_task(), mgr)
+    assert keyboards.task_actions(make_task(), owner) is kb
+    assert keyboards.task_actions(make_task(status="rejected"), mgr) is not kb
+
@@ -0,0 +1,249 @@
+"""Golden-тесты шаблонов: вывод messages побайтно совпадает с эталоном.
+
+Эталон ``golden/messages.json`` снят с реализации до перехода на таблицы и
+форматтеры. При намеренном изменении текста — перегенерировать:
+
+    python -m tests.test_messages
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+import pytest
+
+from src.bot import messages
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "golden", "messages.json")
+
+TZS = [
+    {"timezone": "Asia/Tashkent"},
+    {"timezone": "+05:30"},
+    {"timezone": "-03:00"},
+    {"timezone": "Mars/Olympus"},
+    {"timezone": None},
+    {},
+]
+
+
+def _task(i: int, **over: Any) -> dict[str, Any]:
+    statuses = ["pending", "acknowledged", "pending_review", "completed",
+                "completed_late", "overdue", "rejected", "weird"]
+    priorities = ["low", "medium", "high", "urgent"]
+    types = ["notification", "completion", "completion_with_proof", "other"]
+    t: dict[str, Any] = {
+        "id": 100 + i,
+        "title": f"Задача <{i}>",
+        "status": statuses[i % len(statuses)],
+        "priority": priorities[i % len(priorities)],
+        "response_type": types[i % len(types)],
+        "deadline": ["2025-03-01T12:30:00Z", "2025-12-31T23:59:00+00:00",
+                     None, "не дата", "2025-06-15T08:00:00"][i % 5],
+        # Наивная дата с поясом зависит от локального пояса машины — без пояса
+        "dealership": TZS[i % len(TZS)] if i % 5 != 4 else {},
+    }
+    if i % 2:
+        t["description"] = "Описание " * (i * 4)
+    if i % 3 == 0:
+        t["comment"] = "Комментарий"
+        t["creator"] = {"full_name": "Автор"}
+    if i % 4:
+        t["assignments"] = [
+            {"user_id": k, "user": {"full_name": f"Исполнитель {k}"}} for k in range(i % 4)
+        ] + ([{"user_id": 9}] if i % 5 == 0 else [])
+    if t["status"] == "rejected":
+        t["responses"] = [
+            {"status": "completed", "user": {"full_name": "A"}},
+            {"status": "rejected", "verification_history": [
+                {"action": "rejected", "reason": "Плохое фото"},
+                {"action": "approved"},
+            ], "user": {"full_name": "B"}},
+        ]
+    t.update(over)
+    return t
+
+
+def _shift(i: int) -> dict[str, Any]:
+    return {
+        "id": i,
+        "status": ["open", "late", "closed", "replaced", "other"][i % 5],
+        "shift_start": "2025-03-01T04:00:00Z",
+        "shift_end": "2025-03-01T13:00:00Z" if i % 2 else None,
+        "scheduled_start": "2025-03-01T04:00:00Z",
+        "scheduled_end": "2025-03-01T13:00:00Z",
+        "late_minutes": (i * 7) % 20,
+        "dealership": {"name": f"Салон {i}", **TZS[i % len(TZS)]},
+        "user": {"full_name": f"Сотрудник {i}"},
+    }
+
+
+def _delegation(i: int) -> dict[str, Any]:
+    d: dict[str, Any] = {
+        "id": i,
+        "status": ["pending", "accepted", "rejected", "cancelled", "weird"][i % 5],
+        "task": _task(i),
+        "from_user": {"full_name": f"От {i}"},
+        "to_user": {"full_name": f"Кому {i}"},
+    }
+    if i % 2:
+        d["reason"] = "Занят"
+        d["responded_at"] = "2025-03-02T10:00:00Z"
+    if i % 3 == 0:
+        d["task"] = {"id": i}
+    return d
+
+
+def cases() -> list[tuple[str, str, list[Any], dict[str, Any]]]:
+    tasks = [_task(i) for i in range(16)]
+    shifts = [_shift(i) for i in range(10)]
+    dels = [_delegation(i) for i in range(10)]
+    dashboard = {
+        "active_tasks": 3, "completed_tasks": 5, "overdue_tasks": 1,
+        "pending_review_count": 2, "open_shifts": 4, "late_shifts_today": 1,
+        "total_generators": 2, "active_generators": 1, "tasks_generated_today": 7,
+        "overdue_tasks_list": tasks[:7],
+        "pending_review_tasks": tasks[2:9],
+        "active_shifts": shifts + [{"dealership": {"id": 1, "name": "Первый"}, "status": "late"},
+                                   {"dealership": {"id": 1}, "is_late": True}],
+        "dealership_shift_stats": [
+            {"dealership_id": 1, "on_shift_count": 5},
+            {"id": 1, "dealership_name": "Имя"},
+            {"dealership": {"id": 2, "name": "Второй"}, "total_shifts": 3},
+            {"dealership_id": 3},
+        ],
+    }
+    out: list[tuple[str, str, list[Any], dict[str, Any]]] = []
+
+    def add(name: str, *args: Any, **kwargs: Any) -> None:
+        out.append((f"{name}#{len(out)}", name, list(args), kwargs))
+
+    for name in ("welcome", "help_text", "login_usage", "logout_success", "not_authorized",
+                 "no_current_shift", "proof_upload_prompt", "proof_submitted",
+                 "rejection_reason_prompt", "no_open_shifts", "error_generic",
+                 "no_current_shift_with_action", "shift_select_dealership",
+                 "shift_select_schedule", "shift_open_photo_prompt",
+                 "shift_close_photo_prompt", "delegation_reject_reason_prompt",
+                 "no_eligible_users"):
+        add(name)
+    for role in ("owner", "manager", "observer", "employee", "guest"):
+        add("welcome_back", "Иван", role)
+        add("login_success", "Иван", role)
+        add("dashboard_summary", dashboard, role)
+    add("dashboard_summary", {})
+    add("login_failed")
+    add("login_failed", "неверный пароль")
+    add("task_list", [])
+    add("task_list", tasks)
+    add("overdue_task_list", [])
+    add("overdue_task_list", tasks)
+    add("shift_list", [])
+    add("shift_list", shifts + shifts)
+    for t in tasks:
+        add("task_detail", t)
+        add("task_list_item_text", t)
+        add("notification_new_task", t)
+        add("notification_deadline_soon", t, 15)
+        add("notification_overdue", t)
+        add("notification_approved", t)
+        add("notification_rejected", t)
+        add("notification_rejected", t, "причина")
+        add("notification_pending_review", t)
+        add("notification_pending_review", t, "Пётр")
+        add("review_task_card", t)
+        add("delegation_requested_notification", t, "Иван")
+        add("delegation_requested_notification", t, "Иван", "Болею")
+        add("delegation_accepted_notification", t, "Пётр")
+        add("delegation_rejected_notification", t, "Пётр")
+        add("delegation_rejected_notification", t, "Пётр", "Нет")
+    add("delegation_requested_notification", {}, "Иван")
+    add("delegation_accepted_notification", {}, "Пётр")
+    add("delegation_rejected_notification", {}, "Пётр")
+    responses = [
+        {"status": "pending_review", "user": {"full_name": "A"}, "proofs": [1, 2], "comment": "ok"},
+        {"status": "pending_review", "user": {"full_name": "B"}},
+    ]
+    review = _task(3, responses=[{"status": "rejected", "user": {"full_name": "C"}},
+                                 {"status": "completed", "user": {}}],
+                   shared_proofs=[1, 2, 3], description="x" * 200)
+    add("review_task_card", review, responses)
+    add("review_task_card", review, None, responses[0])
+    add("review_task_card", review, None, {"status": "pending_review", "uses_shared_proofs": True})
+    add("review_task_card", review, [{"user": None}])
+    for s in shifts:
+        add("shift_info", s)
+        add("shift_info_with_action", s)
+        add("shift_opened_success", s)
+        add("shift_closed_success", s)
+        add("shift_card_for_manager", s)
+    add("shift_info", {})
+    add("shift_card_for_manager", {})
+    for n in (1, 3):
+        add("review_approved_msg", 7, n)
+        add("review_rejected_msg", 7, "", n)
+        add("review_rejected_msg", 7, "плохо", n)
+    add("status_updated", 5, "completed")
+    add("status_updated", 5, "unknown")
+    add("proof_received", 3)
+    add("delegation_created_success", 5, "Пётр")
+    add("delegation_accept_success", 5)
+    add("delegation_reject_success", 5)
+    add("delegation_cancel_success", 5)
+    add("delegation_select_user_prompt", 5)
+    add("delegation_reason_prompt", 5, "Пётр")
+    for tab in ("in", "out", "hist"):
+        add("delegations_view", tab, [], 0, 1, 0)
+        add("delegations_view", tab, dels, 1, 3, 12)
+    return out
+
+
+def _render() -> dict[str, str]:
+    return {
+        key: getattr(messages, name)(*args, **kwargs)
+        for key, name, args, kwargs in cases()
+    }
+
+
+@pytest.fixture(scope="module")
+def golden() -> dict[str, str]:
+    with open(GOLDEN, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("key,name,args,kwargs", cases(), ids=[c[0] for c in cases()])
+def test_message_matches_golden(golden, key, name, args, kwargs):
+    assert getattr(messages, name)(*args, **kwargs) == golden[key]
+
+
+def test_render_many_matches_single_renders():
+    tasks = [_task(i) for i in range(16)]
+    assert messages.render_many(messages.task_list_item_text, tasks) == [
+        messages.task_list_item_text(t) for t in tasks
+    ]
+
+
+def test_delegations_view_fits_telegram_limit():
+    dels = [
+        {
+            "id": i,
+            "task": {"id": i, "title": "Задача " * 40, "description": "Описание"},
+            "reason": "Причина " * 500,
+            "from_user": {"full_name": "Пётр"},
+        }
+        for i in range(5)
+    ]
+    text = messages.delegations_view("in", dels, 0, 1, 5)
+    assert len(text) <= messages.MESSAGE_LIMIT
+    assert "Причина " * 20 not in text
+    assert text.count("👤 От:") == 5
+
+    dels[0]["task"]["title"] = "Очень длинное название " * 200
+    text = messages.delegations_view("in", dels, 0, 1, 5)
+    assert len(text) <= messages.MESSAGE_LIMIT and text.endswith("… ещё 5")
+
+
+if __name__ == "__main__":
+    with open(GOLDEN, "w", encoding="utf-8") as f:
+        json.dump(_render(), f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
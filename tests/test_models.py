@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+
+from src.api.models import Response, Task
+
+
+def test_assigned_user_ids_from_either_shape():
+    task = Task(
+        {
+            "id": 1,
+            "assignments": [
+                {"user_id": 5},
+                {"user": {"id": "7"}},
+                {"user": None},
+                {"user_id": 5, "user": {"id": 5}},
+            ],
+        }
+    )
+    assert task.assigned_user_ids == {5, 7}
+    assert task.is_assigned(7) and not task.is_assigned(8)
+
+
+def test_response_envelope_and_lazy_fields():
+    body = json.dumps(
+        {
+            "data": [{"id": 3, "status": "completed", "deadline": "2025-03-01T12:00:00Z"}],
+            "meta": {"last_page": 4},
+        }
+    ).encode()
+    resp = Response.from_bytes(body)
+    assert resp.last_page == 4
+    (task,) = resp.tasks()
+    assert task.is_completed
+    assert task.deadline.isoformat() == "2025-03-01T12:00:00+00:00"
+    assert Response.from_bytes(b'{"id": 9}').task().id == 9
+    assert Response.from_bytes(b'{"data": {}}').task() is None
+    assert Response.from_bytes(b"{}").task() is None
+    assert Response.from_bytes(b"{}").items() == []
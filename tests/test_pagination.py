@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.api import client as api_client
+from src.api.client import TaskMateAPI
+
+
+@pytest.fixture
+def pages(mock_api):
+    """``/tasks`` из 3 страниц по ``per_page``; номера запрошенных страниц копятся."""
+    requested: list[int] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["per_page"])
+        requested.append(page)
+        items = [{"id": (page - 1) * per_page + i} for i in range(per_page)]
+        return httpx.Response(200, json={"data": items, "meta": {"last_page": 3}})
+
+    mock_api(handle)
+    return requested
+
+
+def test_iterates_all_pages(pages, run):
+    async def collect():
+        return [t.id async for t in TaskMateAPI("t").iter_tasks()]
+
+    ids = run(collect())
+    assert ids == list(range(3 * api_client.PAGE_SIZE))
+    assert pages == [1, 2, 3]
+
+
+def test_short_pages_follow_last_page(mock_api, run):
+    requested: list[int] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        # Backend ограничивает per_page тридцатью
+        page = int(request.url.params["page"])
+        requested.append(page)
+        items = [{"id": (page - 1) * 30 + i} for i in range(30)]
+        return httpx.Response(200, json={"data": items, "meta": {"last_page": 3}})
+
+    mock_api(handle)
+
+    async def collect():
+        return [t.id async for t in TaskMateAPI("t").iter_tasks()]
+
+    assert run(collect()) == list(range(90))
+    assert requested == [1, 2, 3]
+
+
+def test_next_page_prefetched_while_consuming(pages, run):
+    async def first_item():
+        items = TaskMateAPI("t").iter_tasks()
+        await anext(items)
+        await asyncio.sleep(0)
+        seen = list(pages)
+        await items.aclose()
+        return seen
+
+    assert run(first_item()) == [1, 2]
+
+
+def test_limit_stops_early(pages, run):
+    async def collect():
+        return [t.id async for t in TaskMateAPI("t").iter_tasks(limit=5)]
+
+    assert run(collect()) == [0, 1, 2, 3, 4]
+    assert pages == [1]
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import httpx
+import pytest
+
+from src.config import settings
+from src.scheduler import polling
+from src.storage import sessions
+from src.storage.sessions import UserSession
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.sent: list[tuple[int, str]] = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+def _at(minutes: int) -> str:
+    return (datetime.now(timezone.utc) + timedelta(minutes=minutes)).isoformat()
+
+
+@pytest.fixture
+def backend(monkeypatch, mock_api, valkey):
+    tasks = [
+        {"id": 1, "title": "Своя", "status": "pending", "deadline": _at(10), "assignments": [{"user_id": 5}]},
+        {"id": 2, "title": "Чужая", "status": "pending", "deadline": _at(-10), "assignments": [{"user_id": 6}]},
+    ]
+    requests: list[str] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json={"data": tasks, "last_page": 1})
+
+    session = UserSession(token="t", user_id=5, full_name="Emp", role="employee", login="emp")
+
+    async def get_all_sessions():
+        return {100: session}
+
+    mock_api(handle)
+    monkeypatch.setattr(polling, "get_all_sessions", get_all_sessions)
+    monkeypatch.setattr(settings, "task_sync_mode", "full")
+    monkeypatch.setattr(settings, "polling_jitter", 0.0)
+    polling.reset_snapshots()
+    yield tasks, requests
+    polling.reset_snapshots()
+
+
+def test_jobs_share_one_snapshot_per_tick(backend, run):
+    tasks, requests = backend
+    bot = FakeBot()
+
+    async def scenario():
+        await asyncio.gather(
+            polling.check_new_tasks(bot),
+            polling.check_deadlines(bot),
+            polling.check_overdue(bot),
+        )
+
+    run(scenario())
+    assert len(requests) == 1
+    # Новая задача — только назначенная пользователю; дедлайн своей и
+    # просрочка видимой чужой (как и до разделения проходов)
+    assert len(bot.sent) == 3
+
+
+def test_overdue_after_deadline_warning(backend, run):
+    tasks, requests = backend
+    bot = FakeBot()
+
+    async def scenario():
+        await polling.check_deadlines(bot)
+        tasks[0]["deadline"] = _at(-1)
+        polling.reset_snapshots()
+        await polling.check_overdue(bot)
+
+    run(scenario())
+    assert len(requests) == 2
+    assert [chat_id for chat_id, _ in bot.sent] == [100, 100, 100]
+
+
+def test_offsets_spread_within_jitter_share(monkeypatch):
+    monkeypatch.setattr(settings, "polling_jitter", 0.5)
+    offsets = [polling._offset("check_deadlines", chat_id, 300) for chat_id in range(200)]
+    assert all(0 <= o < 150 for o in offsets)
+    assert max(offsets) - min(offsets) > 100
+
+
+def test_overlapping_passes_notify_once(backend, monkeypatch, run):
+    class SlowRedis(fakeredis.FakeAsyncRedis):
+        # Уступить event loop перед командой, как при настоящей сети
+        async def sismember(self, *args):
+            await asyncio.sleep(0)
+            return await super().sismember(*args)
+
+        async def sadd(self, *args):
+            await asyncio.sleep(0)
+            return await super().sadd(*args)
+
+    monkeypatch.setattr(sessions, "_pool", SlowRedis(decode_responses=True))
+    bot = FakeBot()
+
+    async def scenario():
+        await asyncio.gather(polling.check_overdue(bot), polling.check_overdue(bot))
+
+    run(scenario())
+    assert len(bot.sent) == 1
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from src.config import settings
+from src.storage import proof_buffers
+
+STATE = "ProofUpload:collecting"
+BOT_ID = 42
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(proof_buffers.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(settings, "proof_sweep_interval", 60)
+    monkeypatch.setattr(settings, "fsm_ttl", 3600)
+    yield now
+    for chat_id, task_id in list(proof_buffers._buffers):
+        proof_buffers.discard(chat_id, task_id)
+
+
+def test_sweep_frees_abandoned_flows(clock, run):
+    storage = MemoryStorage()
+
+    async def scenario():
+        # Чат 1 всё ещё в загрузке задачи 10, чат 2 ушёл из сценария
+        key = StorageKey(bot_id=BOT_ID, chat_id=1, user_id=1)
+        await storage.set_state(key, STATE)
+        await storage.set_data(key, {"task_id": 10})
+        proof_buffers.add(1, 1, 10, "a.jpg", b"x" * 100, "image/jpeg")
+        proof_buffers.add(2, 2, 20, "b.jpg", b"y" * 50, "image/jpeg")
+        assert proof_buffers.stats() == (2, 150)
+
+        # Свежие буферы не трогаются
+        assert await proof_buffers.sweep(storage, BOT_ID, STATE) == 0
+
+        clock[0] += 120
+        assert await proof_buffers.sweep(storage, BOT_ID, STATE) == 1
+        assert proof_buffers.stats() == (1, 100)
+
+        # Простой дольше TTL FSM — освобождается без проверки состояния
+        clock[0] += 3600
+        assert await proof_buffers.sweep(storage, BOT_ID, STATE) == 1
+        assert proof_buffers.stats() == (0, 0)
+
+    run(scenario())
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from src.api import resilience
+from src.api.client import TaskMateAPI
+from src.config import settings
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "api_retry_attempts", 3)
+    monkeypatch.setattr(settings, "api_retry_base_delay", 0.0)
+    monkeypatch.setattr(settings, "api_breaker_failures", 3)
+    monkeypatch.setattr(settings, "api_breaker_reset", 30.0)
+    monkeypatch.setattr(settings, "api_breaker_probes", 2)
+    resilience.reset_breakers()
+    yield
+    resilience.reset_breakers()
+
+
+@pytest.fixture
+def serve(mock_api):
+    """Транспорт, отдающий ответы по очереди; запросы копятся в списке."""
+
+    def install(responses):
+        seen: list[httpx.Request] = []
+        queue = list(responses)
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            item = queue.pop(0) if len(queue) > 1 else queue[0]
+            if isinstance(item, Exception):
+                raise item
+            return httpx.Response(item, json={"data": {"ok": True}})
+
+        mock_api(handle)
+        return seen
+
+    return install
+
+
+def test_get_retried_on_transient_errors(serve, run):
+    seen = serve([503, httpx.ConnectError("reset"), 200])
+    assert run(TaskMateAPI("t").get_task(1)) == {"data": {"ok": True}}
+    assert len(seen) == 3
+
+
+def test_post_without_key_not_retried(serve, run):
+    seen = serve([503, 200])
+    with pytest.raises(httpx.HTTPStatusError):
+        run(TaskMateAPI("t")._request("POST", "/tasks"))
+    assert len(seen) == 1
+
+
+def test_mutation_not_retried_by_default(serve, run):
+    seen = serve([502, 200])
+    with pytest.raises(httpx.HTTPStatusError):
+        run(TaskMateAPI("t").update_task_status(5, "completed"))
+    assert len(seen) == 1 and resilience.IDEMPOTENCY_HEADER in seen[0].headers
+
+
+def test_mutation_retried_with_same_idempotency_key(monkeypatch, serve, run):
+    monkeypatch.setattr(settings, "api_retry_mutations", True)
+    seen = serve([502, 200])
+    run(TaskMateAPI("t").update_task_status(5, "completed"))
+    keys = {r.headers[resilience.IDEMPOTENCY_HEADER] for r in seen}
+    assert len(seen) == 2 and len(keys) == 1
+
+    run(TaskMateAPI("t").approve_response(3))
+    assert seen[-1].headers[resilience.IDEMPOTENCY_HEADER] not in keys
+
+
+def test_client_errors_not_retried(serve, run):
+    seen = serve([404])
+    with pytest.raises(httpx.HTTPStatusError):
+        run(TaskMateAPI("t").get_task(1))
+    assert len(seen) == 1
+    assert resilience.breaker_for("/tasks").state == resilience.CLOSED
+
+
+def test_breaker_opens_per_group_and_recovers(monkeypatch, serve, run):
+    clock = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    seen = serve([503])
+    api = TaskMateAPI("t")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(api.get_task(1))
+    assert resilience.breaker_for("/tasks").state == resilience.OPEN
+    assert len(seen) == 3
+
+    # Открытая группа отказывает без запроса, остальные работают
+    with pytest.raises(resilience.CircuitOpenError):
+        run(api.get_task(1))
+    assert len(seen) == 3
+    serve([200])
+    run(api.get_shift(1))
+
+    # После паузы — пробы; нужное число успехов закрывает breaker
+    clock[0] += settings.api_breaker_reset
+    seen = serve([200])
+    run(api.get_task(1))
+    assert resilience.breaker_for("/tasks").state == resilience.HALF_OPEN
+    run(api.get_task(1))
+    assert resilience.breaker_for("/tasks").state == resilience.CLOSED
+    assert len(seen) == 2
+
+
+def test_failed_probe_reopens(monkeypatch, serve, run):
+    clock = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(settings, "api_retry_attempts", 1)
+    serve([503])
+    api = TaskMateAPI("t")
+    for _ in range(settings.api_breaker_failures):
+        with pytest.raises(httpx.HTTPStatusError):
+            run(api.get_task(1))
+
+    clock[0] += settings.api_breaker_reset
+    with pytest.raises(httpx.HTTPStatusError):
+        run(api.get_task(1))
+    assert resilience.breaker_for("/tasks").state == resilience.OPEN
+
+
+def test_cancelled_probe_releases_breaker(monkeypatch, serve, run, mock_api):
+    clock = [1000.0]
+    monkeypatch.setattr(resilience.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(settings, "api_retry_attempts", 1)
+    serve([503])
+    api = TaskMateAPI("t")
+    for _ in range(settings.api_breaker_failures):
+        with pytest.raises(httpx.HTTPStatusError):
+            run(api.get_task(1))
+
+    async def hang(request: httpx.Request) -> httpx.Response:
+        await asyncio.Event().wait()
+
+    mock_api(hang)
+    clock[0] += settings.api_breaker_reset
+    async def cancel_probe():
+        # Часы заморожены (и у event loop тоже) — отмена явная, не по таймауту
+        task = asyncio.create_task(api.get_task(1))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel_probe())
+    assert resilience.breaker_for("/tasks").state == resilience.HALF_OPEN
+
+    # Следующий запрос — снова проба, а не отказ «probing»
+    serve([200])
+    run(api.get_task(1))
+    run(api.get_task(1))
+    assert resilience.breaker_for("/tasks").state == resilience.CLOSED
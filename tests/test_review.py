@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.bot.handlers import review
+from src.storage.sessions import UserSession
+
+SESSION = UserSession(token="t", user_id=1, full_name="Mgr", role="manager", login="mgr")
+
+
+class FakeCallback:
+    def __init__(self, data: str) -> None:
+        self.data = data
+        self.message = SimpleNamespace(message_id=1, photo=None)
+        self.answers: list[tuple[str | None, bool]] = []
+
+    async def answer(self, text=None, show_alert=False, **kwargs):
+        self.answers.append((text, show_alert))
+
+
+@pytest.mark.parametrize("body", [{"data": None}, {"data": {}}, {}])
+@pytest.mark.parametrize(
+    "handler", [review.cb_review_approve_all, review.cb_review_individual]
+)
+def test_empty_task_response_is_not_found(handler, body, run, mock_api):
+    mock_api(lambda request: httpx.Response(200, json=body))
+    callback = FakeCallback("review_approve_all:5")
+    run(handler(callback, SESSION))
+    assert callback.answers == [("Задача не найдена", True)]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+
+from src.storage import sessions
+from src.storage.sessions import (
+    KEY_PREFIX,
+    SCHEMA_VERSION,
+    VERSION_FIELD,
+    UserSession,
+    decode_legacy_session,
+    decode_session,
+    encode_session,
+)
+
+
+def make_session() -> UserSession:
+    return UserSession(token="t", user_id=7, full_name="Emp", role="employee", login="emp")
+
+
+def test_hash_roundtrip():
+    session = make_session()
+    # HGETALL с decode_responses=True возвращает строки
+    fields = {k: str(v) for k, v in encode_session(session).items()}
+    assert fields[VERSION_FIELD] == str(SCHEMA_VERSION)
+    assert decode_session(fields) == session
+
+
+def test_legacy_json_decodes():
+    session = make_session()
+    legacy = json.dumps(
+        {"token": "t", "user_id": 7, "full_name": "Emp", "role": "employee", "login": "emp"}
+    )
+    assert decode_legacy_session(legacy) == session
+
+
+def test_session_is_slotted():
+    assert not hasattr(make_session(), "__dict__")
+
+
+def test_login_watermark():
+    from datetime import datetime, timezone
+
+    session = make_session()
+    session.notify_after = datetime(2025, 3, 1, 12, tzinfo=timezone.utc).timestamp()
+    fields = {k: str(v) for k, v in encode_session(session).items()}
+    assert decode_session(fields) == session
+
+    assert session.predates_login(datetime(2025, 3, 1, 11, 59, tzinfo=timezone.utc))
+    assert not session.predates_login(datetime(2025, 3, 1, 12, 1, tzinfo=timezone.utc))
+    assert not session.predates_login(None)
+    # Сессии до появления поля ничего не подавляют
+    assert not make_session().predates_login(datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+
+def test_sessions_without_watermark_get_migration_time(valkey, run, monkeypatch):
+    monkeypatch.setattr(sessions.time, "time", lambda: 1_700_000_000.0)
+    fields = encode_session(make_session())
+    del fields["notify_after"]
+    legacy = json.dumps(
+        {"token": "t", "user_id": 8, "full_name": "Emp", "role": "employee", "login": "e"}
+    )
+
+    async def scenario():
+        await valkey.hset(f"{KEY_PREFIX}1", mapping=fields)
+        await valkey.set(f"{KEY_PREFIX}2", legacy)
+        found = await sessions.get_all_sessions()
+        stored = await valkey.hget(f"{KEY_PREFIX}1", "notify_after")
+        # Момент записан один раз — повторное чтение его не сдвигает
+        monkeypatch.setattr(sessions.time, "time", lambda: 1_800_000_000.0)
+        again = await sessions.get_session(1)
+        return found, stored, again
+
+    found, stored, again = run(scenario())
+    assert found[1].notify_after == found[2].notify_after == 1_700_000_000.0
+    assert float(stored) == again.notify_after == 1_700_000_000.0
+
+
+def test_watermark_does_not_resurrect_expired_key(valkey, run):
+    async def scenario():
+        session = await sessions._stamp_notify_after(
+            valkey, f"{KEY_PREFIX}3", make_session()
+        )
+        return session, await valkey.exists(f"{KEY_PREFIX}3")
+
+    session, exists = run(scenario())
+    assert session.notify_after and not exists
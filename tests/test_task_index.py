@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from src.api.client import TaskMateAPI
+from src.config import settings
+from src.storage import task_index
+
+
+@pytest.fixture
+def backend(monkeypatch, mock_api, valkey):
+    tasks = {
+        1: {"id": 1, "status": "pending", "updated_at": "2026-01-01T10:00:00Z"},
+        2: {"id": 2, "status": "pending", "updated_at": "2026-01-01T11:00:00Z"},
+    }
+    requests: list[dict[str, str]] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        requests.append(params)
+        since = params.get("updated_since")
+        data = [t for t in tasks.values() if since is None or t["updated_at"] > since]
+        return httpx.Response(200, json={"data": data, "last_page": 1})
+
+    mock_api(handle)
+    monkeypatch.setattr(settings, "task_sync_full_interval", 3600)
+    return tasks, requests
+
+
+def test_incremental_sync_applies_changes_since_cursor(backend, run):
+    tasks, requests = backend
+    api = TaskMateAPI(token="t")
+
+    async def scenario():
+        assert sorted(t.id for t in await task_index.sync(api, 7)) == [1, 2]
+        assert "updated_since" not in requests[-1]
+
+        tasks[1].update(status="completed", updated_at="2026-01-01T12:00:00Z")
+        tasks[3] = {"id": 3, "status": "pending", "updated_at": "2026-01-01T12:30:00Z"}
+        assert sorted(t.id for t in await task_index.sync(api, 7)) == [2, 3]
+        assert requests[-1]["updated_since"] == "2026-01-01T11:00:00Z"
+
+        # Курсор продвинулся — без изменений ответ пустой, индекс прежний
+        assert sorted(t.id for t in await task_index.sync(api, 7)) == [2, 3]
+        assert requests[-1]["updated_since"] == "2026-01-01T12:30:00Z"
+
+        await task_index.clear(7)
+        await task_index.sync(api, 7)
+        assert "updated_since" not in requests[-1]
+
+    run(scenario())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.types import Message, Update
+
+from src.bot.bot import MediaGroupMiddleware, UpdateSchedulerMiddleware
+
+
+def test_same_chat_is_serialized(run):
+    scheduler = UpdateSchedulerMiddleware(max_concurrency=10)
+    active = 0
+    peak = 0
+    order: list[int] = []
+
+    async def handler(event, data):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        order.append(event)
+        active -= 1
+
+    async def main():
+        chat = SimpleNamespace(id=1)
+        await asyncio.gather(
+            *(scheduler(handler, i, {"event_chat": chat}) for i in range(5))
+        )
+
+    run(main())
+    assert peak == 1
+    assert order == [0, 1, 2, 3, 4]
+    assert scheduler.queue_depths() == {}
+
+
+def test_global_limit_across_chats(run):
+    scheduler = UpdateSchedulerMiddleware(max_concurrency=2)
+    active = 0
+    peak = 0
+
+    async def handler(event, data):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    async def main():
+        await asyncio.gather(
+            *(
+                scheduler(handler, i, {"event_chat": SimpleNamespace(id=i)})
+                for i in range(6)
+            )
+        )
+
+    run(main())
+    assert peak == 2
+
+
+def test_queue_depth_reported_while_waiting(run):
+    scheduler = UpdateSchedulerMiddleware(max_concurrency=10)
+    release = None
+
+    async def handler(event, data):
+        await release.wait()
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        chat = SimpleNamespace(id=42)
+        tasks = [
+            asyncio.create_task(scheduler(handler, i, {"event_chat": chat}))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        depth = scheduler.queue_depth(42)
+        release.set()
+        await asyncio.gather(*tasks)
+        return depth
+
+    assert run(main()) == 3
+    assert scheduler.queue_depth(42) == 0
+
+
+def _update(message_id: int, media_group_id: str | None = None) -> Update:
+    message = Message.model_validate({
+        "message_id": message_id,
+        "date": 0,
+        "chat": {"id": 7, "type": "private"},
+        "media_group_id": media_group_id,
+        "text": None if media_group_id else "📤 Отправить",
+    })
+    return Update(update_id=message_id, message=message)
+
+
+def _pipeline(handled: list):
+    """MediaGroupMiddleware → UpdateSchedulerMiddleware → обработчик, как в Dispatcher."""
+    media = MediaGroupMiddleware(window=0.05)
+    scheduler = UpdateSchedulerMiddleware(max_concurrency=10)
+
+    async def handler(event, data):
+        album = data.get("album")
+        handled.append([m.message_id for m in album] if album else event.message.message_id)
+
+    async def dispatch(update: Update):
+        data = {"event_chat": SimpleNamespace(id=update.message.chat.id)}
+        return await media(lambda e, d: scheduler(handler, e, d), update, data)
+
+    return dispatch
+
+
+def test_album_aggregated_into_one_update(run):
+    handled: list = []
+    dispatch = _pipeline(handled)
+
+    async def main():
+        await asyncio.gather(*(dispatch(_update(i, "g1")) for i in (3, 1, 2)))
+
+    run(main())
+    assert handled == [[1, 2, 3]]
+
+
+def test_update_after_album_waits_for_it(run):
+    handled: list = []
+    dispatch = _pipeline(handled)
+
+    async def main():
+        tasks = [asyncio.create_task(dispatch(_update(i, "g1"))) for i in (1, 2)]
+        await asyncio.sleep(0)
+        # Кнопка нажата сразу после альбома, ещё внутри окна сбора
+        tasks.append(asyncio.create_task(dispatch(_update(3))))
+        await asyncio.gather(*tasks)
+
+    run(main())
+    assert handled == [[1, 2], 3]